@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+Classes auxiliares para representação de matrizes de covariância e fatoração de matrizes simétricas
+
+@GrupoPesquisa: PROTEC
+@LinhadePesquisa: GI-UFBA
+"""
+# ---------------------------------------------------------------------
+# IMPORTAÇÃO DE PACOTES DE TERCEIROS
+# ---------------------------------------------------------------------
+from numpy import array, diag, min, max, abs, asarray, eye, zeros, count_nonzero, diagonal, sqrt, sum, log, exp, \
+    arange, ix_, full
+from scipy.linalg import cho_factor, cho_solve, solve_triangular, ldl, solve_banded, qr, LinAlgError
+from collections import deque
+
+# ---------------------------------------------------------------------
+# CLASSES
+# ---------------------------------------------------------------------
+class CovarianciaDiagonal:
+
+    def __init__(self, variancia):
+        u'''
+        Classe para representar uma matriz de covariância diagonal, armazenando apenas as variâncias.
+
+        =======
+        Entrada
+        =======
+
+        * variancia (array): vetor com as variâncias (elementos da diagonal principal)
+
+        =========
+        Atributos
+        =========
+
+        * ``.variancia`` (array): vetor com as variâncias
+        * ``.shape``     (tuple): dimensão da matriz densa equivalente
+
+        =======
+        Métodos
+        =======
+
+        * ``diagonal``: retorna o vetor de variâncias (mesma interface de ndarray.diagonal)
+        * ``toarray`` : retorna a matriz densa. Deve ser usado apenas quando a matriz completa for necessária
+        * ``cond``    : número de condição da matriz, avaliado em O(N)
+        * ``fatoracao``: fatoração da matriz (FatoracaoDiagonal), criada uma única vez
+
+        O produto matricial (operador @) com arrays é avaliado escalonando as linhas ou colunas, sem criar a matriz densa.
+        '''
+        self.variancia = array(variancia, dtype=float).ravel()
+        self.shape = (self.variancia.size, self.variancia.size)
+        self._fatoracao = None
+
+    # Faz com que o numpy delegue o operador @ (array @ CovarianciaDiagonal) para __rmatmul__
+    __array_ufunc__ = None
+
+    def __matmul__(self, outro):
+        outro = asarray(outro)
+        return self.variancia.reshape((-1,) + (1,)*(outro.ndim-1))*outro
+
+    def __rmatmul__(self, outro):
+        return asarray(outro)*self.variancia
+
+    def diagonal(self):
+        return self.variancia
+
+    def toarray(self):
+        return diag(self.variancia)
+
+    def cond(self):
+        # Para uma matriz diagonal, o número de condição (norma 2) é a razão entre o maior e o menor valor absoluto
+        return max(abs(self.variancia))/min(abs(self.variancia))
+
+    def fatoracao(self):
+        if self._fatoracao is None:
+            self._fatoracao = FatoracaoDiagonal(self.variancia)
+        return self._fatoracao
+
+class CovarianciaBaixoPosto:
+
+    def __init__(self, fator, nucleo, base):
+        u'''
+        Classe para representar uma matriz de covariância na forma fatorada F.M.FT + B, em que o fator F (N x k) possui
+        poucas colunas (posto baixo, k << N) e B é a covariância de base (CovarianciaDiagonal ou array). A matriz densa
+        (N x N) só é criada quando solicitada.
+
+        =======
+        Entrada
+        =======
+
+        * fator (array): fator F (N x k)
+        * nucleo (array): matriz simétrica M (k x k)
+        * base (CovarianciaDiagonal ou array): covariância B (N x N)
+
+        =========
+        Atributos
+        =========
+
+        * ``.fator``, ``.nucleo``, ``.base``: termos da forma fatorada
+        * ``.shape`` (tuple): dimensão da matriz densa equivalente
+
+        =======
+        Métodos
+        =======
+
+        * ``diagonal``: retorna as variâncias, avaliadas em O(N.k²)
+        * ``bloco``   : retorna a submatriz (densa) das linhas e colunas informadas (índices ou slices)
+        * ``toarray`` : retorna a matriz densa. Deve ser usado apenas quando a matriz completa for necessária
+
+        O produto matricial (operador @) com arrays é avaliado a partir dos termos, sem criar a matriz densa.
+        '''
+        self.fator = asarray(fator, dtype=float)
+        self.nucleo = asarray(nucleo, dtype=float)
+        self.base = base
+        self.shape = (self.fator.shape[0], self.fator.shape[0])
+
+    # Faz com que o numpy delegue o operador @ (array @ CovarianciaBaixoPosto) para __rmatmul__
+    __array_ufunc__ = None
+
+    def __matmul__(self, outro):
+        outro = asarray(outro)
+        return self.fator.dot(self.nucleo.dot(self.fator.transpose().dot(outro))) + self.base @ outro
+
+    def __rmatmul__(self, outro):
+        outro = asarray(outro)
+        return outro.dot(self.fator).dot(self.nucleo).dot(self.fator.transpose()) + outro @ self.base
+
+    def diagonal(self):
+        return sum(self.fator.dot(self.nucleo)*self.fator, axis=1) + self.base.diagonal()
+
+    def bloco(self, linhas, colunas=None):
+        linhas = arange(self.shape[0])[linhas]
+        colunas = linhas if colunas is None else arange(self.shape[0])[colunas]
+
+        if isinstance(self.base, CovarianciaDiagonal):
+            base = (linhas.reshape(-1, 1) == colunas)*self.base.variancia[linhas].reshape(-1, 1)
+        else:
+            base = asarray(self.base)[ix_(linhas, colunas)]
+
+        return self.fator[linhas].dot(self.nucleo).dot(self.fator[colunas].transpose()) + base
+
+    def toarray(self):
+        return self.bloco(slice(None))
+
+class FatoracaoDiagonal:
+
+    def __init__(self, diagonal):
+        u'''
+        Fatoração de uma matriz diagonal (caminho rápido: todas as operações são O(N)).
+
+        =======
+        Entrada
+        =======
+
+        * diagonal (array): elementos da diagonal principal
+
+        =======
+        Métodos
+        =======
+
+        * ``resolver``       : solução de A.x = b
+        * ``formaQuadratica``: bT.inv(A).b
+        * ``branquear``      : inv(L).b, com A = L.LT (divide cada linha pelo desvio-padrão)
+        * ``inversa``        : matriz inversa (densa)
+        '''
+        self.diagonal = array(diagonal, dtype=float).ravel()
+        self.shape = (self.diagonal.size, self.diagonal.size)
+        self._desvio = None
+
+    def resolver(self, b):
+        b = asarray(b, dtype=float)
+        return b/self.diagonal.reshape((-1,) + (1,)*(b.ndim-1))
+
+    def formaQuadratica(self, b):
+        b = asarray(b, dtype=float)
+        return b.transpose().dot(self.resolver(b))
+
+    def branquear(self, b):
+        if self._desvio is None:
+            self._desvio = sqrt(self.diagonal)
+        b = asarray(b, dtype=float)
+        return b/self._desvio.reshape((-1,) + (1,)*(b.ndim-1))
+
+    def inversa(self):
+        return diag(1./self.diagonal)
+
+class FatoracaoCholesky:
+
+    def __init__(self, matriz):
+        u'''
+        Fatoração de uma matriz simétrica: Cholesky (L.LT) para matrizes positivas definidas ou, caso a fatoração
+        de Cholesky falhe, LDLT (com pivotamento, blocos 1x1 e 2x2 em D).
+
+        =======
+        Entrada
+        =======
+
+        * matriz (array): matriz simétrica
+
+        =======
+        Métodos
+        =======
+
+        * ``resolver``       : solução de A.x = b, a partir da fatoração
+        * ``formaQuadratica``: bT.inv(A).b
+        * ``branquear``      : inv(L).b, com A = L.LT (apenas para matrizes positivas definidas)
+        * ``inversa``        : matriz inversa, avaliada uma única vez
+        '''
+        matriz = asarray(matriz, dtype=float)
+        self.shape = matriz.shape
+        self._inversa = None
+
+        try:
+            self.__cholesky = cho_factor(matriz, lower=True)
+            self.__ldl = None
+        except LinAlgError:
+            self.__cholesky = None
+            L, D, permutacao = ldl(matriz, lower=True)
+            # D é tridiagonal (blocos 1x1 e 2x2): armazenada no formato de banda
+            banda = zeros((3, self.shape[0]))
+            banda[0, 1:] = diagonal(D, 1)
+            banda[1, :] = diagonal(D)
+            banda[2, :-1] = diagonal(D, -1)
+            # L[permutacao] é triangular inferior
+            self.__ldl = (L[permutacao], banda, permutacao)
+
+    def resolver(self, b):
+        b = asarray(b, dtype=float)
+        if self.__cholesky is not None:
+            return cho_solve(self.__cholesky, b)
+
+        L, banda, permutacao = self.__ldl
+        z = solve_triangular(L, b[permutacao], lower=True, unit_diagonal=True)
+        w = solve_banded((1, 1), banda, z)
+        x = zeros(b.shape)
+        x[permutacao] = solve_triangular(L.transpose(), w, lower=False, unit_diagonal=True)
+        return x
+
+    def formaQuadratica(self, b):
+        b = asarray(b, dtype=float)
+        if self.__cholesky is not None:
+            # bT.inv(L.LT).b = (inv(L).b)T.(inv(L).b), simétrica por construção
+            w = solve_triangular(self.__cholesky[0], b, lower=True)
+            return w.transpose().dot(w)
+        return b.transpose().dot(self.resolver(b))
+
+    def branquear(self, b):
+        if self.__cholesky is None:
+            raise ValueError('The matrix is not positive definite.')
+        return solve_triangular(self.__cholesky[0], asarray(b, dtype=float), lower=True)
+
+    def inversa(self):
+        if self._inversa is None:
+            self._inversa = self.resolver(eye(self.shape[0]))
+        return self._inversa
+
+class MinimosQuadradosPonderados:
+
+    def __init__(self, X, y, fatoracao):
+        u'''
+        Solução de mínimos quadrados ponderados, min (y-X.b)T.inv(Uyy).(y-X.b), por fatoração QR.
+
+        As linhas de X e y são branqueadas pela fatoração de Uyy (divididas pelos desvios-padrão, no caso diagonal) e
+        o problema é resolvido pela fatoração QR reduzida da matriz branqueada: O(NE.NP²) operações e O(NE.NP) de memória,
+        sem formar XT.inv(Uyy).X.
+
+        =======
+        Entrada
+        =======
+
+        * X (array): matriz (NE x NP) do modelo linear
+        * y (array): vetor (NE x 1) das observações
+        * fatoracao: fatoração da matriz de covariância de y (ver fatorar)
+
+        =========
+        Atributos
+        =========
+
+        * ``.parametros`` (array): estimativa dos parâmetros (NP x 1)
+        * ``.R``          (array): fator triangular superior (NP x NP) da fatoração QR da matriz branqueada
+        * ``.FOmin``      (float): valor mínimo da função objetivo (soma dos quadrados dos resíduos branqueados)
+
+        =======
+        Métodos
+        =======
+
+        * ``covariancia``: matriz de covariância dos parâmetros, inv(XT.inv(Uyy).X) = inv(R).inv(R)T, avaliada uma única vez
+        * ``informacao``: matriz de informação XT.inv(Uyy).X = RT.R
+        * ``funcaoObjetivo``: função objetivo avaliada para um conjunto de parâmetros (forma quadrática exata)
+        '''
+        Q, self.R = qr(fatoracao.branquear(X), mode='economic', overwrite_a=True, check_finite=False)
+        yb = fatoracao.branquear(y)
+        Qy = Q.transpose().dot(yb)
+        self.parametros = solve_triangular(self.R, Qy, lower=False)
+        # Resíduos branqueados: yb - Q.QT.yb
+        self.FOmin = float(sum((yb - Q.dot(Qy))**2))
+        self._covariancia = None
+
+    def covariancia(self):
+        if self._covariancia is None:
+            invR = solve_triangular(self.R, eye(self.R.shape[0]), lower=False)
+            self._covariancia = invR.dot(invR.transpose())
+        return self._covariancia
+
+    def informacao(self):
+        return self.R.transpose().dot(self.R)
+
+    def funcaoObjetivo(self, parametros):
+        u'''
+        Função objetivo (y-X.b)T.inv(Uyy).(y-X.b) = FOmin + ||R.(b-b*)||², avaliada sem os dados (O(NP²) por ponto).
+
+        * parametros (array): vetor (NP) ou matriz (número de pontos x NP) com os valores dos parâmetros
+
+        Retorna o valor da função objetivo (float) ou um vetor com o valor para cada ponto.
+        '''
+        parametros = asarray(parametros, dtype=float)
+        desvio = parametros.reshape((-1, self.R.shape[0])) - self.parametros.transpose()
+        FO = self.FOmin + sum(desvio.dot(self.R.transpose())**2, axis=1)
+        return FO if parametros.ndim == 2 else float(FO[0])
+
+class MinimosQuadradosRecursivo:
+
+    def __init__(self, parametros, covariancia, FO, X, y, variancia):
+        u'''
+        Mínimos quadrados ponderados recursivos. A estimativa dos parâmetros, sua matriz de covariância e o valor mínimo
+        da função objetivo são corrigidos pela inclusão ou remoção de blocos de k pontos (atualizações de posto k pela
+        fórmula de Woodbury), com custo O(k.NP² + k³), independente do número de pontos já considerados.
+
+        =======
+        Entrada
+        =======
+
+        * parametros (array): estimativa inicial dos parâmetros (NP)
+        * covariancia (array): matriz de covariância inicial dos parâmetros, inv(XT.inv(Uyy).X)
+        * FO (float): valor mínimo inicial da função objetivo
+        * X (array): matriz (NE x NP) do modelo linear dos pontos que originaram a estimativa inicial
+        * y (array): observações desses pontos (NE)
+        * variancia (array): variâncias dessas observações (NE)
+
+        Os pontos são armazenados (por referência) para que os mais antigos possam ser removidos (janela móvel).
+
+        =========
+        Atributos
+        =========
+
+        * ``.parametros`` (array): estimativa dos parâmetros (NP x 1)
+        * ``.FOmin``      (float): valor mínimo da função objetivo
+        * ``.NE``         (int): número de pontos considerados na estimativa
+
+        =======
+        Métodos
+        =======
+
+        * ``incluir``       : inclui novos pontos, com fator de esquecimento opcional
+        * ``remover``       : remove os pontos mais antigos
+        * ``covariancia``   : matriz de covariância dos parâmetros
+        * ``informacao``    : matriz de informação, inv(covariancia)
+        * ``pesosIniciais`` : pesos atuais dos pontos que originaram a estimativa inicial
+        * ``funcaoObjetivo``: função objetivo avaliada para um conjunto de parâmetros (forma quadrática exata)
+        '''
+        self.parametros = array(parametros, dtype=float).reshape((-1, 1))
+        self._covariancia = array(covariancia, dtype=float)
+        self._fatoracao = None
+        self.FOmin = float(FO)
+        self.NE = 0
+        # Número de pontos que originaram a estimativa inicial e número de pontos removidos até o momento (os pontos mais
+        # antigos são removidos primeiro, logo os pontos iniciais são os primeiros removidos)
+        self.__NEinicial = array(X, ndmin=2).shape[0]
+        self.__removidos = 0
+
+        # Logaritmo do produto dos fatores de esquecimento aplicados até o momento. O peso de um ponto é
+        # exp(logEscala - logEscala na sua inclusão)
+        self.__logEscala = 0.
+        # Blocos de pontos (X, y, variancia, logEscala na inclusão), do mais antigo ao mais recente
+        self.__blocos = deque()
+        self.__armazenar(X, y, variancia)
+
+    def __armazenar(self, X, y, variancia):
+        X = array(X, dtype=float, ndmin=2)
+        self.__blocos.append((X, array(y, dtype=float).reshape((-1, 1)), array(variancia, dtype=float).ravel(),
+                              self.__logEscala))
+        self.NE += X.shape[0]
+
+    def __corrigir(self, X, y, variancia, sinal):
+        # Inclusão (sinal = 1) ou remoção (sinal = -1) de pontos:
+        # S = U + sinal.X.P.XT; K = P.XT.inv(S); b = b + sinal.K.e; P = P - sinal.K.X.P; FO = FO + sinal.eT.inv(S).e
+        e = y - X.dot(self.parametros)
+        XP = X.dot(self._covariancia)
+        fatoracao = fatorar(diag(variancia) + sinal*XP.dot(X.transpose()))
+        K = fatoracao.resolver(XP).transpose()
+
+        self.parametros = self.parametros + sinal*K.dot(e)
+        covariancia = self._covariancia - sinal*K.dot(XP)
+        self._covariancia = (covariancia + covariancia.transpose())/2.
+        self._fatoracao = None
+        self.FOmin += sinal*float(e.transpose().dot(fatoracao.resolver(e)))
+
+    def incluir(self, X, y, variancia, fator_esquecimento=1.):
+        u'''
+        Inclui novos pontos (X: matriz k x NP, y: k observações, variancia: k variâncias). Caso fator_esquecimento < 1,
+        a informação dos pontos anteriores é multiplicada pelo fator antes da inclusão.
+        '''
+        if fator_esquecimento != 1.:
+            self._covariancia = self._covariancia/fator_esquecimento
+            self._fatoracao = None
+            self.FOmin *= fator_esquecimento
+            self.__logEscala += log(fator_esquecimento)
+
+        self.__armazenar(X, y, variancia)
+        X, y, variancia, logEscala = self.__blocos[-1]
+        self.__corrigir(X, y, variancia, 1)
+
+    def remover(self, n):
+        u'''
+        Remove os n pontos mais antigos, considerando o peso de cada um no momento da remoção (fator de esquecimento).
+        '''
+        while n > 0:
+            X, y, variancia, logEscala = self.__blocos[0]
+            m = n if n < X.shape[0] else X.shape[0]
+            self.__corrigir(X[:m], y[:m], variancia[:m]*exp(logEscala - self.__logEscala), -1)
+
+            if m == X.shape[0]:
+                self.__blocos.popleft()
+            else:
+                self.__blocos[0] = (X[m:], y[m:], variancia[m:], logEscala)
+
+            self.NE -= m
+            self.__removidos += m
+            n -= m
+
+    def covariancia(self):
+        return self._covariancia
+
+    def informacao(self):
+        return self.__fatoracaoCovariancia().inversa()
+
+    def pesosIniciais(self):
+        u'''
+        Pesos atuais (produto dos fatores de esquecimento aplicados após a inclusão) dos pontos que originaram a
+        estimativa inicial (NE inicial). Os pontos removidos (janela móvel) possuem peso zero.
+        '''
+        pesos = full(self.__NEinicial, exp(self.__logEscala))
+        removidos = self.__removidos if self.__removidos < self.__NEinicial else self.__NEinicial
+        pesos[:removidos] = 0.
+        return pesos
+
+    def __fatoracaoCovariancia(self):
+        if self._fatoracao is None:
+            self._fatoracao = fatorar(self._covariancia)
+        return self._fatoracao
+
+    def funcaoObjetivo(self, parametros):
+        u'''
+        Função objetivo FOmin + (b-b*)T.inv(P).(b-b*), avaliada para um vetor (NP) ou matriz (número de pontos x NP) de
+        parâmetros.
+        '''
+        parametros = asarray(parametros, dtype=float)
+        desvio = parametros.reshape((-1, self.parametros.shape[0])) - self.parametros.transpose()
+        FO = self.FOmin + sum(self.__fatoracaoCovariancia().branquear(desvio.transpose())**2, axis=0)
+        return FO if parametros.ndim == 2 else float(FO[0])
+
+def fatorar(matriz):
+    u'''
+    Retorna a fatoração de uma matriz simétrica.
+
+    * CovarianciaDiagonal: fatoração armazenada na própria matriz (FatoracaoDiagonal)
+    * array diagonal: FatoracaoDiagonal
+    * demais arrays (e CovarianciaBaixoPosto, convertida na matriz densa): FatoracaoCholesky
+    '''
+    if isinstance(matriz, CovarianciaDiagonal):
+        return matriz.fatoracao()
+
+    if isinstance(matriz, CovarianciaBaixoPosto):
+        matriz = matriz.toarray()
+
+    matriz = asarray(matriz, dtype=float)
+    if count_nonzero(matriz) == count_nonzero(diagonal(matriz)):
+        return FatoracaoDiagonal(diagonal(matriz))
+
+    return FatoracaoCholesky(matriz)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Compilação das funções do CasADi (geração de código C) com armazenamento em disco das bibliotecas compiladas
+
+@GrupoPesquisa: PROTEC
+@LinhadePesquisa: GI-UFBA
+"""
+# ---------------------------------------------------------------------
+# IMPORTAÇÃO DE PACOTES DE TERCEIROS
+# ---------------------------------------------------------------------
+from casadi import CodeGenerator, external, nlpsol
+from hashlib import sha256
+from os import path, makedirs, replace, remove, getpid, sep
+from shutil import which
+from subprocess import run, CalledProcessError, PIPE
+from tempfile import gettempdir
+from warnings import warn
+
+# ---------------------------------------------------------------------
+# VARIÁVEIS
+# ---------------------------------------------------------------------
+# Diretório padrão para armazenamento das bibliotecas compiladas (compartilhado entre processos)
+diretorio_padrao = path.join(gettempdir(), 'MT_PEU_compilacao')
+
+# Flags de compilação das bibliotecas
+opcoes_compilacao = ['-shared', '-fPIC', '-O2']
+
+# ---------------------------------------------------------------------
+# FUNÇÕES
+# ---------------------------------------------------------------------
+def compilador():
+    u"""
+    Retorna o caminho do compilador C disponível (gcc, cc ou clang) ou None, caso nenhum seja encontrado.
+    """
+    for nome in ('gcc', 'cc', 'clang'):
+        if which(nome) is not None:
+            return which(nome)
+    return None
+
+def _bibliotecaCompilada(nome, funcoes, chave, diretorio):
+    u"""
+    Retorna o caminho da biblioteca compartilhada com o código C das funções. A biblioteca só é gerada e compilada
+    caso não exista no diretório (a chave identifica o grafo de expressões das funções).
+
+    A compilação é feita em arquivos temporários (identificados pelo processo), renomeados ao final, de forma que
+    processos executados simultaneamente não utilizem bibliotecas incompletas.
+    """
+    biblioteca = path.join(diretorio, nome + '_' + chave + '.so')
+
+    if path.isfile(biblioteca):
+        return biblioteca
+
+    executavel = compilador()
+    if executavel is None:
+        raise OSError('No C compiler (gcc, cc or clang) was found.')
+
+    makedirs(diretorio, exist_ok=True)
+
+    # Geração do código C
+    fonte = nome + '_' + chave + '_' + str(getpid()) + '.c'
+    codigo = CodeGenerator(fonte)
+    for funcao in funcoes:
+        codigo.add(funcao)
+    codigo.generate(diretorio + sep)
+
+    # Compilação
+    temporario = biblioteca + '.' + str(getpid())
+    try:
+        run([executavel] + opcoes_compilacao + [path.join(diretorio, fonte), '-o', temporario],
+            check=True, stdout=PIPE, stderr=PIPE)
+        replace(temporario, biblioteca)
+    finally:
+        remove(path.join(diretorio, fonte))
+        if path.isfile(temporario):
+            remove(temporario)
+
+    return biblioteca
+
+def compilarFuncao(funcao, diretorio=None, derivadas=False):
+    u"""
+    Gera o código C de uma função do CasADi, compila e retorna a função compilada (casadi.external).
+
+    =======
+    Entrada
+    =======
+
+    * funcao (casadi.Function): função a ser compilada
+    * diretorio (str): diretório onde as bibliotecas são armazenadas. Caso None, é utilizado o diretório padrão.
+    * derivadas (bool): caso True, as funções de derivadas de primeira e segunda ordem procuradas pelo casadi.external
+    (fwd1_, adj1_, jac_, jac_fwd1_, jac_adj1_ e jac_jac_<nome>) são compiladas na mesma biblioteca, de forma que a
+    função compilada possa ser utilizada em expressões que são derivadas (ex.: modelo dentro da função objetivo).
+
+    =====
+    Saída
+    =====
+
+    * Função compilada, com as mesmas entradas e saídas. A biblioteca é identificada pelo hash (sha256) da função
+    serializada, sendo reutilizada por outras execuções. Caso a compilação não seja possível, é emitido um aviso
+    e a função original é retornada.
+    """
+    diretorio = diretorio if diretorio is not None else diretorio_padrao
+
+    try:
+        funcoes = [funcao]
+        if derivadas:
+            funcoes += [funcao.forward(1), funcao.reverse(1), funcao.jacobian(), funcao.forward(1).jacobian(),
+                        funcao.reverse(1).jacobian(), funcao.jacobian().jacobian()]
+        chave = sha256((funcao.serialize() + ('derivadas' if derivadas else '')).encode()).hexdigest()[:24]
+        biblioteca = _bibliotecaCompilada(funcao.name(), funcoes, chave, diretorio)
+        return external(funcao.name(), biblioteca)
+
+    except (OSError, CalledProcessError, RuntimeError) as erro:
+        warn('The function {} could not be compiled, the casadi virtual machine will be used. Error: {}'.format(
+            funcao.name(), erro), UserWarning)
+        return funcao
+
+def compilarSolver(nome, algoritmo, nlp, opcoes, diretorio=None):
+    u"""
+    Cria o otimizador (nlpsol) com as funções do problema (objetivo, gradiente, hessiana, ...) compiladas.
+
+    =======
+    Entrada
+    =======
+
+    * nome (str): nome do otimizador
+    * algoritmo (str): algoritmo de otimização (ipopt, bonmin, sqpmethod)
+    * nlp (dict): definição do problema de otimização (x, p, f)
+    * opcoes (dict): opções do otimizador
+    * diretorio (str): diretório onde as bibliotecas são armazenadas. Caso None, é utilizado o diretório padrão.
+
+    =====
+    Saída
+    =====
+
+    * Otimizador carregado a partir da biblioteca compilada. Caso a compilação não seja possível, é emitido um aviso
+    e o otimizador com as funções do CasADi é retornado.
+    """
+    diretorio = diretorio if diretorio is not None else diretorio_padrao
+
+    solver = nlpsol(nome, algoritmo, nlp, opcoes)
+
+    try:
+        # As funções necessárias ao solver dependem do problema (oracle) e do algoritmo
+        funcoes = [solver.oracle()] + [solver.get_function(funcao) for funcao in solver.get_function()]
+        chave = sha256((solver.oracle().serialize() + algoritmo + ','.join(solver.get_function())).encode()).hexdigest()[:24]
+        biblioteca = _bibliotecaCompilada('nlp', funcoes, chave, diretorio)
+        return nlpsol(nome, algoritmo, biblioteca, opcoes)
+
+    except (OSError, CalledProcessError, RuntimeError) as erro:
+        warn('The optimization problem could not be compiled, the casadi virtual machine will be used. Error: {}'.format(
+            erro), UserWarning)
+        return solver
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Otimizadores para problemas de mínimos quadrados ponderados (Gauss-Newton e Levenberg-Marquardt), com limites
+(caixa) para os parâmetros
+
+@GrupoPesquisa: PROTEC
+@LinhadePesquisa: GI-UFBA
+"""
+# ---------------------------------------------------------------------
+# IMPORTAÇÃO DE PACOTES DE TERCEIROS
+# ---------------------------------------------------------------------
+from numpy import array, asarray, full, clip, sqrt, zeros, inf, abs, max, vstack, eye, sum, where, concatenate
+from numpy.linalg import lstsq, norm
+from time import perf_counter
+
+# ---------------------------------------------------------------------
+# VARIÁVEIS
+# ---------------------------------------------------------------------
+# Métodos disponíveis
+metodos = ('gauss-newton', 'lm')
+
+# ---------------------------------------------------------------------
+# FUNÇÕES
+# ---------------------------------------------------------------------
+def minimosQuadrados(residuos, jacobiana, inicio, limite_inferior=-inf, limite_superior=inf, metodo='gauss-newton',
+                     iteracoes_maximas=200, ftol=1e-12, xtol=1e-12, gtol=1e-12, amortecimento=1e-3):
+    u"""
+    Minimiza FO(p) = r(p)T.r(p), em que r é o vetor de resíduos ponderados, a partir de r e de sua jacobiana J. Cada
+    iteração resolve um problema linear de mínimos quadrados (O(N.NP²)), sem avaliar a hessiana de FO.
+
+    * Gauss-Newton: passo J.dp = -r, com busca linear (o passo é reduzido à metade até que FO diminua)
+    * Levenberg-Marquardt: passo (JT.J + mu.diag(JT.J)).dp = -JT.r, com mu ajustado em cada iteração
+
+    Os limites são tratados por projeção: os parâmetros em um limite, cujo gradiente aponta para fora da região,
+    não são alterados na iteração, e o novo ponto é projetado nos limites.
+
+    =======
+    Entrada
+    =======
+
+    * residuos (callable): função dos parâmetros que retorna o vetor de resíduos (N), avaliada em cada passo testado
+    * jacobiana (callable): função dos parâmetros que retorna a jacobiana dos resíduos (N x NP), avaliada somente nos
+    pontos aceitos
+    * inicio (list): estimativa inicial dos parâmetros
+    * limite_inferior, limite_superior (list ou float): limites dos parâmetros
+    * metodo (str): 'gauss-newton' ou 'lm'
+    * iteracoes_maximas (int): número máximo de iterações
+    * ftol (float): tolerância para a redução relativa de FO
+    * xtol (float): tolerância para a norma relativa do passo
+    * gtol (float): tolerância para a norma (máximo) do gradiente projetado, relativa a max(1, FO)
+    * amortecimento (float): valor inicial de mu (Levenberg-Marquardt)
+
+    =====
+    Saída
+    =====
+
+    * dict com as chaves:
+        * x (array): parâmetros no ponto ótimo
+        * f (float): valor de FO no ponto ótimo
+        * lam_x (array): multiplicadores dos limites (-gradiente de FO nos limites ativos, zero nos demais)
+        * lam_g (array): vazio (o problema não possui restrições)
+        * historico (list): (iteração, FO, norma do passo, norma do gradiente projetado, mu) de cada iteração
+        * stats (dict): success, return_status, iter_count e t_wall_total
+    """
+    tempo = perf_counter()
+
+    x = array(inicio, dtype=float).ravel()
+    li = full(x.size, -inf)
+    li[:] = limite_inferior
+    ls = full(x.size, inf)
+    ls[:] = limite_superior
+    x = clip(x, li, ls)
+
+    r, J = _residuos(residuos, x), _jacobiana(jacobiana, x)
+    FO = r.dot(r)
+    mu = amortecimento if metodo == 'lm' else 0.
+
+    historico = []
+    sucesso, status, iteracao = False, 'Maximum_Iterations_Exceeded', 0
+
+    while iteracao < iteracoes_maximas:
+        # Gradiente (JT.r = gradiente da FO / 2) e parâmetros que podem variar nesta iteração
+        g = J.transpose().dot(r)
+        livres = ~(((x <= li) & (g > 0)) | ((x >= ls) & (g < 0)))
+        gradiente = max(abs(where(livres, g, 0.)))
+
+        if gradiente <= gtol*(FO if FO > 1. else 1.):
+            sucesso, status = True, 'Gradient_Tolerance'
+            break
+
+        iteracao += 1
+
+        # Passo (problema de mínimos quadrados linear nos parâmetros livres, com as colunas de J de norma unitária)
+        escala = sqrt(sum(J[:, livres]**2, axis=0))
+        escala[escala == 0.] = 1.
+        J_livre = J[:, livres]/escala
+        alfa = 1.
+
+        while True:
+            passo = zeros(x.size)
+            if metodo == 'lm':
+                passo[livres] = lstsq(vstack((J_livre, sqrt(mu)*eye(escala.size))),
+                                      concatenate((-r, zeros(escala.size))), rcond=None)[0]/escala
+            else:
+                passo[livres] = alfa*lstsq(J_livre, -r, rcond=None)[0]/escala
+
+            x_novo = clip(x + passo, li, ls)
+            r_novo = _residuos(residuos, x_novo)
+            FO_novo = r_novo.dot(r_novo)
+
+            if metodo == 'lm':
+                # Amortecimento: reduzido após um passo aceito e aumentado após um passo rejeitado
+                if FO_novo < FO:
+                    mu = mu/3. if mu/3. > 1e-12 else 1e-12
+                    break
+                mu = mu*4.
+                if mu > 1e16:
+                    break
+            else:
+                # Busca em linha: o passo é reduzido à metade até a FO diminuir (somente os resíduos são avaliados)
+                if FO_novo < FO:
+                    break
+                alfa = alfa/2.
+                if alfa < 1e-10:
+                    break
+
+        if not FO_novo < FO:
+            # A FO não pode ser reduzida a partir do ponto atual: convergiu se o gradiente for pequeno (arredondamento)
+            sucesso = gradiente <= sqrt(gtol)*(FO if FO > 1. else 1.)
+            status = 'Step_Tolerance' if sucesso else 'Search_Direction_Failure'
+            break
+
+        tamanho = norm(x_novo - x)
+        reducao = FO - FO_novo
+        x, r, FO = x_novo, r_novo, FO_novo
+        # jacobiana avaliada somente no ponto aceito
+        J = _jacobiana(jacobiana, x)
+        historico.append((iteracao, FO, tamanho, gradiente, mu))
+
+        if reducao <= ftol*FO:
+            sucesso, status = True, 'Function_Tolerance'
+            break
+
+        if tamanho <= xtol*(xtol + norm(x)):
+            sucesso, status = True, 'Step_Tolerance'
+            break
+
+    # Multiplicadores dos limites ativos (gradiente da FO = 2.JT.r)
+    g = J.transpose().dot(r)
+    ativos = ((x <= li) & (g > 0)) | ((x >= ls) & (g < 0))
+
+    return {'x': x, 'f': FO, 'lam_x': where(ativos, -2.*g, 0.), 'lam_g': zeros(0), 'historico': historico,
+            'stats': {'success': sucesso, 'return_status': status, 'iter_count': iteracao,
+                      't_wall_total': perf_counter() - tempo}}
+
+def _residuos(residuos, x):
+    return asarray(residuos(x), dtype=float).ravel()
+
+def _jacobiana(jacobiana, x):
+    return asarray(jacobiana(x), dtype=float).reshape((-1, x.size))
+
+def relatorio(resultado, arquivo, metodo):
+    u"""
+    Escreve o relatório da otimização (histórico das iterações e resultado) no arquivo (texto).
+    """
+    with open(arquivo, 'w') as saida:
+        saida.write('Method: {}\n\n'.format(metodo))
+        saida.write('{:>6s} {:>24s} {:>14s} {:>14s} {:>10s}\n'.format('iter', 'objective', '||step||', '||grad||', 'mu'))
+        for iteracao, FO, tamanho, gradiente, mu in resultado['historico']:
+            saida.write('{:6d} {:24.16e} {:14.6e} {:14.6e} {:10.2e}\n'.format(iteracao, FO, tamanho, gradiente, mu))
+        saida.write('\nNumber of Iterations....: {}\n'.format(resultado['stats']['iter_count']))
+        saida.write('Objective...............: {:.16e}\n'.format(resultado['f']))
+        saida.write('Parameters..............: {}\n'.format(', '.join('{:.16e}'.format(valor) for valor in resultado['x'])))
+        saida.write('Exit status.............: {}\n'.format(resultado['stats']['return_status']))
+        saida.write('Total time (s)..........: {:.4f}\n'.format(resultado['stats']['t_wall_total']))
@@ -7,7 +7,7 @@ Arquivo que contém a classe gráficos
 
 # Importação de pacotes
 
-from numpy import arctan2, degrees, sqrt, sort, argsort, mean, std, nan, amin, amax
+from numpy import arctan2, degrees, sqrt, sort, argsort, mean, std, nan, amin, amax, ndarray, asarray
 
 from numpy.linalg import eigh, inv
 
@@ -208,24 +208,27 @@ class Grafico:
 
         :param **kwargs: keyword argumentos a serem passados para método self.matplotlib.pyplot.errorbar
         """
-        if not isinstance(fator_abrangencia_x, list) or not isinstance(fator_abrangencia_y, list):
-            raise TypeError('The coverage factors must be informed in a form of lists.')
+        if not isinstance(fator_abrangencia_x, (list, ndarray)) or not isinstance(fator_abrangencia_y, (list, ndarray)):
+            raise TypeError('The coverage factors must be informed in a form of lists or arrays.')
 
-        # organizando os vetores
-        y = y[argsort(x)]
+        # organizando os vetores (os fatores de abrangência acompanham os seus pontos)
+        ordem = argsort(x)
+        y = y[ordem]
         if ux is not None:
-            ux = ux[argsort(x)]
+            ux = ux[ordem]
+            fator_abrangencia_x = asarray(fator_abrangencia_x, dtype=float)[ordem]
         if uy is not None:
-            uy = uy[argsort(x)]
+            uy = uy[ordem]
+            fator_abrangencia_y = asarray(fator_abrangencia_y, dtype=float)[ordem]
         x = sort(x)
 
         # incerteza expandida
         if ux is not None:
-            xerr = [fator_abrangencia_x[i] * ux[i] for i in range(len(ux))]
+            xerr = fator_abrangencia_x*ux
         else:
             xerr = None
         if uy is not None:
-            yerr = [fator_abrangencia_y[i]*uy[i] for i in range(len(uy))]
+            yerr = fator_abrangencia_y*uy
         else:
             yerr = None
 
@@ -6,7 +6,7 @@ Created on Mon Feb  2 11:05:02 2015
 """
 # Importação de pacotes de terceiros
 from numpy import array, size, diag, linspace, min, max, \
-    mean,  std, ndarray, insert, isfinite, arange, sqrt, concatenate
+    mean,  std, ndarray, insert, isfinite, arange, sqrt, concatenate, eye, vstack
 
 from numpy.linalg import cond
 
@@ -24,7 +24,8 @@ from matplotlib.colors import LinearSegmentedColormap
 from os import getcwd, sep
 
 # Subrotinas próprias (desenvolvidas pelo GI-UFBA)
-from subrotinas import Validacao_Diretorio, matrizcorrelacao
+from subrotinas import Validacao_Diretorio, matrizcorrelacao, fatorAbrangencia
+from AlgebraLinear import CovarianciaDiagonal, CovarianciaBaixoPosto, fatorar
 
 from Graficos import Grafico
 
@@ -96,7 +97,7 @@ class Grandeza:
         * ``.estimativa`` (list): lista com estimativas. 
         * ``.matriz_covariancia`` (array): array representando a matriz covariância. 
         * ``.matriz_correlcao``   (array): array representando a matriz dos coeficientes de correlação. 
-        * ``.regiao_abrangencia`` (list): lista representando os pontos pertencentes à região de abrangência.
+        * ``.regiao_abrangencia`` (array): matriz (número de pontos x NV) com os pontos pertencentes à região de abrangência.
         '''
 
         # ------------------------------------------------------------------------------------
@@ -217,14 +218,19 @@ class Grandeza:
                 * ``.matriz_estimativa`` (array): cada variável está alocada em uma coluna que contém suas observações.
                 * ``.vetor_estimativa``  (array): todas as observações de todas as variáveis estão em um único vetor.
                 * ``.matriz_incerteza``  (array): matriz em que cada coluna contém a incerteza de cada ponto de uma certeza variável.
-                * ``.matriz_covariancia`` (array): matriz de covariância.
-                * ``matriz_correlacao`` (array): matriz de correlação
+                * ``.covariancia`` (CovarianciaDiagonal, CovarianciaBaixoPosto ou array): representação armazenada da matriz \
+                de covariância. Quando informada a ``matriz_incerteza``, apenas as variâncias são armazenadas. Uma \
+                CovarianciaBaixoPosto (ex.: predição com covariância fatorada) é mantida na forma fatorada.
+                * ``.matriz_covariancia`` (array): matriz de covariância (densa, criada uma única vez sob demanda).
+                * ``matriz_correlacao`` (array): matriz de correlação (criada sob demanda)
+                * ``fatoracao``: fatoração da matriz de covariância (ver AlgebraLinear.fatorar), criada uma única vez sob demanda
                 * ``NE`` (float): número de observações (para cada grandeza)
 
             =======
             METODOS
             =======
                 * GETListas que retorna lista_estimativa, lista_incerteza, lista_variancia.
+                * faixaAbrangencia que retorna os limites inferior e superior da faixa de abrangência de cada ponto.
 
             ======
             Kwargs
@@ -244,7 +250,7 @@ class Grandeza:
                 raise SyntaxError(u'It is not possible to define the covariance matrix and the uncertainty matrix together. You have to choose between them.')
 
             if matriz_covariancia is not None:
-                if not isinstance(matriz_covariancia, ndarray):
+                if not isinstance(matriz_covariancia, (ndarray, CovarianciaDiagonal, CovarianciaBaixoPosto)):
                     raise TypeError(u'The input data must be arrays.')
 
             if matriz_incerteza is not None:
@@ -292,25 +298,27 @@ class Grandeza:
             # ---------------------------------------------------------------------------
             # CRIAÇÃO DA MATRIZ COVARIÂNCIA E MATRIZ INCERTEZA (ARRAYS)
             # ---------------------------------------------------------------------------
+            # Quando informada a matriz_incerteza, a covariância é diagonal e apenas as variâncias são armazenadas.
+            # A matriz densa só é criada quando o atributo matriz_covariancia for acessado.
             if matriz_incerteza is not None:
                 self.matriz_incerteza = matriz_incerteza
-                self.matriz_covariancia = diag(
-                    (self.matriz_incerteza ** 2).reshape((self.NE * self.matriz_incerteza.shape[1], 1),
-                                                         order='F').transpose().tolist()[0])
-                self.matriz_correlacao = matrizcorrelacao(self.matriz_covariancia)
+                self._covariancia = CovarianciaDiagonal(
+                    (self.matriz_incerteza ** 2).reshape((self.NE * self.matriz_incerteza.shape[1],), order='F'))
 
             elif matriz_covariancia is not None:
                 if NE is not None:
-                    self.matriz_covariancia = matriz_covariancia
-                    self.matriz_incerteza = (diag(self.matriz_covariancia)**0.5).reshape(
+                    self._covariancia = matriz_covariancia
+                    self.matriz_incerteza = (self._covariancia.diagonal()**0.5).reshape(
                         (NE, self.matriz_estimativa.shape[1]), order='F')
-                    self.matriz_correlacao = matrizcorrelacao(self.matriz_covariancia)
                 else:
                     raise ValueError(u'It is necessary to define the argument NE .')
             else:
-                self.matriz_covariancia = None
+                self._covariancia = None
                 self.matriz_incerteza = None
-                self.matriz_correlacao = None
+
+            # Fatoração e matriz densa de covariância (criadas sob demanda)
+            self._fatoracao = None
+            self._matriz_covariancia = None
 
             self._validar() #validação das incertezas
 
@@ -319,6 +327,38 @@ class Grandeza:
             # ---------------------------------------------------------------------
             self.gL = gL if len(gL) != 0 else [[100] * self.NE] * self.matriz_estimativa.shape[1]
 
+        @property
+        def covariancia(self):
+            # Representação armazenada da matriz de covariância: CovarianciaDiagonal ou array
+            return self._covariancia
+
+        @property
+        def matriz_covariancia(self):
+            # Matriz de covariância densa (criada uma única vez, no primeiro acesso, quando a covariância é diagonal ou fatorada)
+            if isinstance(self._covariancia, (CovarianciaDiagonal, CovarianciaBaixoPosto)):
+                if self._matriz_covariancia is None:
+                    self._matriz_covariancia = self._covariancia.toarray()
+                return self._matriz_covariancia
+            return self._covariancia
+
+        @property
+        def fatoracao(self):
+            # Fatoração da matriz de covariância: avaliada uma única vez e usada para resolver sistemas e formas quadráticas
+            if self._covariancia is None:
+                return None
+            if self._fatoracao is None:
+                self._fatoracao = fatorar(self._covariancia)
+            return self._fatoracao
+
+        @property
+        def matriz_correlacao(self):
+            # Matriz de correlação (avaliada sob demanda)
+            if self._covariancia is None:
+                return None
+            if isinstance(self._covariancia, CovarianciaDiagonal):
+                return eye(self._covariancia.shape[0])
+            return matrizcorrelacao(self.matriz_covariancia)
+
         def GETListas(self):
             # ---------------------------------------------------------------------
             # Criação dos atributos na forma de LISTAS
@@ -334,6 +374,20 @@ class Grandeza:
 
             return lista_estimativa, lista_incerteza, lista_variancia
 
+        def faixaAbrangencia(self, PA):
+            u"""
+            Limites inferior e superior da faixa de abrangência (estimativa -/+ t.incerteza), com o fator de abrangência
+            da distribuição t para a probabilidade PA e os graus de liberdade de cada ponto.
+
+            Retorna dois arrays (NE x NV), ou None caso a incerteza não esteja definida.
+            """
+            if self.matriz_incerteza is None:
+                return None
+
+            incerteza = fatorAbrangencia(PA, array(self.gL, dtype=float).transpose())*self.matriz_incerteza
+
+            return self.matriz_estimativa - incerteza, self.matriz_estimativa + incerteza
+
         def _validar(self):
             # TODO: Corrigir este teste
             # if (len(gL) != size(estimativa)) and (len(gL) != 0) :
@@ -344,11 +398,19 @@ class Grandeza:
             # ---------------------------------------------------------------------
             if self.matriz_incerteza is not None:
 
-                for elemento in diag(self.matriz_covariancia):
-                    if elemento <= 0.:
-                        raise TypeError('The variance of a quantity must be not equal to zero or negative.')
+                if (self._covariancia.diagonal() <= 0.).any():
+                    raise TypeError('The variance of a quantity must be not equal to zero or negative.')
 
-                if not isfinite(cond(self.matriz_covariancia)):
+                # Para covariância diagonal, o número de condição é avaliado em O(N). A covariância fatorada
+                # (CovarianciaBaixoPosto) não é invertida, e o número de condição não é avaliado (exigiria a matriz densa)
+                if isinstance(self._covariancia, CovarianciaDiagonal):
+                    numero_condicao = self._covariancia.cond()
+                elif isinstance(self._covariancia, CovarianciaBaixoPosto):
+                    numero_condicao = 1.
+                else:
+                    numero_condicao = cond(self._covariancia)
+
+                if not isfinite(numero_condicao):
                     raise TypeError('The covariance matrix of the quantity is singular.')
 
     def _SETdadosestimacao(self,estimativa,matriz_incerteza=None,matriz_covariancia=None,gL=[],NE=None,**kwargs):
@@ -431,8 +493,10 @@ class Grandeza:
 
         # regiao
         if regiao is not None:
-            if not isinstance(regiao,list):
-                raise TypeError(u'The region must be a list.')
+            if not isinstance(regiao,(list,ndarray)):
+                raise TypeError(u'The region must be a list or an array.')
+
+            regiao = array(regiao,dtype=float).reshape((-1,self.NV))
 
         # --------------------------------------
         # EXECUÇÃO
@@ -485,13 +549,11 @@ class Grandeza:
         limite_inferior = kwargs.get('limite_inferior') if kwargs.get('limite_inferior') is not None else self.limite_inferior
 
         # região de abrangência
-        if self.regiao_abrangencia is None:
-            regiao = [] # Caso a região não esteja definida, será utilizado uma lista para permitir o extend
-        else:
-            regiao = self.regiao_abrangencia
-
         if kwargs.get('regiao_abrangencia') is not None:
-            regiao.extend(kwargs.get('regiao_abrangencia'))
+            regiao = array(kwargs.get('regiao_abrangencia'),dtype=float).reshape((-1,self.NV))
+            # Caso a região já esteja definida, os novos pontos são acrescentados aos existentes
+            if self.regiao_abrangencia is not None:
+                regiao = vstack((self.regiao_abrangencia,regiao))
         else:
             regiao = self.regiao_abrangencia
 
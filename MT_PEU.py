@@ -12,22 +12,27 @@ Main class of the PEU calculation engine
 # ---------------------------------------------------------------------
 # Scientific calculations
 from numpy import array, size, linspace, min, max, copy,\
-    mean, nanmax, nanmin, arange,inf, reshape
+    mean, nanmax, nanmin, arange,inf, reshape, empty, array_split, vstack, isfinite, eye, zeros, hstack, savetxt
 from numpy.core.multiarray import ndarray
-from numpy.random import uniform, triangular
-from scipy.stats import f, t, chi2
+from numpy.lib.format import open_memmap
+from numpy.random import SeedSequence, default_rng
+from scipy.stats import f, chi2, qmc
 from scipy.special import factorial
-from numpy.linalg import inv
 from math import floor, log10
+from numbers import Integral
 #from threading import Thread
-from scipy import transpose, dot, concatenate, matrix
+from scipy import transpose, dot, matrix
 from scipy.optimize import  minimize, rosen, rosen_der
 # Operating System Packages
 from os import getcwd, sep
-from casadi import MX,DM,vertcat,horzcat,nlpsol,sum1,jacobian,hessian,mtimes,inv as inv_cas, diag,Function
+from casadi import MX,DM,vertcat,nlpsol,sum1,jacobian,hessian,mtimes,inv as inv_cas, diag,Function,\
+    reshape as reshape_cas
 # Exception Handling
 from warnings import warn
 import os
+# Parallel processing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 # System
 #TODO: CORRIGIR ENCONDING
@@ -38,10 +43,160 @@ import os
 # IMPORT OF OWN SUBROUTINES AND ADAPTATIONS (DEVELOPED BY GI-UFBA)
 # ----------------------------------------------------------------
 from Grandeza import Grandeza
-from subrotinas import Validacao_Diretorio, eval_cov_ellipse, WLS
+from subrotinas import Validacao_Diretorio, eval_cov_ellipse, WLS, amostragemMonteCarlo, CacheLRU, congelar, \
+    quantis, fatorAbrangencia, blocosArquivo, linhasArquivo
 from Graficos import Grafico
 from Relatorio import Report
 from Flag import flag
+from Compilacao import compilarFuncao, compilarSolver
+from AlgebraLinear import fatorar, CovarianciaBaixoPosto
+from GaussNewton import minimosQuadrados, relatorio as relatorioMinimosQuadrados, metodos as metodosMinimosQuadrados
+from Preditor import prever, exportar
+
+# ----------------------------------------------------------------
+# PROCESS-WIDE CACHE OF CASADI OBJECTS
+# ----------------------------------------------------------------
+# Solvers (nlpsol) and derivative functions (Hessiana, Gy, S) depend only on the model and on the shape of the
+# problem (the data are inputs), so they are shared by all estimators of the process. The key is formed by the
+# model (function object), NE, number of x, number of y, number of parameters, the evaluation of the pointwise
+# model and the compilation (and, for solvers, the algorithm and its options). The model must not depend on global variables that change between estimations.
+# Use cacheCasadi.limpar() to discard the stored objects.
+cacheCasadi = CacheLRU(tamanho_maximo=128)
+
+# ----------------------------------------------------------------
+# AUXILIARY FUNCTIONS (ALSO EXECUTED BY THE WORKERS OF THE PROCESS POOL)
+# ----------------------------------------------------------------
+def avaliarFuncaoMapeada(funcao, valores, amostras, mapeadas, tamanho_lote=1000):
+    u"""
+    avaliarFuncaoMapeada(funcao, valores, amostras, mapeadas, tamanho_lote=1000)
+
+    ==================================================================
+     Evaluates a casadi function f(param, values) for a batch of parameters
+    ==================================================================
+
+    - Parameters
+    ------------
+    funcao : casadi.Function
+        Function with inputs (parameters, values) and scalar output (e.g. the objective function)
+    valores : DM or array
+        Values shared by all evaluations (experimental data)
+    amostras : array
+        Matrix (number of samples x NP) with the parameter values
+    mapeadas : dict
+        Mapped functions already built, by size. Updated with the functions built in this call.
+    tamanho_lote : int
+        Maximum number of samples evaluated in each call of the mapped function
+
+    - Returns
+    ---------
+    resultado : array
+        Function value for each sample
+    """
+    amostras = array(amostras, dtype=float, ndmin=2)
+    resultado = empty(amostras.shape[0])
+
+    for inicio in range(0, amostras.shape[0], tamanho_lote):
+        bloco = amostras[inicio:inicio+tamanho_lote]
+
+        if bloco.shape[0] not in mapeadas:
+            mapeadas[bloco.shape[0]] = funcao.map(funcao.name()+'_Map', 'serial', bloco.shape[0], [1], [])
+
+        resultado[inicio:inicio+bloco.shape[0]] = array(mapeadas[bloco.shape[0]](bloco.T, valores)).ravel()
+
+    return resultado
+
+def avaliarFuncaoSerializada(funcao_serializada, valores, amostras):
+    u"""
+    Evaluates a serialized casadi function (see avaliarFuncaoMapeada) for a batch of parameters. Used to send the
+    objective function to the workers of the process pool.
+    """
+    return avaliarFuncaoMapeada(Function.deserialize(funcao_serializada), valores, amostras, {})
+
+def _mapeamentoMonteCarlo(avaliador, estimativa, limite_inferior, limite_superior, fator_simetria, iteracoes, semente):
+    u"""
+    Executes a shard of the Monte Carlo objective function mapping (process pool worker).
+
+    The objective function is evaluated by avaliador (picklable callable, see EstimacaoNaoLinear._avaliadorFuncaoObjetivo)
+    and the samples are generated with an independent random stream created from the seed (numpy.random.SeedSequence).
+    """
+    amostras = amostragemMonteCarlo(estimativa, limite_inferior, limite_superior, fator_simetria, iteracoes,
+                                    default_rng(semente))
+
+    return amostras, avaliador(amostras)
+
+def resultadoOtimizacao(estatisticas, solucao, inicio):
+    u"""
+    Summary (dict) of a solution of the optimization problem, used to compare the starts of the multi-start
+    optimization: initial estimative, estimative, objective function value and solver statistics (dict).
+    """
+    return {'initial_estimative': [float(valor) for valor in inicio],
+            'estimative': [float(valor) for valor in array(solucao['x']).ravel()],
+            'FO': float(solucao['f']),
+            'success': bool(estatisticas.get('success', True)),
+            'return_status': estatisticas.get('return_status'),
+            'iterations': estatisticas.get('iter_count'),
+            'time': estatisticas.get('t_wall_total')}
+
+def solucaoOtimizacao(estatisticas, solucao):
+    u"""
+    Solution of the optimization problem (x, f, lam_x, lam_g and the solver statistics in stats), as arrays, stored
+    for each start of the multi-start optimization (the one of the best start is kept in the attribute Otimizacao).
+    """
+    resultado = {chave: array(solucao[chave]).ravel() for chave in ('x', 'lam_x', 'lam_g')}
+    resultado.update({'f': float(solucao['f']), 'stats': estatisticas})
+    if 'historico' in solucao:
+        resultado['historico'] = solucao['historico']
+    return resultado
+
+def relatorioMultiStart(resultados, melhor, arquivo):
+    u"""
+    Writes the report of the multi-start optimization (summary of each start, see resultadoOtimizacao) in the file
+    (text). The start whose solution was kept (melhor) is marked.
+    """
+    with open(arquivo, 'w') as saida:
+        saida.write('Multi-start optimization: {} starts\n\n'.format(len(resultados)))
+        saida.write('{:>6s} {:>24s} {:>8s} {:>6s}  {}\n'.format('start', 'objective', 'success', 'iter', 'return status'))
+        for i, resultado in enumerate(resultados):
+            saida.write('{:6d} {:24.16e} {:>8s} {:>6s}  {}{}\n'.format(i, resultado['FO'], str(resultado['success']),
+                                                                       str(resultado['iterations']), resultado['return_status'],
+                                                                       ' (best)' if i == melhor else ''))
+        saida.write('\nInitial estimative......: {}\n'.format(', '.join('{:.16e}'.format(valor) for valor in resultados[melhor]['initial_estimative'])))
+        saida.write('Parameters..............: {}\n'.format(', '.join('{:.16e}'.format(valor) for valor in resultados[melhor]['estimative'])))
+        saida.write('Objective...............: {:.16e}\n'.format(resultados[melhor]['FO']))
+
+def _otimizacaoMultiStart(funcao_serializada, valores, algoritmo, opcoes, inicios, limite_inferior, limite_superior):
+    u"""
+    Solves the optimization problem from each start of a shard of the multi-start optimization (process pool worker).
+
+    The solver is built once from the serialized objective function (inputs: parameters and data). For the least
+    squares algorithms (gauss-newton, lm), the serialized function is the one of the residuals (their jacobian is
+    built from it).
+
+    Returns a list with the summary (see resultadoOtimizacao) and the solution (see solucaoOtimizacao) of each start.
+    """
+    funcao = Function.deserialize(funcao_serializada)
+
+    if algoritmo in metodosMinimosQuadrados:
+        parametros = MX.sym('x', funcao.size1_in(0))
+        dados = MX.sym('p', funcao.size1_in(1))
+        jacobiana = Function('Jacobiana_Residuos', [parametros, dados], [jacobian(funcao(parametros, dados), parametros)])
+        solucoes = [minimosQuadrados(lambda parametros: funcao(parametros, valores),
+                                     lambda parametros: jacobiana(parametros, valores), inicio, limite_inferior,
+                                     limite_superior, algoritmo) for inicio in inicios]
+        return [(resultadoOtimizacao(solucao['stats'], solucao, inicio), solucaoOtimizacao(solucao['stats'], solucao))
+                for solucao, inicio in zip(solucoes, inicios)]
+
+    parametros = MX.sym('x', funcao.size1_in(0))
+    dados = MX.sym('p', funcao.size1_in(1))
+    S = nlpsol('S', algoritmo, {'x': parametros, 'p': dados, 'f': funcao(parametros, dados)}, opcoes)
+
+    resultados = []
+    for inicio in inicios:
+        solucao = S(x0=inicio, p=valores, lbx=limite_inferior, ubx=limite_superior)
+        estatisticas = S.stats()
+        resultados.append((resultadoOtimizacao(estatisticas, solucao, inicio), solucaoOtimizacao(estatisticas, solucao)))
+
+    return resultados
 
 class EstimacaoNaoLinear:
 
@@ -321,6 +476,8 @@ class EstimacaoNaoLinear:
 
             -The definition of the variables of the model must be in accordance with the order in which
             the experimental data are informed in the "setDados" method.
+
+            -With the keyword pointwise=True, the model is evaluated for a single point (see pointwise keyword).
         **symbols_y : list**
             list with the symbols of the dependent quantities (No special characters allowed).
         **symbols_x : list**
@@ -355,6 +512,24 @@ class EstimacaoNaoLinear:
             list with the symbols of the parameters in latex format.
         **base_path : string**
             defines the directory to store the files generated by the calculation engine
+        **compilation : bool**
+            if True, the objective function, its derivatives and the functions used by the optimizer are converted
+            to C code and compiled with the local C compiler (gcc, cc or clang). With pointwise=True, only the model
+            of a single point (and its derivatives) is compiled: the library does not depend on the number of data
+            and is reused when data are appended (see setConjunto). Default: False.
+        **compilation_path : string**
+            directory where the compiled libraries are stored. They are identified by a hash of the functions and
+            reused by later executions. Default: MT_PEU_compilacao folder in the temporary directory of the system.
+        **pointwise : bool**
+            if True, the model is written for a single experimental point: x is a row (1 x number of x) and the model
+            returns the values of the dependent quantities of that point. The model is lifted over the data with
+            casadi's Function.map, so the size of the symbolic graph does not depend on the number of data. Default: False.
+        **parallelization : string**
+            evaluation of the pointwise model over the data: 'serial' or 'thread'. Default: 'serial'.
+            The threads are created at each evaluation, so 'thread' is only advantageous for expensive models or
+            large data sets. The pointwise model is faster when combined with compilation=True.
+        **threads : int**
+            maximum number of threads used when parallelization is 'thread'. Default: defined by casadi.
 
         - **Class Methods**
         -------------------
@@ -473,7 +648,8 @@ class EstimacaoNaoLinear:
         # ---------------------------------------------------------------------
         # Available Keywords for the input method
         self.__keywordsEntrada = ('names_x', 'units_x', 'label_latex_x', 'names_y', 'units_y', 'label_latex_y',
-                                  'names_param','units_param', 'label_latex_param', 'base_path')
+                                  'names_param','units_param', 'label_latex_param', 'base_path', 'compilation',
+                                  'compilation_path', 'pointwise', 'parallelization', 'threads')
 
         # Validation to check if keywords were typed incorrectly:
         keyincorreta = [key for key in kwargs.keys() if not key in self.__keywordsEntrada]
@@ -499,6 +675,26 @@ class EstimacaoNaoLinear:
                                                                                   str):
             raise TypeError('The keyword {} must be a string.'.format(self.__keywordsEntrada[9]))
 
+        # Check if compilation is a boolean
+        if kwargs.get(self.__keywordsEntrada[10]) is not None and not isinstance(kwargs.get(self.__keywordsEntrada[10]), bool):
+            raise TypeError('The keyword {} must be a boolean.'.format(self.__keywordsEntrada[10]))
+
+        # Check if compilation_path is a string
+        if kwargs.get(self.__keywordsEntrada[11]) is not None and not isinstance(kwargs.get(self.__keywordsEntrada[11]), str):
+            raise TypeError('The keyword {} must be a string.'.format(self.__keywordsEntrada[11]))
+
+        # Check if pointwise is a boolean
+        if kwargs.get(self.__keywordsEntrada[12]) is not None and not isinstance(kwargs.get(self.__keywordsEntrada[12]), bool):
+            raise TypeError('The keyword {} must be a boolean.'.format(self.__keywordsEntrada[12]))
+
+        # Check if parallelization is available
+        if kwargs.get(self.__keywordsEntrada[13]) is not None and kwargs.get(self.__keywordsEntrada[13]) not in ('serial', 'thread'):
+            raise ValueError('The keyword {} must be serial or thread.'.format(self.__keywordsEntrada[13]))
+
+        # Check if threads is a positive integer
+        if kwargs.get(self.__keywordsEntrada[14]) is not None and (not isinstance(kwargs.get(self.__keywordsEntrada[14]), Integral) or kwargs.get(self.__keywordsEntrada[14]) < 1):
+            raise ValueError('The keyword {} must be a positive integer.'.format(self.__keywordsEntrada[14]))
+
         # ---------------------------------------------------------------------
         # INITIALIZATION OF QUANTITIES
         # ---------------------------------------------------------------------
@@ -530,15 +726,30 @@ class EstimacaoNaoLinear:
         # Model
         self.__modelo    = Model
         # Optimization algorithm position history (parameters) (used in optimizes and / or objective function mapping
-        self.__decisonVariablesMapped = []
+        # Stored in a preallocated array (samples x NV), grown on demand (see __armazenarMapeamento)
+        self.__decisonVariablesMapped = empty((0, self.parametros.NV))
         # Fitness history (objective function value) of the optimization algorithm (used in optimizing and / or objective function mapping)
-        self.__OFMapped = []
+        self.__OFMapped = empty(0)
+        # Number of points stored in the history (the capacity of the arrays may be greater)
+        self.__nMapped = 0
         # Base path for the files, if the base_path keyword is defined it will be used.
         if kwargs.get(self.__keywordsEntrada[9]) is None:
             self.__base_path = getcwd()+ sep +str(Folder)+sep
         else:
             self.__base_path = kwargs.get(self.__keywordsEntrada[9])
 
+        # Pointwise model: function for a single point (built once) and its maps over the data, by NE
+        self.__pontual = kwargs.get(self.__keywordsEntrada[12]) is True
+        self.__paralelizacao = kwargs.get(self.__keywordsEntrada[13]) if kwargs.get(self.__keywordsEntrada[13]) is not None else 'serial'
+        self.__threads = kwargs.get(self.__keywordsEntrada[14])
+        self.__modeloPonto = None
+        self.__modeloPontoMapeado = {}
+        # Compilation of the casadi functions (C code) and directory of the compiled libraries
+        self.__compilacao = kwargs.get(self.__keywordsEntrada[10]) is True
+        self.__diretorioCompilacao = kwargs.get(self.__keywordsEntrada[11])
+        # Warm start of the optimization: previous optimum and multipliers, kept when estimation data are appended
+        self.__inicioQuente = None
+
         # Flags for information control
         self.__flag = flag()
         self.__flag.setCaracteristica(['dadosestimacao','dadospredicao',
@@ -579,7 +790,7 @@ class EstimacaoNaoLinear:
     @property
     def __AlgoritmosOtimizacao(self):
         # Availabe optimization algorithm
-        return ('ipopt', 'bonmin', 'sqpmethod')
+        return ('ipopt', 'bonmin', 'sqpmethod') + metodosMinimosQuadrados
 
     @property
     def __tipoGraficos(self):
@@ -783,9 +994,9 @@ class EstimacaoNaoLinear:
         # graus de liberdade devem ser passados por aqui
 
 
-    def setConjunto(self,glx=[],gly=[],dataType=None,uxy=None):
+    def setConjunto(self,glx=[],gly=[],dataType=None,uxy=None,append=False):
         u"""
-        setConjunto(self,glx=[],gly=[],dataType=None,uxy=None)
+        setConjunto(self,glx=[],gly=[],dataType=None,uxy=None,append=False)
         
         ===================================================================================
         Method for including the estimation data. It must be run after the setDados method.
@@ -809,12 +1020,18 @@ class EstimacaoNaoLinear:
                          In this case, the parameters are already known.
             ============ =================================================================
         uxy : not in use
+        append : bool, optional
+            if True and estimation data were already defined, the new data (dataType 'estimacao') are appended to
+            the current estimation set. The flux is restarted, but the optimum of the previous estimation (and the
+            multipliers of the optimizer) is kept as a warm start: optimize may then be executed without an initial
+            estimative. Default: False.
 
 
         - Notes
         -------
 
-        -If the dataType argument was not defined the method defines automatically as 'estimacao' or 'predicao'.
+        -If the dataType argument was not defined the method defines automatically as 'estimacao' or 'predicao'
+        ('estimacao' when append is True).
 
         -If the prediction data was not defined the method define dataType as 'estimacao'.
 
@@ -848,13 +1065,39 @@ class EstimacaoNaoLinear:
         # ---------------------------------------------------------------------
 
         if dataType is None:
-            if not self.__flag.info['dadosestimacao']:
+            if not self.__flag.info['dadosestimacao'] or append:
                 dataType = self.__tiposDisponiveisEntrada[0]
             else:
                 dataType = self.__tiposDisponiveisEntrada[1]
 
         # experimental data
         if dataType == self.__tiposDisponiveisEntrada[0]:
+            if append and self.__flag.info['dadosestimacao']:
+                # The new data (and their degrees of freedom, 100 if not informed) are appended to the current
+                # estimation data
+                NE = self.__ytemp.shape[0]
+                glx = [list(antigo) + list(novo) for antigo, novo in
+                       zip(self.x.estimacao.gL, glx if len(glx) != 0 else [[100]*NE]*self.x.NV)]
+                gly = [list(antigo) + list(novo) for antigo, novo in
+                       zip(self.y.estimacao.gL, gly if len(gly) != 0 else [[100]*NE]*self.y.NV)]
+
+                self.__xtemp = vstack((self.x.estimacao.matriz_estimativa, self.__xtemp))
+                self.__uxtemp = vstack((self.x.estimacao.matriz_incerteza, self.__uxtemp))
+                self.__ytemp = vstack((self.y.estimacao.matriz_estimativa, self.__ytemp))
+                self.__uytemp = vstack((self.y.estimacao.matriz_incerteza, self.__uytemp))
+
+                # The previous optimum and multipliers are kept as a warm start for optimize (without an optimum,
+                # a warm start of an earlier estimation is discarded)
+                if self.__controleFluxo.otimizacao:
+                    self.__inicioQuente = {'x0': self.Otimizacao['x'], 'lam_x0': self.Otimizacao['lam_x'],
+                                           'lam_g0': self.Otimizacao['lam_g']}
+                else:
+                    self.__inicioQuente = None
+                # The information about the parameters refers to the previous data
+                self.__controleFluxo.reiniciar()
+            else:
+                self.__inicioQuente = None
+
             self.__flag.ToggleActive('dadosestimacao')
 
             # if flux ID is equal to zero, so it's not necessary to restart, otherwise, restart.
@@ -930,122 +1173,151 @@ class EstimacaoNaoLinear:
         Symbolic variables creation.
         ============================
 
+        - Notes
+        -------
+
+        Each block of variables (xo, xr, yo, y and Uyo) is created as a single vector-valued symbol. The matrix
+        of independent quantities passed to the model is a reshaped view (column-major, the same order of
+        vetor_estimativa) of the xo block, so the construction time grows linearly with the number of data.
+
         """
 
         # --------------------------------------------------------------------------------
         # CREATION OF CASADI'S VARIABLES THAT WILL BE USED TO BUILD THE CASADI'S MODEL
         # --------------------------------------------------------------------- ----------
+        # if no prediction data were entered, then estimation is being performed and
+        # estimation data should be used
+        dados = self.__tiposDisponiveisEntrada[0] if not self.__flag.info['dadospredicao'] else self.__tiposDisponiveisEntrada[1]
+
+        # it's necessary to define a new model for prediction data because the
+        # prediction data size could be different of the estimation data size
+        NE = getattr(self.y, dados).NE
+
+        # Creation of parameters in casadi's format
+        self.__symParam = vertcat(*[MX.sym(simbolo) for simbolo in self.parametros.simbolos])
+
+        # Creation of independent variables in casadi's format
+        self.__symXo  = MX.sym('xo', NE*self.x.NV)
+        self.__symXr  = MX.sym('xr', NE*self.x.NV)
+        self.__symUxo = []
+        # matrix (NE x NV) of the independent variables that is passed to the model
+        xmodel = reshape_cas(self.__symXo, NE, self.x.NV)
+
+        if self.__flag.info['Linear'] and self.__flag.info['calc_termo_independente']:
+            # Testing if it's a linear case with independent term calculation
+            valores_x = getattr(self.x, dados).vetor_estimativa[:NE]  # para não trazer a coluna de '1' como dado de entrada
+        else:
+            valores_x = getattr(self.x, dados).vetor_estimativa
+
+        # Creation of dependent variables in casadi's format
+        self.__symYo   = MX.sym('yo', NE*self.y.NV)
+        self.__symYest = MX.sym('y', NE*self.y.NV)
+
+        # Creation of uncertainties of dependent variables in casadi's format
+        self.__symUyo  = MX.sym('Uyo', NE*self.y.NV)
+
+        self.__symVariables = vertcat(self.__symXo, self.__symYo, self.__symUyo)
+        self._values = vertcat(valores_x, getattr(self.y, dados).vetor_estimativa,
+                               getattr(self.y, dados).matriz_incerteza.reshape(NE*self.y.NV, 1))
+
+        # Key of the model functions in the process cache (see __chave)
+        self.__chaveModelo = self.__chave(NE)
+
+        # Model definition
+        if self.__pontual:
+            # The pointwise model is mapped over the rows of xmodel (horizontally concatenated). The output
+            # (NY x NE) is transposed and vectorized (column-major), in the same order of vetor_estimativa
+            modelo = self.__modeloPontualMapeado(NE)(self.__symParam, reshape_cas(xmodel.T, 1, NE*self.x.NV))
+            self.__symModel = reshape_cas(modelo.T, NE*self.y.NV, 1)  # Symbolic
+        else:
+            self.__symModel = self.__modelo(self.__symParam, xmodel, NE)  # Symbolic
+        self.__excModel = Function('Model', [self.__symParam, self.__symVariables], [self.__symModel])  # Executable
+        # Derivatives evaluated for the previous data are discarded (see _derivadas)
+        self.__derivadasAvaliadas = {}
 
         if not self.__flag.info['dadospredicao']:
-            # if no prediction data were entered, then estimation is being performed and
-            # estimation data should be used
+            # Objective function definition
+            self.__symObjectiveFunction = sum1(((self.__symYo - (self.__symModel)) ** 2) / (self.__symUyo ** 2))  # Symbolic
+            # Key of the objective function (and its derivatives and solvers) in the process cache
+            self.__chaveObjetivo = self.__chaveModelo
+            self._excObjectiveFunction = self.__funcaoCasadi('Objective_Function', self.__chaveObjetivo,
+                                                             lambda: Function('Objective_Function', [self.__symParam, self.__symVariables],
+                                                                              [self.__symObjectiveFunction]))  # Executable
+            # Objective function mapped over batches of parameters (built on demand, see _avaliarFuncaoObjetivo)
+            self.__excObjectiveFunctionMapeada = {}
+
+    def __modeloPontualMapeado(self, NE):
+        u"""
+        __modeloPontualMapeado(self, NE)
 
-            self.__symXr   = []; self.__symUxo = [] # x
-            self.__symYo    = []; self.__symYest = []; self.__symUyo = []
-            self.__symParam = []
+        ======================================================
+         Returns the pointwise model mapped over NE points
+        ======================================================
 
-            self.__symVariables  = []
-            self._values         = []
+        - Notes
+        -------
+        The function for a single point (inputs: parameters and x as a row 1 x NX; output: NY x 1) is built once.
+        Its map (casadi's Function.map, parameters shared by all points) has inputs parameters and x (1 x NE*NX)
+        and output NY x NE. The maps are stored by NE.
+        """
+        if self.__modeloPonto is None:
+            self.__modeloPonto = self.__funcaoModeloPonto()
+            # The compiled function of a single point (with its derivatives) is reused for any number of data
+            if self.__compilacao:
+                self.__modeloPonto = compilarFuncao(self.__modeloPonto, self.__diretorioCompilacao, derivadas=True)
 
-            # Creation of parameters in casadi's format
-            for i in range(self.parametros.NV):
-                self.__symParam = vertcat(self.__symParam,MX.sym(self.parametros.simbolos[i]))
-
-            # Creation of independent variables in casadi's format
-            xmodel = []
-            for j in range(self.x.NV):
-                self.__symXo = []
-                for i in range(self.x.estimacao.NE):
-                    self.__symXo = vertcat(self.__symXo, MX.sym('xo' + str(j + 1) + '_' + str(i)))
-                    self.__symXr = vertcat(self.__symXr, MX.sym('xr' + str(j + 1) + '_' + str(i)))
-                xmodel = horzcat(xmodel,self.__symXo)
-                self.__symVariables = vertcat(self.__symVariables, self.__symXo)
-            if self._EstimacaoNaoLinear__flag.info['Linear']:
-                if self._EstimacaoNaoLinear__flag.info['calc_termo_independente']: # Testing if it's a linear case with independent term calculation
-                    self._values = vertcat(self._values, self.x.estimacao.vetor_estimativa[
-                                                         :self.x.estimacao.NE])  # para não trazer a coluna de '1' como dado de entrada
-                else:
-                    self._values = vertcat(self._values, self.x.estimacao.vetor_estimativa)
-            else:
-                self._values = vertcat(self._values, self.x.estimacao.vetor_estimativa)
+        if NE not in self.__modeloPontoMapeado:
+            opcoes = {'max_num_threads': self.__threads} if self.__threads is not None else {}
+            self.__modeloPontoMapeado[NE] = self.__modeloPonto.map('Model_Map', self.__paralelizacao, NE, [0], [], opcoes)
 
-            # Creation of dependent variables in casadi's format
-            for j in range(self.y.NV):
-                for i in range(self.y.estimacao.NE):
-                    self.__symYo = vertcat(self.__symYo,MX.sym('yo'+str(j+1)+'_'+str(i)))
-                    self.__symYest = vertcat(self.__symYest,MX.sym('y'+str(j+1)+'_'+str(i)))
-            self.__symVariables = vertcat(self.__symVariables, self.__symYo)
-            self._values = vertcat(self._values, self.y.estimacao.vetor_estimativa)
+        return self.__modeloPontoMapeado[NE]
 
-            # Creation of uncertainties of dependent variables in casadi's format
-            for j in range(self.y.NV):
-                for i in range(self.y.estimacao.NE):
-                    self.__symUyo = vertcat(self.__symUyo, MX.sym('Uyo'+str(j+1)+'_'+str(i)))
-            self.__symVariables = vertcat(self.__symVariables, self.__symUyo)
-            self._values = vertcat(self._values,
-                                   self.y.estimacao.matriz_incerteza.reshape(self.y.estimacao.NE*self.y.NV,1))
+    def __funcaoModeloPonto(self):
+        u"""
+        Function of the model for a single point (inputs: parameters and x as a row 1 x NX; output: NY x 1).
+        """
+        param = MX.sym('param', self.parametros.NV)
+        x = MX.sym('x', 1, self.x.NV)
+        return Function('Model_Point', [param, x], [reshape_cas(self.__modelo(param, x, 1), self.y.NV, 1)])
 
-            # Model definition
+    def __chave(self, NE):
+        u"""
+        Key of the model functions for NE points in the process cache: model identity, problem shape, evaluation of
+        the pointwise model and compilation (keyword and directory). Estimators of the same model that differ in the
+        evaluation or in the compilation do not share functions.
+        """
+        return (self.__modelo, NE, self.x.NV, self.y.NV, self.parametros.NV,
+                (self.__paralelizacao, self.__threads) if self.__pontual else None,
+                (self.__compilacao, self.__diretorioCompilacao))
 
-            self.__symModel = self.__modelo(self.__symParam, xmodel, self.y.estimacao.NE)  # Symbolic
-            self.__excModel = Function('Model', [self.__symParam, self.__symVariables],[self.__symModel])  # Executable
+    def __funcaoCasadi(self, nome, chave, criar):
+        u"""
+        __funcaoCasadi(self, nome, chave, criar)
 
-            # Objective function definition
-            self.__symObjectiveFunction = sum1(((self.__symYo - (self.__symModel)) ** 2) / (self.__symUyo ** 2))  # Symbolic
-            self._excObjectiveFunction = Function('Objective_Function', [self.__symParam, self.__symVariables],
-                                                  [self.__symObjectiveFunction])  # Executable
+        ===================================================================
+         Returns a casadi function from the process cache (see cacheCasadi)
+        ===================================================================
 
-        else:
-            self.__symParam = [];
-            self.__symXr    = []; self.__symUxo = []  # x
-            self.__symYo    = []; self.__symYest = []; self.__symUyo = []
+        - Parameters
+        ------------
+        nome : string
+            name of the function (part of the key in the cache)
+        chave : tuple
+            key of the model (see __chave)
+        criar : callable
+            creates the function, if it is not in the cache
 
-            self.__symVariables = []
-            self._values = []
+        - Notes
+        -------
+        If the compilation keyword is True, the function is compiled (see Compilacao.compilarFuncao). With the
+        pointwise model, the function is not compiled: it evaluates the compiled model of a single point
+        (see __modeloPontualMapeado), so no compilation is needed when the number of data changes.
+        """
+        if self.__compilacao and not self.__pontual:
+            return cacheCasadi.obter((nome, 'compilado', self.__diretorioCompilacao) + chave,
+                                     lambda: compilarFuncao(criar(), self.__diretorioCompilacao))
 
-            # Creation of parameters in casadi's format
-            for i in range(self.parametros.NV):
-                self.__symParam = vertcat(self.__symParam, MX.sym(self.parametros.simbolos[i]))
-
-            # Creation of independent variables in casadi's format
-            xmodel = []
-            for j in range(self.x.NV):
-                self.__symXo = []
-                for i in range(self.x.predicao.NE):
-                    self.__symXo = vertcat(self.__symXo, MX.sym('xo' + str(j + 1) + '_' + str(i)))
-                    self.__symXr = vertcat(self.__symXr, MX.sym('xr' + str(j + 1) + '_' + str(i)))
-                xmodel = horzcat(xmodel, self.__symXo)
-                self.__symVariables = vertcat(self.__symVariables, self.__symXo)  #
-            if self._EstimacaoNaoLinear__flag.info['Linear']:
-                if self._EstimacaoNaoLinear__flag.info['calc_termo_independente']:  # Testing if it's a linear case with independent term calculation
-                    self._values = vertcat(self._values, self.x.predicao.vetor_estimativa[
-                                                         :self.x.predicao.NE])  # para não trazer a coluna de '1' como dado de entrada
-                else:
-                    self._values = vertcat(self._values, self.x.predicao.vetor_estimativa)
-            else:
-                self._values = vertcat(self._values, self.x.predicao.vetor_estimativa)
-
-            # Creation of dependent variables in casadi's format
-            for j in range(self.y.NV):
-                for i in range(self.y.predicao.NE):
-                    self.__symYo = vertcat(self.__symYo, MX.sym('yo' + str(j + 1) + '_' + str(i)))
-                    self.__symYest = vertcat(self.__symYest, MX.sym('y' + str(j + 1) + '_' + str(i)))
-            self.__symVariables = vertcat(self.__symVariables, self.__symYo)
-            self._values = vertcat(self._values, self.y.predicao.vetor_estimativa)
-
-            # Creation of uncertainties of dependent variables in casadi's format
-            for j in range(self.y.NV):
-                for i in range(self.y.predicao.NE):
-                    self.__symUyo = vertcat(self.__symUyo, MX.sym('Uyo' + str(j + 1) + '_' + str(i)))
-            self.__symVariables = vertcat(self.__symVariables, self.__symUyo)
-            self._values = vertcat(self._values,
-                                   self.y.predicao.matriz_incerteza.reshape(self.y.predicao.NE * self.y.NV, 1))
-
-            # Model definition
-            # it's necessary to define a new model because the
-            # prediction data size could be different of the estimation data size
-            self.__symModel = self.__modelo(self.__symParam, xmodel, self.y.predicao.NE)  # Symbolic
-            self.__excModel = Function('Model', [self.__symParam, self.__symVariables], [self.__symModel])  # Executable
+        return cacheCasadi.obter((nome,) + chave, criar)
 
     def _armazenarDicionario(self):
         u"""
@@ -1136,9 +1408,9 @@ class EstimacaoNaoLinear:
 
         return grandeza
 
-    def optimize(self, initial_estimative, lower_bound=-inf, upper_bound=inf, algorithm ='ipopt', optimizationReport = True, parametersReport = False):
+    def optimize(self, initial_estimative=None, lower_bound=-inf, upper_bound=inf, algorithm ='ipopt', optimizationReport = True, parametersReport = False, **kwargs):
         u"""
-        optimize(self, initial_estimative, lower_bound=-inf, upper_bound=inf, algorithm ='ipopt', optimizationReport = True, parametersReport = False)
+        optimize(self, initial_estimative=None, lower_bound=-inf, upper_bound=inf, algorithm ='ipopt', optimizationReport = True, parametersReport = False, **kwargs)
 
         ==============================
         Solve the optimization problem.
@@ -1148,7 +1420,9 @@ class EstimacaoNaoLinear:
         ------------
 
         initial_estimative : list
-            list with the initial estimates for the parameters.
+            list with the initial estimates for the parameters, or a list of such lists (multi-start optimization).
+            It may be omitted after estimation data are appended (see setConjunto, append=True): the optimizer is
+            then warm started from the previous optimum and its multipliers.
         lower_bound : list, optional
             list with the lower bounds for the parameters.
         upper_bound : list, optional
@@ -1162,19 +1436,43 @@ class EstimacaoNaoLinear:
             ipopt                https://github.com/coin-or/Ipopt
             bonmin               https://github.com/coin-or/Bonmin
             sqpmethod            http://casadi.sourceforge.net/v1.9.0/api/html/de/dd4/classCasADi_1_1SQPMethod.html
+            gauss-newton         Gauss-Newton (GaussNewton.minimosQuadrados)
+            lm                   Levenberg-Marquardt (GaussNewton.minimosQuadrados)
             ==================== ===================================================
 
+            gauss-newton and lm work on the vector of weighted residuals (yo - model)/Uyo and its jacobian: each
+            iteration solves a linear least squares problem, without the Hessian of the objective function. The
+            bounds are handled by projection.
+
         optimizationReport : bool, optional
             informs whether the optimization report should be created.
         parametersReport : bool, optional
             informs whether the parameters report should be created.
 
+        - Keywords
+        -----------
+
+        starts : int
+            number of starts generated by Latin hypercube sampling within lower_bound and upper_bound (which must be
+            defined for all parameters). The initial estimatives informed, if any, are also used as starts.
+        workers : int
+            number of processes among which the starts are divided. If not defined, the starts are solved in the
+            current process.
+        seed : int
+            seed of the Latin hypercube sampling.
+
         - Notes
         -------
 
         -Before executing the optimize method it's necessary to execute the "setConjunto" method
          and define the estimation data.
 
+        -Multi-start optimization: the problem is solved from each start and the one with the lowest objective
+         function (among the successful solutions, if any) is stored in the attribute Otimizacao (it is not solved
+         again). The summary of all starts (initial estimative, estimative, objective function, success, return status,
+         iterations and time) is stored in the attribute OtimizacaoMultiStart and, with optimizationReport, written
+         in the optimization report.
+
         -Every time the optimization method is run, the information about the parameters is lost.
         """
         # ---------------------------------------------------------------------
@@ -1203,13 +1501,51 @@ class EstimacaoNaoLinear:
                 'The algorithm option {} is not right. Available algorithms: '.format(algorithm) + ', '.join(
                     self.__AlgoritmosOtimizacao) + '.')
 
+        # keywords validation
+        kwargsdisponiveis = ('starts', 'workers', 'seed')
+        if not set(kwargs.keys()).issubset(kwargsdisponiveis):
+            raise NameError('Error in the keywords typed. keywords available: ' + ', '.join(kwargsdisponiveis) + '.')
+
+        if kwargs.get(kwargsdisponiveis[0]) is not None:
+            if not isinstance(kwargs.get(kwargsdisponiveis[0]), Integral) or kwargs.get(kwargsdisponiveis[0]) < 1:
+                raise ValueError('The number of starts must be a positive integer.')
+
+        if kwargs.get(kwargsdisponiveis[1]) is not None:
+            if not isinstance(kwargs.get(kwargsdisponiveis[1]), Integral) or kwargs.get(kwargsdisponiveis[1]) < 1:
+                raise ValueError('The number of workers must be a positive integer.')
+
+        # warm start from the previous optimum (estimation data appended)
+        inicioQuente = self.__inicioQuente if initial_estimative is None and kwargs.get('starts') is None else None
+        if inicioQuente is not None:
+            initial_estimative = [float(valor) for valor in array(inicioQuente['x0']).ravel()]
+
         # validation of the initial estimative:
-        if initial_estimative is None:
+        if initial_estimative is None and kwargs.get('starts') is None:
             raise SyntaxError('To execute the optimize method it is necessary to give an initial estimative')
-        if not isinstance(initial_estimative, list) or len(initial_estimative) != self.parametros.NV:
-            raise TypeError(
-                'The initial estimative must be a list with the size of the number of parameters, defined in the symbols. Number of parameters: {}'.format(
-                    self.parametros.NV))
+
+        # list of starts: initial estimatives informed (one or a list of them) and the ones generated by Latin hypercube sampling
+        if initial_estimative is None:
+            inicios = []
+        elif isinstance(initial_estimative, list) and len(initial_estimative) > 0 and \
+                all(isinstance(inicio, (list, tuple)) for inicio in initial_estimative):
+            inicios = [list(inicio) for inicio in initial_estimative]
+        else:
+            inicios = [initial_estimative]
+
+        for inicio in inicios:
+            if not isinstance(inicio, list) or len(inicio) != self.parametros.NV:
+                raise TypeError(
+                    'The initial estimative must be a list with the size of the number of parameters, defined in the symbols. Number of parameters: {}'.format(
+                        self.parametros.NV))
+
+        if kwargs.get('starts') is not None:
+            limites = [array(limite, dtype=float, ndmin=1) for limite in (lower_bound, upper_bound)]
+            if any(limite.size != self.parametros.NV or not isfinite(limite).all() for limite in limites):
+                raise ValueError('To generate the starts by Latin hypercube sampling, lower_bound and upper_bound must be defined for all parameters.')
+
+            amostras = qmc.scale(qmc.LatinHypercube(d=self.parametros.NV, seed=kwargs.get('seed')).random(kwargs.get('starts')),
+                                 limites[0], limites[1])
+            inicios += amostras.tolist()
 
         # ---------------------------------------------------------------------
         # EXECUTION
@@ -1218,6 +1554,8 @@ class EstimacaoNaoLinear:
         self.__flag.ToggleInactive('reconciliacao')
         # indicates that this algorithm has performance reporting.
         self.__flag.ToggleActive('relatoriootimizacao')
+        # summary of the starts of the multi-start optimization
+        self.OtimizacaoMultiStart = None
 
         # ---------------------------------------------------------------------
         # MODEL VALIDATION
@@ -1229,8 +1567,8 @@ class EstimacaoNaoLinear:
                 aux = self.__excModel(upper_bound, self._values)
             if lower_bound is not None:
                 aux = self.__excModel(lower_bound, self._values)
-            if initial_estimative is None:
-                aux = self.__excModel(initial_estimative, self._values)
+            for inicio in inicios:
+                aux = self.__excModel(inicio, self._values)
 
         except Exception as erro:
             raise SyntaxError(
@@ -1242,30 +1580,42 @@ class EstimacaoNaoLinear:
         # define the optimization problem
         nlp = {'x': self.__symParam, 'p': self.__symVariables, 'f': self.__symObjectiveFunction}
 
-        # options for printing the optimization information
-        if optimizationReport is True:
-            # with optimization report
-            if algorithm == 'ipopt':
-                options = {'print_time': False, 'ipopt' :{'print_level': 0, 'file_print_level': 5,
-                                                          'output_file': self._out.optimization()+  'Optimization_report.txt'}}
-            elif algorithm == 'bonmin':
-                options = {'print_time': False, 'bonmin':{'file_print_level': 5,
-                                                          'output_file': self._out.optimization() + 'Optimization_report.txt'}}
-            elif algorithm =='sqpmethod':
-                options = {'print_iteration': False, 'qpsol_options':{'printLevel': 'none'}}
-
+        # multi-start: the problem is solved from all starts and the solution of the best one is kept
+        if len(inicios) > 1:
+            self.OtimizacaoMultiStart, solucoes = self.__multiStart(inicios, nlp, algorithm, lower_bound, upper_bound,
+                                                                    kwargs.get('workers'))
+            candidatos = [i for i, resultado in enumerate(self.OtimizacaoMultiStart) if resultado['success']]
+            candidatos = candidatos if candidatos != [] else list(range(len(inicios)))
+            melhor = sorted(candidatos, key=lambda i: self.OtimizacaoMultiStart[i]['FO'])[0]
+            self.Otimizacao = solucoes[melhor]
+
+            if optimizationReport is True:
+                relatorioMultiStart(self.OtimizacaoMultiStart, melhor, self._out.optimization() + 'Optimization_report.txt')
+
+        elif algorithm in metodosMinimosQuadrados:
+            # least squares algorithms (the warm start uses only the previous optimum)
+            self.Otimizacao = self.__minimosQuadrados(inicios[0], lower_bound, upper_bound, algorithm,
+                                                      optimizationReport is True)
         else:
-            # without optimization report
-            if algorithm == 'ipopt':
-                options = {'print_time': False, 'ipopt': {'print_level': 0}}
-            elif algorithm == 'bonmin':
-                options = {'print_time': False, 'bonmin': {}}
-            elif algorithm == 'sqpmethod':
-                options = {'print_iteration': False, 'qpsol_options': {'printLevel': 'none'}}
-        # optimization problem setup
-        S = nlpsol('S', algorithm, nlp, options)
-        # passing the arguments for the optimization problem
-        self.Otimizacao = S(x0=initial_estimative, p=self._values, lbx=lower_bound, ubx=upper_bound)
+            # options for printing the optimization information
+            options = self.__opcoesOtimizador(algorithm, optimizationReport is True)
+
+            # warm start: the initial point and multipliers are close to the solution, so they are not moved away
+            # from the bounds and the barrier parameter starts small
+            if inicioQuente is not None and algorithm == 'ipopt':
+                options['ipopt'].update({'warm_start_init_point': 'yes', 'warm_start_bound_push': 1e-9,
+                                         'warm_start_bound_frac': 1e-9, 'warm_start_mult_bound_push': 1e-9,
+                                         'mu_init': 1e-4})
+            # optimization problem setup
+            S = self.__solver(nlp, algorithm, options)
+            # passing the arguments for the optimization problem
+            if inicioQuente is not None:
+                self.Otimizacao = S(x0=inicios[0], p=self._values, lbx=lower_bound, ubx=upper_bound,
+                                    lam_x0=inicioQuente['lam_x0'], lam_g0=inicioQuente['lam_g0'])
+            else:
+                self.Otimizacao = S(x0=inicios[0], p=self._values, lbx=lower_bound, ubx=upper_bound)
+            # solver statistics (success, return status, iterations, ...), as for the least squares algorithms
+            self.Otimizacao['stats'] = S.stats()
 
         # ASSIGNMENT OF VALUES TO QUANTITIES
 
@@ -1304,21 +1654,240 @@ class EstimacaoNaoLinear:
             with open(self._out.optimization() +'Optimization_report.html', 'w') as arquivo:
                 arquivo.writelines(linhas)
 
-    def __Hessiana_FO_Param(self):
+    def __opcoesOtimizador(self, algorithm, relatorio):
+        u"""
+        Options of the optimizer, with (relatorio = True) or without the optimization report. The least squares
+        algorithms (gauss-newton, lm) have no options.
+        """
+        if algorithm in metodosMinimosQuadrados:
+            options = {}
+
+        elif relatorio:
+            # with optimization report
+            if algorithm == 'ipopt':
+                options = {'print_time': False, 'ipopt' :{'print_level': 0, 'file_print_level': 5,
+                                                          'output_file': self._out.optimization()+  'Optimization_report.txt'}}
+            elif algorithm == 'bonmin':
+                options = {'print_time': False, 'bonmin':{'file_print_level': 5,
+                                                          'output_file': self._out.optimization() + 'Optimization_report.txt'}}
+            elif algorithm =='sqpmethod':
+                options = {'print_iteration': False, 'qpsol_options':{'printLevel': 'none'}}
+
+        else:
+            # without optimization report
+            if algorithm == 'ipopt':
+                options = {'print_time': False, 'ipopt': {'print_level': 0}}
+            elif algorithm == 'bonmin':
+                options = {'print_time': False, 'bonmin': {}}
+            elif algorithm == 'sqpmethod':
+                options = {'print_iteration': False, 'qpsol_options': {'printLevel': 'none'}}
+
+        return options
+
+    def __solver(self, nlp, algorithm, options):
+        u"""
+        Optimization problem setup (nlpsol), reused from the process cache for the same model, problem shape and options.
+        """
+        if self.__compilacao and not self.__pontual:
+            return cacheCasadi.obter(('nlpsol', algorithm, congelar(options), 'compilado', self.__diretorioCompilacao) + self.__chaveObjetivo,
+                                     lambda: compilarSolver('S', algorithm, nlp, options, self.__diretorioCompilacao))
+
+        return cacheCasadi.obter(('nlpsol', algorithm, congelar(options)) + self.__chaveObjetivo,
+                                 lambda: nlpsol('S', algorithm, nlp, options))
+
+    def __funcaoResiduos(self, exportacao=False):
+        u"""
+        Function of the weighted residuals (yo - model)/Uyo (inputs: parameters and data), used by the least squares
+        algorithms (gauss-newton, lm).
+
+        With exportacao, the function is created without the cache and is not compiled, so that it can be
+        serialized (see __multiStart).
+        """
+        def criar():
+            return Function('Residuos', [self.__symParam, self.__symVariables],
+                            [(self.__symYo - self.__symModel)/self.__symUyo])
+
+        if exportacao:
+            return criar()
+
+        return self.__funcaoCasadi('Residuos', self.__chaveObjetivo, criar)
 
-        aux = Function('Hessiana', [self.__symParam, self.__symVariables],
-                                 [hessian(self.__symObjectiveFunction,self.__symParam)[0]]) #function
+    def __funcaoJacobianaResiduos(self):
+        u"""
+        Function of the jacobian of the weighted residuals in relation to the parameters (inputs: parameters and data).
+        Evaluated separately from the residuals, so that the least squares algorithms evaluate it only at the
+        accepted steps.
+        """
+        return self.__funcaoCasadi('Jacobiana_Residuos', self.__chaveObjetivo,
+                                   lambda: Function('Jacobiana_Residuos', [self.__symParam, self.__symVariables],
+                                                    [jacobian((self.__symYo - self.__symModel)/self.__symUyo,
+                                                              self.__symParam)]))
+
+    def __minimosQuadrados(self, inicio, lower_bound, upper_bound, algorithm, relatorio=False):
+        u"""
+        __minimosQuadrados(self, inicio, lower_bound, upper_bound, algorithm, relatorio=False)
+
+        ==========================================================================
+         Solves the optimization problem by Gauss-Newton or Levenberg-Marquardt
+        ==========================================================================
+
+        - Returns
+        ---------
+        dict with the keys of the nlpsol solution (x, f, lam_x, lam_g), the iterations (historico) and the
+        statistics (stats). See GaussNewton.minimosQuadrados.
+
+        - Notes
+        -------
+        With relatorio = True, the iterations are written in the optimization report.
+        """
+        funcao, jacobiana = self.__funcaoResiduos(), self.__funcaoJacobianaResiduos()
+        solucao = minimosQuadrados(lambda parametros: funcao(parametros, self._values),
+                                   lambda parametros: jacobiana(parametros, self._values), inicio, lower_bound,
+                                   upper_bound, algorithm)
+
+        if relatorio:
+            relatorioMinimosQuadrados(solucao, self._out.optimization() + 'Optimization_report.txt', algorithm)
+
+        return solucao
+
+    def __multiStart(self, inicios, nlp, algorithm, lower_bound, upper_bound, workers=None):
+        u"""
+        __multiStart(self, inicios, nlp, algorithm, lower_bound, upper_bound, workers=None)
+
+        ===========================================================
+         Solves the optimization problem from each start (list)
+        ===========================================================
+
+        - Returns
+        ---------
+        lists with the summary (see resultadoOtimizacao) and with the solution (see solucaoOtimizacao) of each start,
+        in the order of the starts.
+
+        - Notes
+        -------
+        The starts are solved without optimization report. If workers is defined (> 1), the starts are divided among
+        the processes of a pool, to which the objective function is sent serialized.
+        """
+        options = self.__opcoesOtimizador(algorithm, False)
+
+        if workers is None or workers == 1:
+            if algorithm in metodosMinimosQuadrados:
+                solucoes = [self.__minimosQuadrados(inicio, lower_bound, upper_bound, algorithm) for inicio in inicios]
+                return [resultadoOtimizacao(solucao['stats'], solucao, inicio) for solucao, inicio in zip(solucoes, inicios)], \
+                       [solucaoOtimizacao(solucao['stats'], solucao) for solucao in solucoes]
+
+            S = self.__solver(nlp, algorithm, options)
+            resultados, solucoes = [], []
+            for inicio in inicios:
+                solucao = S(x0=inicio, p=self._values, lbx=lower_bound, ubx=upper_bound)
+                estatisticas = S.stats()
+                resultados.append(resultadoOtimizacao(estatisticas, solucao, inicio))
+                solucoes.append(solucaoOtimizacao(estatisticas, solucao))
+
+            return resultados, solucoes
+
+        # the functions sent to the processes are the casadi graphs, not the compiled ones (compilation keyword):
+        # a compiled function has no derivatives for the solvers built by the processes
+        if algorithm in metodosMinimosQuadrados:
+            funcao_serializada = self.__funcaoResiduos(exportacao=True).serialize()
+        else:
+            funcao_serializada = Function('Objective_Function', [self.__symParam, self.__symVariables],
+                                          [self.__symObjectiveFunction]).serialize()
+        valores = array(self._values)
+        fatias = [fatia for fatia in array_split(arange(len(inicios)), workers) if fatia.size != 0]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(_otimizacaoMultiStart,
+                                           *zip(*[(funcao_serializada, valores, algorithm, options,
+                                                   [inicios[i] for i in fatia], lower_bound, upper_bound)
+                                                  for fatia in fatias])))
+
+        resultados = [resultado for fatia in resultados for resultado in fatia]
+        return [resumo for resumo, solucao in resultados], [solucao for resumo, solucao in resultados]
+
+    def _derivadas(self, sensibilidade=False):
+        u"""
+        _derivadas(self, sensibilidade=False)
+
+        ==========================================================================
+         Evaluates the derivative matrices and the model at the parameter estimate
+        ==========================================================================
+
+        - Returns
+        ---------
+        dict with the arrays:
+            Hessiana : Hessian matrix of the objective function in relation to the parameters
+            Gy : second partial derivatives of the objective function in relation to parameters and experimental data
+            S : first derivatives of the model in relation to the parameters
+            modelo : model output
+
+        - Notes
+        -------
+        All the outputs are evaluated by a single casadi function, sharing the subexpressions (the gradient of the
+        objective function used by the Hessian is the one differentiated to obtain Gy). With prediction data, the
+        objective function is not defined and only S and modelo are evaluated. With sensibilidade, only S and modelo
+        are evaluated also for the estimation data (see SensibilidadeModelo in parametersUncertainty).
+
+        The results are stored and reused while the parameter estimate and the data (casadi variables) do not change.
+        """
+        derivadas = self.__derivadasEstimativa()
+        sensibilidade = sensibilidade or self.__flag.info['dadospredicao']
+
+        if ('modelo' if sensibilidade else 'Hessiana') not in derivadas:
+            if sensibilidade:
+                nomes = ('S', 'modelo')
+                funcao = self.__funcaoCasadi('Derivadas_Predicao', self.__chaveModelo,
+                                             lambda: Function('Derivadas_Predicao', [self.__symParam, self.__symVariables],
+                                                              [jacobian(self.__symModel, self.__symParam), self.__symModel]))
+            else:
+                nomes = ('Hessiana', 'Gy', 'S', 'modelo')
+
+                def criar():
+                    Hessiana, gradiente = hessian(self.__symObjectiveFunction, self.__symParam)
+                    return Function('Derivadas', [self.__symParam, self.__symVariables],
+                                    [Hessiana, jacobian(gradiente, self.__symYo), jacobian(self.__symModel, self.__symParam),
+                                     self.__symModel])
+
+                funcao = self.__funcaoCasadi('Derivadas', self.__chaveObjetivo, criar)
+
+            derivadas.update({nome: array(valor) for nome, valor in
+                              zip(nomes, funcao(self.parametros.estimativa, self._values))})
+
+        return derivadas
+
+    def __derivadasEstimativa(self):
+        u"""
+        Dictionary where the derivatives evaluated for the current parameter estimate are stored. It is emptied when
+        the estimate changes.
+        """
+        parametros = tuple(float(valor) for valor in self.parametros.estimativa)
 
-        self.Hessiana = array(aux(self.parametros.estimativa, self._values)) #numeric
+        if self.__derivadasAvaliadas.get('parametros') != parametros:
+            self.__derivadasAvaliadas = {'parametros': parametros}
+
+        return self.__derivadasAvaliadas
+
+    def __fatoracaoHessiana(self):
+        u"""
+        Factorization of the Hessian matrix of the objective function (see AlgebraLinear.fatorar), stored together
+        with the derivatives evaluated for the current parameter estimate.
+        """
+        derivadas = self._derivadas()
+
+        if 'fatoracaoHessiana' not in derivadas:
+            derivadas['fatoracaoHessiana'] = fatorar(derivadas['Hessiana'])
+
+        return derivadas['fatoracaoHessiana']
+
+    def __Hessiana_FO_Param(self):
+
+        self.Hessiana = self._derivadas()['Hessiana'] #numeric
 
         return self.Hessiana
 
     def __Matriz_Gy(self):
 
-        aux = Function('Gy', [self.__symParam, self.__symVariables],
-                       [jacobian(jacobian(self.__symObjectiveFunction, self.__symParam), self.__symYo)]) # function
-
-        self.Gy = array(aux(self.parametros.estimativa, self._values))
+        self.Gy = self._derivadas()['Gy']
 
         return self.Gy
 
@@ -1326,11 +1895,7 @@ class EstimacaoNaoLinear:
         u"""
                Method for calvulate the array S(first derivatives of the model function in relation to the parameters)."""
 
-        aux = Function('S', [self.__symParam, self.__symVariables], [jacobian(self.__symModel,self.__symParam)])
-
-        #if not self.__flag.info['dadospredicao']:
-
-        self.S = array(aux(self.parametros.estimativa, self._values))
+        self.S = self._derivadas(sensibilidade=True)['S']
 
         return self.S
 
@@ -1350,8 +1915,8 @@ class EstimacaoNaoLinear:
             list with the estimation of parameters
         variance : array, ndmin=2
             covariance matrix of the parameters
-        region : list
-            list containing lists with the parameters belonging to the coverage region
+        region : list or array
+            list containing lists (or array, number of points x NP) with the parameters belonging to the coverage region
         parametersReport : bool
             informs whether the parameters report should be created.
 
@@ -1466,6 +2031,9 @@ class EstimacaoNaoLinear:
 
         -Before performing this method it is necessary to perform one of the following methods: (i) optimize or (ii) SETparameter
 
+        -SensibilidadeModelo: inv(ST*inv(Uyy)*S), S being the sensitivity matrix of the model (inv(JT*J) of the
+         Gauss-Newton method, J = -inv(diag(Uyo))*S). Only S is evaluated: the Hessian matrix and Gy are not.
+
         -The coverage region is only executed if there is optimization history and the attribute regiao_abrangencia
         is not defined for the parameters.
 
@@ -1495,8 +2063,9 @@ class EstimacaoNaoLinear:
         if uncertaintyMethod == self.__metodosIncerteza[0] or uncertaintyMethod == self.__metodosIncerteza[1]:
             self.__Hessiana_FO_Param()
 
-            # Inverse of the Hessian matrix of the objective function in relation to the parameters
-            invHess = inv(self.Hessiana)
+            # Factorization of the Hessian matrix of the objective function in relation to the parameters
+            # (used instead of its inverse)
+            fatoracaoHessiana = self.__fatoracaoHessiana()
 
         # Gy: second partial derivatives of the objective function in relation to parameters and experimental data
         # Only evaluated if the chosen method is: Geral
@@ -1515,15 +2084,17 @@ class EstimacaoNaoLinear:
         # COVARIANCE MATRIX
         # Method: 2InvHessiana ->  2*inv(Hess)
         if uncertaintyMethod == self.__metodosIncerteza[0]:
-            matriz_covariancia = 2*invHess
+            matriz_covariancia = 2*fatoracaoHessiana.inversa()
 
-        # Method: geral - > inv(H)*Gy*Uyy*GyT*inv(H)
+        # Method: geral - > inv(H)*Gy*Uyy*GyT*inv(H) = A*Uyy*AT, A = inv(H)*Gy
         elif uncertaintyMethod == self.__metodosIncerteza[1]:
-            matriz_covariancia  = invHess.dot(self.Gy).dot(self.y.estimacao.matriz_covariancia).dot(self.Gy.transpose()).dot(invHess)
+            A = fatoracaoHessiana.resolver(self.Gy)
+            matriz_covariancia  = A.dot(self.y.estimacao.covariancia @ A.transpose())
 
         # Method: simplificado -> inv(trans(S)*inv(Uyy)*S)
         elif uncertaintyMethod == self.__metodosIncerteza[2]:
-            matriz_covariancia = inv(self.S.transpose().dot(inv(self.y.estimacao.matriz_covariancia)).dot(self.S))
+            matriz_covariancia = fatorar(self.y.estimacao.fatoracao.formaQuadratica(self.S)).inversa()
+
 
         # ---------------------------------------------------------------------
         # ATTRIBUTION TO THE QUANTITIES
@@ -1549,9 +2120,9 @@ class EstimacaoNaoLinear:
         if parametersReport is True:
             self._out.Parametros(self.parametros,self.FOotimo)
 
-    def prediction(self,predictionReport = True, **kwargs):
+    def prediction(self,predictionReport = True, factoredCovariance = False, **kwargs):
         u"""
-        prediction(self,predictionReport = True, **kwargs)
+        prediction(self,predictionReport = True, factoredCovariance = False, **kwargs)
 
         ==============================
         Performs the model prediction.
@@ -1563,6 +2134,11 @@ class EstimacaoNaoLinear:
         predictionReport : bool, optional
             informs whether the prediction report should be created. If is true the prediction report is created without statistical tests.\
             The statistical tests could be included in the 'residualAnalysis' method.
+        factoredCovariance : bool, optional
+            if True, the covariance matrix of the calculated y is kept in the factored form F.M.FT + Uyy (see
+            AlgebraLinear.CovarianciaBaixoPosto), F having 2*NP columns (NP with validation data), instead of the dense
+            (NE*NY x NE*NY) matrix: only the uncertainties of each point are evaluated. The dense matrix, or its blocks,
+            are created on demand (attribute matriz_covariancia, method bloco of the attribute covariancia).
 
         - Keywords
         -----------
@@ -1589,11 +2165,6 @@ class EstimacaoNaoLinear:
         if not self.__controleFluxo.Hessiana and not self.__flag.info['dadospredicao']:
             self.__Hessiana_FO_Param()
 
-        # The inverse of the Hessian matrix of the objective function
-        # Only revaluated if the method that evaluates it has not been performed AND has no validation data
-        if self.__controleFluxo.Hessiana:
-            invHess = inv(self.Hessiana)
-
         # Gy: partial second derivatives of the objective function concerning the parameters and experimental data
         # Only revaluated if the method that evaluates it has not been performed AND has no validation data
         if not self.__controleFluxo.Gy and not self.__flag.info['dadospredicao']:
@@ -1607,7 +2178,7 @@ class EstimacaoNaoLinear:
         # ---------------------------------------------------------------------
         # PREDICTION
         # ---------------------------------------------------------------------
-        aux = array(self.__excModel(self.parametros.estimativa,self._values))
+        aux = self._derivadas(sensibilidade=True)['modelo']
 
         # ---------------------------------------------------------------------
         # PREDICTION EVALUATION (Y CALCULATED BY THE MODEL)
@@ -1624,13 +2195,26 @@ class EstimacaoNaoLinear:
 
             if self.__flag.info['dadospredicao']:
 
-                Uyycalculado = self.S.dot(self.parametros.matriz_covariancia).dot(self.S.transpose()) + self.y.predicao.matriz_covariancia
+                if factoredCovariance:
+                    Uyycalculado = CovarianciaBaixoPosto(self.S, self.parametros.matriz_covariancia, self.y.predicao.covariancia)
+                else:
+                    Uyycalculado = self.S.dot(self.parametros.matriz_covariancia).dot(self.S.transpose()) + self.y.predicao.matriz_covariancia
+
+            elif factoredCovariance:
+                # S.P.ST + S.C + CT.ST + Uyy = [S, CT].[[P, I], [I, 0]].[S, CT]T + Uyy, C being the covariance between
+                # the parameters and the experimental data
+                Covar_param_y_experimental = -(self.__fatoracaoHessiana().resolver(self.Gy) @ self.y.predicao.covariancia)
+                NP = self.parametros.NV
+                nucleo = vstack((hstack((self.parametros.matriz_covariancia, eye(NP))),
+                                 hstack((eye(NP), zeros((NP, NP))))))
+                Uyycalculado = CovarianciaBaixoPosto(hstack((self.S, Covar_param_y_experimental.transpose())),
+                                                     nucleo, self.y.estimacao.covariancia)
 
             else:
                 # In this case, the validation data are the experimental data and the covariance between the parameters
                 # and the experimental data will be considered.
                 # COVARIANCE BETWEEN PARAMETERS AND EXPERIMENTAL DATA
-                Covar_param_y_experimental = -inv(self.Hessiana).dot(self.Gy).dot(self.y.predicao.matriz_covariancia)
+                Covar_param_y_experimental = -(self.__fatoracaoHessiana().resolver(self.Gy) @ self.y.predicao.covariancia)
                 # FIRST PART
                 Uyycalculado_1 = self.S.dot(self.parametros.matriz_covariancia).dot(self.S.transpose())
                 # SECOND PART
@@ -1646,15 +2230,288 @@ class EstimacaoNaoLinear:
         self.y._SETcalculado(estimativa=aux,matriz_covariancia=Uyycalculado,
                              gL=[[self.y.estimacao.NE*self.y.NV-self.parametros.NV]*self.y.predicao.NE]*self.y.NV,
                              NE=self.y.predicao.NE)
-        self.x._SETcalculado(estimativa=self.x.predicao.matriz_estimativa,matriz_covariancia=self.x.predicao.matriz_covariancia,
+        self.x._SETcalculado(estimativa=self.x.predicao.matriz_estimativa,matriz_covariancia=self.x.predicao.covariancia,
                              gL=[[self.x.estimacao.NE*self.x.NV-self.parametros.NV]*self.x.predicao.NE]*self.x.NV,
                              NE=self.x.predicao.NE)
 
         # prediction report creation
         if predictionReport is True:
+            kwargs['PA'] = self.PA
             self._out.Predicao(self.x, self.y, None, **kwargs)
 
 
+    def predict(self, x, with_uncertainty=True, chunkSize=1000):
+        u"""
+        predict(self, x, with_uncertainty=True, chunkSize=1000)
+
+        ============================================================================
+        Evaluates the model (and its uncertainty) for new values of the independent quantities.
+        ============================================================================
+
+        - Parameters
+        ------------
+
+        x : array
+            values of the independent quantities (number of points x number of x), in the order of symbols_x.
+        with_uncertainty : bool, optional
+            if True, the standard uncertainties of the predictions are also evaluated.
+        chunkSize : int, optional
+            number of points evaluated in each call of the model.
+
+        - Returns
+        ---------
+
+        y : array
+            predictions of the dependent quantities (number of points x number of y).
+        uy : array
+            standard uncertainties of the predictions (returned only if with_uncertainty is True).
+
+        - Notes
+        -------
+
+        -The parameter estimate (optimize or SETparameter) is required and, for the uncertainties, the covariance
+         matrix of the parameters (parametersUncertainty or SETparameter).
+
+        -The uncertainties are due to the parameters only (diagonal of S.Uparam.ST, S being the sensitivity of the model
+         in relation to the parameters): the points have no measurement.
+
+        -The model and S are evaluated by a casadi function for chunkSize points (the last chunk is completed by
+         repeating its last point), stored in the process cache and compiled with the compilation keyword. The data
+         sets and the steps of the estimation (flux) are not changed.
+        """
+        # ---------------------------------------------------------------------
+        # VALIDATION
+        # ---------------------------------------------------------------------
+        if getattr(self.parametros, 'estimativa', None) is None:
+            raise SyntaxError('To execute the predict method it is necessary to execute optimize or SETparameter.')
+
+        if with_uncertainty and getattr(self.parametros, 'matriz_covariancia', None) is None:
+            raise SyntaxError('To evaluate the uncertainties, the covariance matrix of the parameters is necessary (parametersUncertainty or SETparameter).')
+
+        if not isinstance(chunkSize, Integral) or chunkSize < 1:
+            raise ValueError('The chunkSize must be a positive integer.')
+
+        x = array(x, dtype=float)
+        if x.ndim == 1 and self.x.NV == 1:
+            x = x.reshape(-1, 1)
+
+        if x.ndim != 2 or x.shape[1] != self.x.NV:
+            raise ValueError('x must be an array with {} columns (number of independent quantities).'.format(self.x.NV))
+
+        # ---------------------------------------------------------------------
+        # EVALUATION BY CHUNKS
+        # ---------------------------------------------------------------------
+        NE = x.shape[0]
+        tamanho = chunkSize if chunkSize < NE else (NE if NE > 0 else 1)
+
+        y, uy = prever({tamanho: self.__funcaoPredicao(tamanho)}, self.parametros.estimativa,
+                       self.parametros.matriz_covariancia, x, self.y.NV, with_uncertainty)
+
+        return (y, uy) if with_uncertainty else y
+
+    def predictFile(self, inputFile, outputFile, columns=None, chunkSize=100000, with_uncertainty=True, delimiter=',',
+                    skiprows=0, modelChunkSize=1000):
+        u"""
+        predictFile(self, inputFile, outputFile, columns=None, chunkSize=100000, with_uncertainty=True, delimiter=',', skiprows=0, modelChunkSize=1000)
+
+        ============================================================================
+        Evaluates the model (and its uncertainty) for the values of the independent quantities of a file, by chunks.
+        ============================================================================
+
+        - Parameters
+        ------------
+
+        inputFile : string
+            path of the file with the values of the independent quantities (one point per line). Files .npy are
+            memory-mapped; the other files are read as text (e.g. csv).
+        outputFile : string
+            path of the file of the results. If it ends with .npy, an array (number of points x number of columns) is
+            created (memory-mapped); otherwise, a text file with a header line and the columns separated by delimiter.
+        columns : list, optional
+            indexes of the columns of inputFile with the independent quantities, in the order of symbols_x. If not
+            defined, all columns are used.
+        chunkSize : int, optional
+            number of points read, evaluated and written at a time.
+        with_uncertainty : bool, optional
+            if True, the standard uncertainties and the limits of the coverage interval (probability PA) of the
+            predictions are also written.
+        delimiter : string, optional
+            separator of the columns of the text files.
+        skiprows : int, optional
+            number of lines skipped at the beginning of the text input file (e.g. header).
+        modelChunkSize : int, optional
+            number of points evaluated in each call of the model (see chunkSize of predict).
+
+        - Returns
+        ---------
+
+        number of points evaluated.
+
+        - Notes
+        -------
+
+        -The columns of the output file are: predictions of the y (order of symbols_y), and, with with_uncertainty,
+         their standard uncertainties (u_<symbol>) and the lower (<symbol>_lower) and upper (<symbol>_upper) limits
+         of the coverage intervals, with the t distribution and the degrees of freedom of the estimation.
+
+        -Only chunkSize points are kept in memory, regardless of the size of the files (the .npy output with a text
+         input requires a first pass over inputFile, to count its points).
+
+        -The evaluation is done by the predict method (see its notes).
+        """
+        # ---------------------------------------------------------------------
+        # VALIDATION
+        # ---------------------------------------------------------------------
+        if not isinstance(inputFile, str) or not os.path.isfile(inputFile):
+            raise ValueError('The inputFile must be the path of an existing file.')
+
+        if not isinstance(outputFile, str):
+            raise TypeError('The outputFile must be a string.')
+
+        if columns is not None and (not isinstance(columns, list) or len(columns) != self.x.NV):
+            raise ValueError('The columns must be a list with {} indexes (number of independent quantities).'.format(self.x.NV))
+
+        if not isinstance(chunkSize, Integral) or chunkSize < 1:
+            raise ValueError('The chunkSize must be a positive integer.')
+
+        if not isinstance(skiprows, Integral) or skiprows < 0:
+            raise ValueError('The skiprows must be a non-negative integer.')
+
+        # ---------------------------------------------------------------------
+        # OUTPUT
+        # ---------------------------------------------------------------------
+        cabecalho = list(self.y.simbolos)
+        if with_uncertainty:
+            cabecalho += ['u_' + simbolo for simbolo in self.y.simbolos] + \
+                         [simbolo + '_lower' for simbolo in self.y.simbolos] + \
+                         [simbolo + '_upper' for simbolo in self.y.simbolos]
+            fator = fatorAbrangencia(self.PA, self.y.estimacao.NE*self.y.NV - self.parametros.NV)
+
+        if outputFile.endswith('.npy'):
+            saida = open_memmap(outputFile, mode='w+', dtype=float,
+                                shape=(linhasArquivo(inputFile, skiprows), len(cabecalho)))
+        else:
+            saida = open(outputFile, 'w')
+            saida.write(delimiter.join(cabecalho) + '\n')
+
+        # ---------------------------------------------------------------------
+        # EVALUATION BY CHUNKS
+        # ---------------------------------------------------------------------
+        NE = 0
+        try:
+            for bloco in blocosArquivo(inputFile, chunkSize, columns, delimiter, skiprows):
+                if with_uncertainty:
+                    y, uy = self.predict(bloco, True, modelChunkSize)
+                    resultado = hstack((y, uy, y - fator*uy, y + fator*uy))
+                else:
+                    resultado = self.predict(bloco, False, modelChunkSize)
+
+                if isinstance(saida, ndarray):
+                    saida[NE:NE+resultado.shape[0]] = resultado
+                else:
+                    savetxt(saida, resultado, delimiter=delimiter)
+                NE += resultado.shape[0]
+
+        finally:
+            if isinstance(saida, ndarray):
+                saida.flush()
+            else:
+                saida.close()
+
+        return NE
+
+    def __funcaoPredicao(self, NE, exportacao=False):
+        u"""
+        Function of the model and of its jacobian in relation to the parameters (S) for NE points (inputs: parameters
+        and x, vectorized column-major), used by the predict method. Stored in the process cache by model and shape.
+
+        With exportacao, the function is created without the cache and without compiled functions (casadi graph
+        only), so that it can be serialized (see exportModel).
+        """
+        def criar():
+            param = MX.sym('param', self.parametros.NV)
+            xo = MX.sym('xo', NE*self.x.NV)
+
+            if self.__pontual:
+                mapa = self.__funcaoModeloPonto().map('Model_Map', self.__paralelizacao, NE, [0], []) if exportacao \
+                    else self.__modeloPontualMapeado(NE)
+                modelo = mapa(param, reshape_cas(reshape_cas(xo, NE, self.x.NV).T, 1, NE*self.x.NV))
+                modelo = reshape_cas(modelo.T, NE*self.y.NV, 1)
+            else:
+                modelo = self.__modelo(param, reshape_cas(xo, NE, self.x.NV), NE)
+
+            return Function('Predicao', [param, xo], [modelo, jacobian(modelo, param)])
+
+        if exportacao:
+            return criar()
+
+        return self.__funcaoCasadi('Predicao', self.__chave(NE), criar)
+
+    def exportModel(self, fileName=None, chunkSizes=(1, 32, 1000)):
+        u"""
+        exportModel(self, fileName=None, chunkSizes=(1, 32, 1000))
+
+        ============================================================================
+        Exports the fitted model (artifact) for the predictions without MT_PEU (see Preditor.carregar).
+        ============================================================================
+
+        - Parameters
+        ------------
+
+        fileName : string, optional
+            path of the file (.npz). If not defined, the file Modelo.npz is created in the folder of the project.
+        chunkSizes : tuple, optional
+            numbers of points of the exported casadi functions of the model and of S. Each chunk of points is
+            evaluated by the largest function with up to the number of remaining points (or by the smallest one,
+            completed by repeating the last point).
+
+        - Returns
+        ---------
+
+        path of the file.
+
+        - Notes
+        -------
+
+        -The parameter estimate (optimize or SETparameter) is required. The covariance matrix of the parameters
+         is exported if it was evaluated (parametersUncertainty or SETparameter).
+
+        -The artifact contains the serialized casadi functions (not compiled), the estimate and the covariance
+         matrix of the parameters and the metadata of the quantities (symbols, names, units and latex labels of
+         x, y and parameters), the coverage probability (PA) and the degrees of freedom of the estimation (gL).
+
+        -The model is not needed to load the artifact: Preditor.carregar(fileName) returns a Preditor, whose
+         predict method has the interface of the predict method of this class. Only numpy and casadi are imported.
+        """
+        # ---------------------------------------------------------------------
+        # VALIDATION
+        # ---------------------------------------------------------------------
+        if getattr(self.parametros, 'estimativa', None) is None:
+            raise SyntaxError('To execute the exportModel method it is necessary to execute optimize or SETparameter.')
+
+        if not isinstance(chunkSizes, (list, tuple)) or len(chunkSizes) == 0 or \
+                any(not isinstance(tamanho, Integral) or tamanho < 1 for tamanho in chunkSizes):
+            raise ValueError('The chunkSizes must be a list or tuple of positive integers.')
+
+        # ---------------------------------------------------------------------
+        # EXPORT
+        # ---------------------------------------------------------------------
+        if fileName is None:
+            Validacao_Diretorio(self.__base_path)
+            fileName = self.__base_path + 'Modelo.npz'
+
+        def grandeza(G):
+            return {'simbolos': list(G.simbolos), 'nomes': list(G.nomes), 'unidades': list(G.unidades),
+                    'label_latex': list(G.label_latex)}
+
+        metadados = {'x': grandeza(self.x), 'y': grandeza(self.y), 'parametros': grandeza(self.parametros),
+                     'PA': self.PA, 'gL': self.y.estimacao.NE*self.y.NV - self.parametros.NV}
+
+        exportar(fileName, {tamanho: self.__funcaoPredicao(tamanho, exportacao=True) for tamanho in set(chunkSizes)},
+                 self.parametros.estimativa, getattr(self.parametros, 'matriz_covariancia', None), metadados)
+
+        return fileName
+
     def __Matriz_Sx(self,delta=1e-5):
         u"""
         Método para calcular a matriz Sx(derivadas primeiras da função do modelo em relação as grandezas de entrada x).
@@ -1707,6 +2564,16 @@ class EstimacaoNaoLinear:
 
         distribution : string
             Type of distribution used to generate random parameters in the monte carlo method
+        memoryLimit : float, > 0
+            Maximum memory (in MB) used to store the mapped points (parameters and objective function). When
+            the limit is reached, the remaining points are discarded.
+        workers : int, > 0
+            Number of processes among which the iterations are divided. Each shard of iterations uses an
+            independent random stream, so the mapping is reproducible for a given seed and number of workers.
+            If not defined, the mapping is executed in the current process.
+        seed : int, >= 0
+            Seed of the random streams (numpy.random.SeedSequence). Without workers, the samples are the ones of
+            workers = 1. If not defined and without workers, numpy's global random state is used.
 
         """
         # ---------------------------------------------------------------------
@@ -1730,7 +2597,8 @@ class EstimacaoNaoLinear:
 
         # if MethodObjectivefunctionmapping = 'MonteCarlo':
         if tipo == self.__tipoObjectiveFunctionMapping[0]:
-            kwargsdisponiveis = ('iterations', 'upper_bound', 'lower_bound', 'searchLimitFactor', 'distribution', 'symmetryFactorLimit')
+            kwargsdisponiveis = ('iterations', 'upper_bound', 'lower_bound', 'searchLimitFactor', 'distribution', 'symmetryFactorLimit', 'memoryLimit',
+                                 'workers', 'seed')
 
             # evaluating whether keywords are available
             if not set(kwargs.keys()).issubset(kwargsdisponiveis):
@@ -1754,6 +2622,18 @@ class EstimacaoNaoLinear:
                     raise TypeError('The symmetry factor limit must be a list')
                 if isinstance(kwargs.get(kwargsdisponiveis[5]), list) and len(kwargs.get(kwargsdisponiveis[5])) != 3:
                     raise ValueError('The size of symmetry factor limit must be equal to trhee. See documentation of objectiveFunctionMapping method')
+            # evaluating the memory limit -> must be positive
+            if kwargs.get(kwargsdisponiveis[6]) is not None:
+                if kwargs.get(kwargsdisponiveis[6]) <= 0:
+                    raise ValueError('The memory limit must be positive.')
+            # evaluating the number of workers -> must be integer and positive
+            if kwargs.get(kwargsdisponiveis[7]) is not None:
+                if not isinstance(kwargs.get(kwargsdisponiveis[7]), Integral) or kwargs.get(kwargsdisponiveis[7]) < 1:
+                    raise ValueError('The number of workers must be integer and positive.')
+            # evaluating the seed -> must be integer and non-negative
+            if kwargs.get(kwargsdisponiveis[8]) is not None:
+                if not isinstance(kwargs.get(kwargsdisponiveis[8]), Integral) or kwargs.get(kwargsdisponiveis[8]) < 0:
+                    raise ValueError('The seed must be a non-negative integer.')
 
         # ---------------------------------------------------------------------
         # Search limit
@@ -1828,102 +2708,146 @@ class EstimacaoNaoLinear:
         if tipo == self.__tipoObjectiveFunctionMapping[0]:
             iterations = int(kwargs.get('iterations') if kwargs.get('iterations') is not None else 500)
 
-            for cont in range(iterations):
-
-                # samples generated with uniform distribution
-                amostra_total_uni = [uniform(lower_bound[i], upper_bound[i], 1)[0] for i in range(self.parametros.NV)]
-
-                # samples generated with triangular distribution, considering the whole area of the Cartesian plane
-                amostra_total = [triangular(lower_bound[i], self.parametros.estimativa[i], upper_bound[i], 1)[0] for i in range(self.parametros.NV)]
-
-                # samples generated with triangular distribution, considering the third quadrant of the Cartesian plane
-                amostra_inf = [triangular(lower_bound[i], (lower_bound[i]+self.parametros.estimativa[i])/2, self.parametros.estimativa[i], 1)[0] for i in range(self.parametros.NV)]
-
-                # samples generated with triangular distribution, considering the first quadrant of the Cartesian plane
-                amostra_sup = [triangular(self.parametros.estimativa[i], (upper_bound[i] + self.parametros.estimativa[i]) / 2, upper_bound[i], 1)[0] for i in range(self.parametros.NV)]
-
-                # Symmetry factor
-                # It is applied to symmetricals to generate more points
-                SF_limits = kwargs.get('symmetryFactorLimit') if kwargs.get('symmetryFactorLimit') is not None else [-2,2,50]
-                SF = linspace(SF_limits[0], SF_limits[1], SF_limits[2], endpoint=True)
-
-                # Calculating the symmetrical points
-                amostras_simetricas = []
-                for i in range(self.parametros.NV-1):
-                    for factor in SF:
-
-                        # Third quadrant (inferior)
-                        # Symmetry with respect to the y axis
-                        simetrica_y_inf = [None] * self.parametros.NV
-                        simetrica_y_inf[i] = self.parametros.estimativa[i] + factor * abs(self.parametros.estimativa[i] - amostra_inf[i])
-                        if simetrica_y_inf[i] > upper_bound[i]:
-                            simetrica_y_inf[i] = upper_bound[i]
-                        elif simetrica_y_inf[i] < lower_bound[i]:
-                            simetrica_y_inf[i] = lower_bound[i]
-
-                        # Symmetry with respect to the x axis
-                        simetrica_x_inf = [None] * self.parametros.NV
-                        simetrica_x_inf[i + 1] = self.parametros.estimativa[i + 1] + factor * abs(self.parametros.estimativa[i + 1] - amostra_inf[i + 1])
-                        if simetrica_x_inf[i+1] > upper_bound[i+1]:
-                            simetrica_x_inf[i+1] = upper_bound[i+1]
-                        elif simetrica_x_inf[i+1] < lower_bound[i+1]:
-                            simetrica_x_inf[i+1] = lower_bound[i+1]
-
-                        # Symmetry with respect to the origin
-                        simetrica_o_inf = [None] * self.parametros.NV
-                        simetrica_o_inf[i] = simetrica_y_inf[i]
-                        simetrica_o_inf[i + 1] = simetrica_x_inf[i+1]
-
-                        # First quadrant (superior)
-                        # Symmetry with respect to the y axis
-                        simetrica_y_sup = [None] * self.parametros.NV
-                        simetrica_y_sup[i] = self.parametros.estimativa[i] - factor * abs(self.parametros.estimativa[i] - amostra_sup[i])
-                        if simetrica_y_sup[i] > upper_bound[i]:
-                            simetrica_y_sup[i] = upper_bound[i]
-                        elif simetrica_y_sup[i] < lower_bound[i]:
-                            simetrica_y_sup[i] = lower_bound[i]
-
-                        # Symmetry with respect to the x axis
-                        simetrica_x_sup = [None] * self.parametros.NV
-                        simetrica_x_sup[i + 1] = self.parametros.estimativa[i + 1] - factor * abs(self.parametros.estimativa[i + 1] - amostra_sup[i + 1])
-                        if simetrica_x_sup[i + 1] > upper_bound[i + 1]:
-                            simetrica_x_sup[i + 1] = upper_bound[i + 1]
-                        elif simetrica_x_sup[i + 1] < lower_bound[i + 1]:
-                            simetrica_x_sup[i + 1] = lower_bound[i + 1]
-
-                        # Symmetry with respect to the origin
-                        simetrica_o_sup= [None] * self.parametros.NV
-                        simetrica_o_sup[i] = simetrica_y_sup[i] # O simétrico em relação ao eixo y corresponde ao x do par ordenado
-                        simetrica_o_sup[i + 1] = simetrica_x_sup[i+1]
-
-                        # Completing the list with the parameters that remained constant for each symmetry
-                        simetricos_inf = [simetrica_x_inf, simetrica_y_inf, simetrica_o_inf]
-                        for sim in simetricos_inf:
-                            for j in range(self.parametros.NV):
-                                if sim[j] is None:
-                                    sim[j] = amostra_inf[j]
-
-                        simetricos_sup = [simetrica_x_sup, simetrica_y_sup, simetrica_o_sup]
-                        for sim in simetricos_sup:
-                            for j in range(self.parametros.NV):
-                                if sim[j] is None:
-                                    sim[j] = amostra_sup[j]
-
-                        # Adding the symmetrical points to a list
-                        amostras_simetricas.append(simetrica_x_inf)
-                        amostras_simetricas.append(simetrica_y_inf)
-                        amostras_simetricas.append(simetrica_o_inf)
-                        amostras_simetricas.append(simetrica_x_sup)
-                        amostras_simetricas.append(simetrica_y_sup)
-                        amostras_simetricas.append(simetrica_o_sup)
-
-                amostra = [amostra_total, amostra_inf, amostra_sup, amostra_total_uni, *amostras_simetricas]
-
-                FO = [float(self._excObjectiveFunction(amo_i, self._values)) for amo_i in amostra] #self._excFO returns a DM object, it's necessary convert to float object
-
-                for i,FO_i in enumerate(FO):
-                    self.__decisonVariablesMapped.append(amostra[i])
-                    self.__OFMapped.append(FO_i)
+            # Symmetry factor
+            # It is applied to symmetricals to generate more points
+            SF_limits = kwargs.get('symmetryFactorLimit') if kwargs.get('symmetryFactorLimit') is not None else [-2,2,50]
+            SF = linspace(SF_limits[0], SF_limits[1], SF_limits[2], endpoint=True)
+
+            workers = kwargs.get('workers')
+
+            if workers is None:
+                # Samples of all iterations (triangular, uniform and symmetrical points), generated at once, with the
+                # random stream of the seed (the same of workers = 1) or numpy's global random state
+                if kwargs.get('seed') is not None:
+                    amostras = amostragemMonteCarlo(self.parametros.estimativa, lower_bound, upper_bound, SF, iterations,
+                                                    default_rng(SeedSequence(kwargs.get('seed')).spawn(1)[0]))
+                else:
+                    amostras = amostragemMonteCarlo(self.parametros.estimativa, lower_bound, upper_bound, SF, iterations)
+
+                # Objective function evaluated in batches
+                FO = self._avaliarFuncaoObjetivo(amostras)
+
+            else:
+                # Iterations divided in shards, each one with an independent random stream
+                sementes = SeedSequence(kwargs.get('seed')).spawn(workers)
+                iteracoes = [fatia.size for fatia in array_split(arange(iterations), workers)]
+
+                if workers == 1:
+                    amostras = amostragemMonteCarlo(self.parametros.estimativa, lower_bound, upper_bound, SF,
+                                                    iterations, default_rng(sementes[0]))
+                    FO = self._avaliarFuncaoObjetivo(amostras)
+                else:
+                    avaliador = self._avaliadorFuncaoObjetivo()
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        resultados = list(executor.map(_mapeamentoMonteCarlo,
+                                                       *zip(*[(avaliador, self.parametros.estimativa,
+                                                               lower_bound, upper_bound, SF, iteracoes[i], sementes[i])
+                                                              for i in range(workers)])))
+
+                    amostras = vstack([resultado[0] for resultado in resultados])
+                    FO = hstack([resultado[1] for resultado in resultados])
+
+            self.__armazenarMapeamento(amostras, FO, kwargs.get('memoryLimit'))
+
+    def __armazenarMapeamento(self, amostras, FO, limite_memoria=None):
+        u"""
+        __armazenarMapeamento(self, amostras, FO, limite_memoria=None)
+
+        ================================================================
+         Stores the mapped points in the history of the mapping
+        ================================================================
+
+        - Parameters
+        ------------
+        amostras : array
+            Matrix (number of samples x NP) with the parameter values
+        FO : array
+            Objective function value for each sample
+        limite_memoria : float
+            Maximum memory (in MB) used by the history. If None, there is no limit.
+
+        - Notes
+        -------
+        The history is kept in preallocated arrays whose capacity is doubled when necessary. When the memory
+        limit is reached, the points that exceed it are discarded (with a warning).
+        """
+        necessario = self.__nMapped + amostras.shape[0]
+
+        # Maximum number of points allowed by the memory limit (parameters and objective function, float64)
+        if limite_memoria is not None:
+            maximo = int(limite_memoria*1024**2/(8*(self.parametros.NV+1)))
+            if necessario > maximo:
+                limite = maximo if maximo > self.__nMapped else self.__nMapped
+                warn('The memory limit for the objective function mapping was reached: {} of {} points were discarded.'.format(
+                    necessario - limite, amostras.shape[0]), UserWarning)
+                necessario = limite
+                amostras = amostras[:necessario - self.__nMapped]
+                FO = FO[:necessario - self.__nMapped]
+        else:
+            maximo = None
+
+        # Growth of the arrays
+        if necessario > self.__OFMapped.shape[0]:
+            capacidade = necessario if necessario > 2*self.__OFMapped.shape[0] else 2*self.__OFMapped.shape[0]
+            if maximo is not None and capacidade > maximo:
+                capacidade = necessario if necessario > maximo else maximo
+
+            decisonVariablesMapped = empty((capacidade, self.parametros.NV))
+            decisonVariablesMapped[:self.__nMapped] = self.__decisonVariablesMapped[:self.__nMapped]
+            OFMapped = empty(capacidade)
+            OFMapped[:self.__nMapped] = self.__OFMapped[:self.__nMapped]
+
+            self.__decisonVariablesMapped = decisonVariablesMapped
+            self.__OFMapped = OFMapped
+
+        self.__decisonVariablesMapped[self.__nMapped:necessario] = amostras
+        self.__OFMapped[self.__nMapped:necessario] = FO
+        self.__nMapped = necessario
+
+    def _avaliarFuncaoObjetivo(self, amostras, tamanho_lote=1000):
+        u"""
+        _avaliarFuncaoObjetivo(self, amostras, tamanho_lote=1000)
+
+        ==============================================================
+         Evaluates the objective function for a batch of parameters
+        ==============================================================
+
+        - Parameters
+        ------------
+        amostras : array
+            Matrix (number of samples x NP) with the parameter values
+        tamanho_lote : int
+            Maximum number of samples evaluated in each call of the mapped objective function
+
+        - Returns
+        ---------
+        FO : array
+            Objective function value for each sample
+
+        - Notes
+        -------
+        The objective function is mapped (casadi's Function.map) over the samples, the data (self._values)
+        being shared by all evaluations. The mapped functions are stored by size and rebuilt only when the
+        casadi variables are constructed again.
+        """
+        return avaliarFuncaoMapeada(self._excObjectiveFunction, self._values, amostras,
+                                    self.__excObjectiveFunctionMapeada, tamanho_lote)
+
+    def _avaliadorFuncaoObjetivo(self):
+        u"""
+        _avaliadorFuncaoObjetivo(self)
+
+        =====================================================================
+         Objective function evaluator sent to the workers of the process pool
+        =====================================================================
+
+        - Returns
+        ---------
+        avaliador : callable
+            Picklable function of the samples (number of samples x NP) that returns the objective function values.
+            The objective function is sent serialized, together with the data (self._values).
+        """
+        return partial(avaliarFuncaoSerializada, self._excObjectiveFunction.serialize(), array(self._values))
 
     def __criteriosAbrangencia(self):
         u"""
@@ -1972,15 +2896,13 @@ class EstimacaoNaoLinear:
 
         # Comparison of the objective function value evaluated in the optimization step with the OFMapped variable.
         # If they are smaller, the respective parameters will be contained in the coverage region.
-        regiao = []
-        for pos,OFMapped in enumerate(self.__OFMapped):
-            if OFMapped <= ellipseComparacao+self.FOotimo:
-                regiao.append(self.__decisonVariablesMapped[pos])
+        mascara = self.__OFMapped[:self.__nMapped] <= ellipseComparacao+self.FOotimo
+        regiao = self.__decisonVariablesMapped[:self.__nMapped][mascara]
 
         # -------------------------------------------------------------------
         # ASSESSING WHETHER POINTS WERE OBTAINED TO FILL THE COVERAGE REGION
         # -------------------------------------------------------------------
-        if regiao == []:
+        if regiao.shape[0] == 0:
             warn('The coverage region evaluated by the likelihood method contains no points. Review the parameters of the algorithm used.',UserWarning)
 
         return regiao
@@ -2252,13 +3174,9 @@ class EstimacaoNaoLinear:
                             cont += self.parametros.NV-passo
 
                         # Plots the coverage region by likelihood method
-                        if self.__controleFluxo.regiaoAbrangencia and self.parametros.regiao_abrangencia != []:
-                            aux1 = [] # auxiliary list -> coverage region for the parameter P1
-                            aux2 = [] # auxiliary list -> coverage region for the parameter P2
-                            for it in range(int(size(self.parametros.regiao_abrangencia)/self.parametros.NV)):
-                                aux1.append(self.parametros.regiao_abrangencia[it][p1])
-                                aux2.append(self.parametros.regiao_abrangencia[it][p2])
-                            Fig.grafico_dispersao_sem_incerteza(array(aux1), array(aux2),
+                        if self.__controleFluxo.regiaoAbrangencia and size(self.parametros.regiao_abrangencia) != 0:
+                            Fig.grafico_dispersao_sem_incerteza(self.parametros.regiao_abrangencia[:,p1],
+                                                                self.parametros.regiao_abrangencia[:,p2],
                                                                 add_legenda=True, corrigir_limites=False,
                                                                 marker='o', linestyle='None', color='b', linewidth=2.0, zorder=1)
                         # Plots the coverage region by linearization (ellipse) method
@@ -2269,7 +3187,7 @@ class EstimacaoNaoLinear:
 
                         Fig.elipse_covariancia(cov,[self.parametros.estimativa[p1],self.parametros.estimativa[p2]],ellipseComparacao)
 
-                        if self.__controleFluxo.regiaoAbrangencia and self.parametros.regiao_abrangencia != []:
+                        if self.__controleFluxo.regiaoAbrangencia and size(self.parametros.regiao_abrangencia) != 0:
                             Fig.set_legenda([u'Verossimilhança','Elipse'], loc='best')
                         else:
                             Fig.set_legenda(['Elipse'], loc='best')
@@ -2328,7 +3246,7 @@ class EstimacaoNaoLinear:
                         #Fig.salvar_e_fechar(base_path+folderone+'calculado' +'_'+self.y.simbolos[iy]+'_funcao_'+self.x.simbolos[ix]+'_sem_incerteza')
 
                         # Plots with uncertainty
-                        if self.y.calculado.matriz_correlacao is not None:
+                        if self.y.calculado.covariancia is not None:
                             Fig.grafico_dispersao_com_incerteza(self.x.predicao.matriz_estimativa[:,ix],
                                                                 self.y.calculado.matriz_estimativa[:,iy],
                                                                 self.x.predicao.matriz_incerteza[:,ix],
@@ -2353,9 +3271,9 @@ class EstimacaoNaoLinear:
                 for iy in range(self.y.NV):
                     y  = self.y.predicao.matriz_estimativa[:,iy]
                     ym = self.y.calculado.matriz_estimativa[:,iy]
-                    # Coverage factors for validation y and calculated
-                    t_cal = [-t.ppf((1 - self.PA) / 2, self.y.calculado.gL[iy][j]) for j in range(self.y.calculado.NE)]
-                    t_val = [-t.ppf((1 - self.PA) / 2, self.y.predicao.gL[iy][j]) for j in range(self.y.predicao.NE)]
+                    # Coverage factors for validation y and calculated (quantiles evaluated once per degrees of freedom)
+                    t_cal = fatorAbrangencia(self.PA, self.y.calculado.gL[iy])
+                    t_val = fatorAbrangencia(self.PA, self.y.predicao.gL[iy])
                     amostras = arange(1,self.y.predicao.NE+1,1)
 
                     diagonal = linspace(min(y), max(y))
@@ -2428,22 +3346,15 @@ class EstimacaoNaoLinear:
                         # plots based on test F
                         if not self.__flag.info['dadospredicao']:
                             # test F plot
-                            ycalc_inferior_F = []
-                            ycalc_superior_F = []
-                            for iNE in range(self.y.calculado.NE):
-
-                                ycalc_inferior_F.append(self.y.calculado.matriz_estimativa[iNE,iy]+\
-                                            t_val[iNE]\
-                                            *(f.ppf((self.PA+(1-self.PA)/2),self.y.calculado.gL[iy][iNE],\
-                                            self.y.predicao.gL[iy][iNE])*self.y.predicao.matriz_covariancia[iNE,iNE])**0.5)
+                            fisher = quantis(f, self.PA+(1-self.PA)/2, self.y.calculado.gL[iy], self.y.predicao.gL[iy])
+                            semiamplitude_F = t_val*(fisher*self.y.predicao.matriz_incerteza[:,iy]**2)**0.5
 
-                                ycalc_superior_F.append(self.y.calculado.matriz_estimativa[iNE,iy]-t_val[iNE]\
-                                               *(f.ppf((self.PA+(1-self.PA)/2),self.y.calculado.gL[iy][iNE],\
-                                            self.y.predicao.gL[iy][iNE])*self.y.predicao.matriz_covariancia[iNE,iNE])**0.5)
+                            ycalc_inferior_F = self.y.calculado.matriz_estimativa[:,iy] + semiamplitude_F
+                            ycalc_superior_F = self.y.calculado.matriz_estimativa[:,iy] - semiamplitude_F
 
-                            Fig.grafico_dispersao_sem_incerteza(y, array(ycalc_inferior_F),
+                            Fig.grafico_dispersao_sem_incerteza(y, ycalc_inferior_F,
                                                                 color='r', corrigir_limites=False, config_axes=False)
-                            Fig.grafico_dispersao_sem_incerteza(y, array(ycalc_superior_F), color='r',
+                            Fig.grafico_dispersao_sem_incerteza(y, ycalc_superior_F, color='r',
                                                                 corrigir_limites=True, config_axes=False, add_legenda=True)
                             Fig.set_legenda(['Limites baseados no teste F'], fontsize = 12, loc='best')
                             Fig.salvar_e_fechar(base_path + foldertwo + 'observado' + '_' + str(self.y.simbolos[iy]) + '_funcao_' + str(self.y.simbolos[iy]) + '_calculado_com_incerteza.png',
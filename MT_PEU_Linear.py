@@ -9,20 +9,22 @@ Principais classes do motor de cálculo do PEU
 
 # Importação de pacotes de terceiros
 from numpy import array, transpose, concatenate,size, ones, \
-hstack, shape, ndarray
+hstack, shape, ndarray, random
+from numpy.random import default_rng
 from scipy.stats import t
 from threading import Thread
 from sys import exc_info
 
 from casadi import mtimes, vertcat, horzcat, MX
 
-from numpy.linalg import inv
+from AlgebraLinear import MinimosQuadradosPonderados, MinimosQuadradosRecursivo
 
 # Exception Handling
 from warnings import warn
 
 # Rotinas Internas
 from MT_PEU import EstimacaoNaoLinear
+from subrotinas import amostragemElipsoide
 
 # Fim da importação
 
@@ -114,6 +116,8 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         * ``setConjunto``        : método para incluir dados obtidos de experimentos. Neste há a opção de determinar \
         se estes dados serão utilizados como dados para estimar os parâmetros ou para validação. (Vide documentação do método)
         * ``optimize``              : método para realizar a otimização, com base nos dados fornecidos em setConjunto.
+        * ``recursiveUpdate``       : (é opcional) atualiza a estimativa dos parâmetros e sua matriz de covariância com novos \
+        pontos experimentais, sem reprocessar os dados já utilizados (Vide documentação do método)
         * ``parametersUncertainty``  : método que avalia a incerteza dos parâmetros (Vide documentação do método)
         * ``setConjunto``        : (é opcional para inclusão de dados de validação)
         * ``Prediction``             : método que avalia a predição do modelo e sua incerteza ou utilizando os pontos experimentais ou de \
@@ -192,6 +196,13 @@ class EstimacaoLinear(EstimacaoNaoLinear):
             self._EstimacaoNaoLinear__flag.ToggleActive('calc_termo_independente')
             self.__coluna_dumb = True
 
+        # Solução dos mínimos quadrados ponderados (fatoração QR), compartilhada por optimize e parametersUncertainty
+        self.__minimosQuadrados = None
+        # Mínimos quadrados ponderados recursivos, iniciados por recursiveUpdate a partir da solução de optimize
+        self.__recursivo = None
+        # Derivadas avaliadas na estimativa dos parâmetros (ver _derivadas)
+        self.__derivadasAvaliadas = {}
+
 
     def setConjunto(self,glx=[],gly=[],dataType='estimacao',uxy=None):
         u'''
@@ -214,6 +225,9 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         # ---------------------------------------------------------------------
         self._EstimacaoNaoLinear__controleFluxo.SET_ETAPA('setConjunto')
 
+        # As derivadas avaliadas para os dados anteriores são descartadas
+        self.__derivadasAvaliadas = {}
+
         # ---------------------------------------------------------------------
         # VALIDAÇÃO
         # ---------------------------------------------------------------------
@@ -239,6 +253,9 @@ class EstimacaoLinear(EstimacaoNaoLinear):
 
         if dataType == 'estimacao':
             self._EstimacaoNaoLinear__flag.ToggleActive('dadosestimacao')
+            # Novos dados de estimação: a solução dos mínimos quadrados deve ser avaliada novamente
+            self.__minimosQuadrados = None
+            self.__recursivo = None
             if self._EstimacaoNaoLinear__controleFluxo.FLUXO_ID != 0:
                 self._EstimacaoNaoLinear__controleFluxo.reiniciar()
                 if self.__flag.info['dadospredicao']:
@@ -321,11 +338,13 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         # ---------------------------------------------------------------------
         # RESOLUÇÃO
         # ---------------------------------------------------------------------
-        X   = self.x.estimacao.matriz_estimativa
-        Uyy = self.y.estimacao.matriz_covariancia
-        y   = self.y.estimacao.vetor_estimativa
-        variancia = inv(X.transpose().dot(inv(Uyy)).dot(X))
-        parametros = variancia.dot(X.transpose().dot(inv(Uyy))).dot(y)
+        # Mínimos quadrados ponderados: linhas branqueadas pela fatoração de Uyy e resolvidas pela fatoração QR reduzida
+        self.__minimosQuadrados = MinimosQuadradosPonderados(self.x.estimacao.matriz_estimativa,
+                                                             self.y.estimacao.vetor_estimativa,
+                                                             self.y.estimacao.fatoracao)
+        self.__recursivo = None
+        variancia = self.__minimosQuadrados.covariancia()
+        parametros = self.__minimosQuadrados.parametros
 
         # ---------------------------------------------------------------------
         # ATRIBUIÇÃO A GRANDEZA
@@ -335,10 +354,8 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         # ---------------------------------------------------------------------
         # FUNÇÃO OBJETIVO NO PONTO ÓTIMO
         # ---------------------------------------------------------------------
-        # initialization of the method that create the symbolic's variables
-        EstimacaoNaoLinear._constructionCasadiVariables(self)
-
-        self.FOotimo = float(self._excObjectiveFunction(self.parametros.estimativa,self._values))
+        # A função objetivo é uma forma quadrática dos parâmetros: as variáveis do casadi não são necessárias
+        self.FOotimo = self.__minimosQuadrados.funcaoObjetivo(self.parametros.estimativa)
 
         # parameters report creation
         if parametersReport:
@@ -357,6 +374,19 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         ==================
 
         * objectiveFunctionMapping (bool): identifica se será executado algoritmo para preenchimento da região de abrangência.
+
+        ========
+        Keywords
+        ========
+
+        * MethodObjectivefunctionmapping (str): 'MonteCarlo' (default, ver EstimacaoNaoLinear.parametersUncertainty) ou
+        'Elipsoide'. Para o modelo linear, a região de abrangência é exatamente o elipsoide definido pela matriz de
+        covariância dos parâmetros e pelo critério de Fisher: no método 'Elipsoide' os pontos são amostrados diretamente
+        no seu interior e fronteira (todos pertencem à região), sem avaliações da função objetivo. Keywords do método:
+
+            * iterations (int): número de pontos no interior da região. Default: 5000
+            * boundaryPoints (int): número de pontos na fronteira da região. Default: 1000
+            * seed (int): semente do gerador de números aleatórios. Caso não definida, é utilizado o estado global do numpy
         '''
         # ---------------------------------------------------------------------
         # FLUXO
@@ -367,9 +397,12 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         # CÁLCULO DA MATRIZ DE COVARIÂNCIA
         # ---------------------------------------------------------------------
         # Caso a matriz de covariância não seja calculada, ela será aqui calculada
-        X   = self.x.estimacao.matriz_estimativa
-        Uyy = self.y.estimacao.matriz_covariancia
-        variancia = inv(X.transpose().dot(inv(Uyy)).dot(X))
+        # A fatoração QR de optimize é reutilizada (depende apenas dos dados de estimação)
+        if self.__minimosQuadrados is None:
+            self.__minimosQuadrados = MinimosQuadradosPonderados(self.x.estimacao.matriz_estimativa,
+                                                                 self.y.estimacao.vetor_estimativa,
+                                                                 self.y.estimacao.fatoracao)
+        variancia = self.__solucao().covariancia()
         self.parametros._updateParametro(matriz_covariancia=variancia)
 
         # ---------------------------------------------------------------------
@@ -377,7 +410,10 @@ class EstimacaoLinear(EstimacaoNaoLinear):
         # ---------------------------------------------------------------------
         # A região de abrangência só é calculada caso não esteja definida
         if objectiveFunctionMapping and self.parametros.NV != 1:
-            self._EstimacaoNaoLinear__objectiveFunctionMapping(**kwargs)
+            if kwargs.get('MethodObjectivefunctionmapping') == 'Elipsoide':
+                self.__amostragemElipsoide(**kwargs)
+            else:
+                self._EstimacaoNaoLinear__objectiveFunctionMapping(**kwargs)
             self._EstimacaoNaoLinear__flag.ToggleActive('mapeamentoFO')
 
         # A região de abrangência só é executada caso haja histórico de posicoes e fitness
@@ -389,4 +425,185 @@ class EstimacaoLinear(EstimacaoNaoLinear):
 
         # parameters report creation
         if parametersReport:
-            self._out.Parametros(self.parametros, self.FOotimo)
\ No newline at end of file
+            self._out.Parametros(self.parametros, self.FOotimo)
+
+    def recursiveUpdate(self, x, y, uy, forgettingFactor=1., window=None, parametersReport=False):
+        u'''
+        Método para atualizar a estimativa dos parâmetros, sua matriz de covariância e o valor da função objetivo com
+        novos pontos experimentais (mínimos quadrados ponderados recursivos), sem reprocessar os dados já utilizados.
+        O custo de cada atualização é O(k.NP²), para k novos pontos.
+
+        =======================
+        Entradas (obrigatórias)
+        =======================
+
+        * x  (list ou array): novos dados das grandezas independentes (k x número de grandezas independentes)
+        * y  (list ou array): novos dados da grandeza dependente (k)
+        * uy (list ou array): incertezas dos novos dados da grandeza dependente (k)
+
+        ====================
+        Entradas (opcionais)
+        ====================
+
+        * forgettingFactor (float): fator de esquecimento (0 < fator <= 1). A informação dos pontos anteriores é multiplicada
+        pelo fator a cada atualização. Default: 1 (sem esquecimento)
+        * window (int): número máximo de pontos considerados na estimativa (janela móvel). Os pontos mais antigos, inclusive
+        os dados de estimação, são removidos. Default: None (todos os pontos são considerados)
+        * parametersReport (bool): cria o relatório dos parâmetros
+
+        **Observações**:
+        * Deve ser executado após optimize. Os conjuntos de dados de estimação (x.estimacao e y.estimacao) não são alterados.
+        * O mapeamento da função objetivo e a região de abrangência anteriores são descartados: parametersUncertainty pode
+        ser executado novamente para avaliá-los com a nova estimativa.
+        '''
+        # ---------------------------------------------------------------------
+        # VALIDAÇÃO
+        # ---------------------------------------------------------------------
+        if not self._EstimacaoNaoLinear__controleFluxo.otimizacao or self.__minimosQuadrados is None:
+            raise TypeError(u'For execute recursiveUpdate is necessary to execute optimize.')
+
+        x = array(x, dtype=float, ndmin=2)
+        if x.shape[0] == 1 and x.shape[1] != self.x.NV:
+            x = x.transpose()
+        y = array(y, dtype=float).ravel()
+        uy = array(uy, dtype=float).ravel()
+
+        if x.shape[1] != self.x.NV:
+            raise ValueError(u'The new data of the independent quantities must have {:d} columns.'.format(self.x.NV))
+
+        if not (x.shape[0] == y.size == uy.size):
+            raise ValueError(u'{:d} data were entered for dependent quantities, {:d} uncertainties and {:d} data for independent quantities.'.format(y.size, uy.size, x.shape[0]))
+
+        if not 0 < forgettingFactor <= 1:
+            raise ValueError(u'The forgetting factor must be in the interval (0, 1].')
+
+        if window is not None and window < self.parametros.NV:
+            raise ValueError(u'The window must be an integer greater than or equal to the number of parameters.')
+
+        # ---------------------------------------------------------------------
+        # ATUALIZAÇÃO RECURSIVA
+        # ---------------------------------------------------------------------
+        if self.__coluna_dumb:
+            x = hstack((x, ones((x.shape[0], 1))))
+
+        # A solução recursiva parte da solução de optimize e dos seus dados de estimação
+        if self.__recursivo is None:
+            self.__recursivo = MinimosQuadradosRecursivo(self.__minimosQuadrados.parametros, self.__minimosQuadrados.covariancia(),
+                                                         self.__minimosQuadrados.FOmin, self.x.estimacao.matriz_estimativa,
+                                                         self.y.estimacao.vetor_estimativa,
+                                                         self.y.estimacao.matriz_incerteza.ravel()**2)
+
+        self.__recursivo.incluir(x, y, uy**2, forgettingFactor)
+
+        if window is not None and self.__recursivo.NE > window:
+            self.__recursivo.remover(self.__recursivo.NE - window)
+
+        # ---------------------------------------------------------------------
+        # ATRIBUIÇÃO A GRANDEZA
+        # ---------------------------------------------------------------------
+        self.parametros._SETparametro(self.__recursivo.parametros.transpose()[0].tolist(), self.__recursivo.covariancia(), None)
+        self.FOotimo = self.__recursivo.FOmin
+        # As derivadas dependem dos pesos dos dados de estimação (ver _derivadas)
+        self.__derivadasAvaliadas = {}
+
+        # ---------------------------------------------------------------------
+        # FLUXO
+        # ---------------------------------------------------------------------
+        # O mapeamento da função objetivo e as etapas que dependem da estimativa dos parâmetros são descartados
+        self._EstimacaoNaoLinear__nMapped = 0
+        self._EstimacaoNaoLinear__flag.ToggleInactive('mapeamentoFO')
+        self._EstimacaoNaoLinear__controleFluxo.reiniciarParcial(['mapeamentoFO', 'regiaoAbrangencia', 'predicao',
+                                                                  'analiseResiduos', 'Hessiana', 'Gy', 'S'])
+        self._EstimacaoNaoLinear__controleFluxo.SET_ETAPA('incertezaParametros')
+
+        # parameters report creation
+        if parametersReport:
+            self._out.Parametros(self.parametros, self.FOotimo)
+
+    def __solucao(self):
+        # Solução atual dos mínimos quadrados: a recursiva (após recursiveUpdate) ou a de optimize
+        return self.__recursivo if self.__recursivo is not None else self.__minimosQuadrados
+
+    def __amostragemElipsoide(self, **kwargs):
+        u'''
+        Amostragem direta da região de abrangência (elipsoide), a partir do fator de Cholesky da matriz de covariância
+        dos parâmetros. O valor da função objetivo de cada ponto é FOotimo + (p-b)T.inv(V).(p-b), obtido da própria
+        amostragem. Keywords: ver parametersUncertainty.
+        '''
+        # ---------------------------------------------------------------------
+        # FLUXO
+        # ---------------------------------------------------------------------
+        self._EstimacaoNaoLinear__controleFluxo.SET_ETAPA('mapeamentoFO')
+
+        # ---------------------------------------------------------------------
+        # VALIDAÇÃO
+        # ---------------------------------------------------------------------
+        kwargs.pop('MethodObjectivefunctionmapping')
+        kwargsdisponiveis = ('iterations', 'boundaryPoints', 'seed')
+
+        if not set(kwargs.keys()).issubset(kwargsdisponiveis):
+            raise NameError('Error in the keywords typed. keywords available: ' + ', '.join(kwargsdisponiveis) + '.')
+
+        pontos_interior = kwargs.get(kwargsdisponiveis[0]) if kwargs.get(kwargsdisponiveis[0]) is not None else 5000
+        pontos_fronteira = kwargs.get(kwargsdisponiveis[1]) if kwargs.get(kwargsdisponiveis[1]) is not None else 1000
+
+        if pontos_interior < 0 or pontos_fronteira < 0:
+            raise ValueError('The number of points (iterations and boundaryPoints) must be integer and non-negative.')
+
+        # ---------------------------------------------------------------------
+        # AMOSTRAGEM
+        # ---------------------------------------------------------------------
+        # Limite da forma quadrática (p-b)T.inv(V).(p-b) dado pelo critério de Fisher
+        fisher, ellipseComparacao = self._EstimacaoNaoLinear__criteriosAbrangencia()
+
+        gerador = default_rng(kwargs.get('seed')) if kwargs.get('seed') is not None else random
+        amostras, distancia = amostragemElipsoide(self.parametros.estimativa, self.parametros.matriz_covariancia,
+                                                  ellipseComparacao, pontos_interior, pontos_fronteira, gerador)
+
+        self._EstimacaoNaoLinear__armazenarMapeamento(amostras, self.FOotimo + distancia)
+
+    def _avaliarFuncaoObjetivo(self, amostras, tamanho_lote=None):
+        u'''
+        Avalia a função objetivo para um conjunto de parâmetros (matriz número de pontos x NP).
+
+        Para o modelo linear, a função objetivo é avaliada pela forma quadrática FOmin + ||R.(b-b*)||² (ver
+        AlgebraLinear.MinimosQuadradosPonderados), em uma única expressão matricial. O tamanho do lote não é utilizado.
+        '''
+        return self.__solucao().funcaoObjetivo(amostras)
+
+    def _avaliadorFuncaoObjetivo(self):
+        u'''
+        Avaliador da função objetivo enviado aos processos do mapeamento: a própria forma quadrática (sem os dados).
+        '''
+        return self.__solucao().funcaoObjetivo
+
+    def _derivadas(self, sensibilidade=False):
+        u'''
+        Matrizes de derivadas e predição do modelo linear (y = X.b), avaliadas analiticamente:
+
+        * Hessiana: 2.XT.inv(Uyy).X (matriz de informação da solução atual, ver recursiveUpdate)
+        * Gy: -2.XT.W.inv(Uyy), W sendo a matriz diagonal dos pesos atuais dos dados de estimação na solução (ver
+        recursiveUpdate): 1 sem atualização recursiva, o produto dos fatores de esquecimento e zero para os dados
+        removidos da janela móvel (a estimativa não depende mais deles)
+        * S: X
+        * modelo: X.b
+
+        Com dados de predição, apenas S e modelo são avaliados. O argumento sensibilidade (ver
+        EstimacaoNaoLinear._derivadas) não é utilizado: as matrizes do modelo linear são avaliadas em conjunto.
+        '''
+        parametros = tuple(float(valor) for valor in self.parametros.estimativa)
+
+        if self.__derivadasAvaliadas.get('parametros') != parametros:
+            predicao = self._EstimacaoNaoLinear__flag.info['dadospredicao']
+            X = self.x.predicao.matriz_estimativa if predicao else self.x.estimacao.matriz_estimativa
+
+            self.__derivadasAvaliadas = {'S': X, 'modelo': X.dot(array(parametros, ndmin=2).transpose()),
+                                         'parametros': parametros}
+
+            if not predicao:
+                self.__derivadasAvaliadas['Hessiana'] = 2*self.__solucao().informacao()
+                if self.__recursivo is not None:
+                    X = X*self.__recursivo.pesosIniciais().reshape((-1, 1))
+                self.__derivadasAvaliadas['Gy'] = -2*self.y.estimacao.fatoracao.resolver(X).transpose()
+
+        return self.__derivadasAvaliadas
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Estimation of the parameters of one model for many independent data sets (batch)
+
+@GrupoPesquisa: PROTEC
+@LinhadePesquisa: GI-UFBA
+"""
+
+# --------------------------------------------------------------------
+# IMPORTING PACKAGES
+# ---------------------------------------------------------------------
+from numpy import array, empty, full, nan, inf, array_split, argsort
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Integral
+
+# ----------------------------------------------------------------
+# IMPORT OF OWN SUBROUTINES AND ADAPTATIONS (DEVELOPED BY GI-UFBA)
+# ----------------------------------------------------------------
+from MT_PEU import EstimacaoNaoLinear
+
+# ----------------------------------------------------------------
+# AUXILIARY FUNCTIONS (ALSO EXECUTED BY THE WORKERS OF THE PROCESS POOL)
+# ----------------------------------------------------------------
+def _estimarConjuntos(Estimacao, conjuntos, opcoes):
+    u"""
+    Estimates the parameters for each data set of a shard of the batch.
+
+    The estimator (EstimacaoNaoLinear) is reused for all the data sets: the casadi functions and solvers are shared
+    by the data sets with the same number of data (see MT_PEU.cacheCasadi).
+
+    Returns a list with (success, return status, objective function, estimative, covariance matrix) of each data set.
+    """
+    resultados = []
+
+    for conjunto in conjuntos:
+        try:
+            Estimacao.setDados(0, *conjunto['x'])
+            Estimacao.setDados(1, *conjunto['y'])
+            Estimacao.setConjunto(dataType='estimacao')
+
+            Estimacao.optimize(initial_estimative=conjunto.get('initial_estimative', opcoes['initial_estimative']),
+                               lower_bound=opcoes['lower_bound'], upper_bound=opcoes['upper_bound'],
+                               algorithm=opcoes['algorithm'], optimizationReport=False, parametersReport=False)
+            estatisticas = Estimacao.Otimizacao['stats']
+
+            covariancia = None
+            if opcoes['uncertaintyMethod'] is not None:
+                Estimacao.parametersUncertainty(uncertaintyMethod=opcoes['uncertaintyMethod'], parametersReport=False,
+                                                objectiveFunctionMapping=False)
+                covariancia = array(Estimacao.parametros.matriz_covariancia, dtype=float)
+
+            resultados.append((bool(estatisticas.get('success', True)), str(estatisticas.get('return_status')),
+                               Estimacao.FOotimo, array(Estimacao.parametros.estimativa, dtype=float).ravel(),
+                               covariancia))
+
+        except Exception as erro:
+            # one data set with error does not interrupt the batch
+            resultados.append((False, 'Error: {}'.format(erro), nan, None, None))
+
+    return resultados
+
+def _estimarConjuntosProcesso(argumentos, kwargs, conjuntos, opcoes):
+    u"""
+    Process pool worker: creates its own estimator and estimates the data sets of its shard (see _estimarConjuntos).
+    """
+    return _estimarConjuntos(EstimacaoNaoLinear(*argumentos, **kwargs), conjuntos, opcoes)
+
+# ----------------------------------------------------------------
+# CLASS
+# ----------------------------------------------------------------
+class EstimacaoLote:
+
+    def __init__(self, Model, symbols_y, symbols_x, symbols_param, PA=0.95, Folder='Lote', **kwargs):
+        u"""
+        __init__(self, Model, symbols_y, symbols_x, symbols_param, PA=0.95, Folder='Lote', **kwargs)
+
+        ===========================================================================
+        Class for estimating the parameters of one model for many data sets.
+        ===========================================================================
+
+        - Parameters
+        ------------
+
+        The parameters and keywords are the ones of EstimacaoNaoLinear (see its documentation). They are used to
+        create the estimators of the batch.
+
+        - Notes
+        -------
+
+        -With workers > 1 (see estimate), the model is sent to the processes of the pool, so it must be picklable
+         (function defined at the module level).
+
+        -The estimation of each data set does not create reports, plots or folders.
+        """
+        # validation of the arguments. The estimator is reused by the estimations in the current process.
+        self.__Estimacao = EstimacaoNaoLinear(Model, symbols_y, symbols_x, symbols_param, PA, Folder, **kwargs)
+
+        self.__argumentos = (Model, symbols_y, symbols_x, symbols_param, PA, Folder)
+        self.__kwargs = kwargs
+
+        # Symbols of the parameters (order of the estimatives in the results)
+        self.simbolos = list(symbols_param)
+
+        # Results of the last batch (see estimate)
+        self.resultados = None
+
+    def estimate(self, datasets, initial_estimative=None, lower_bound=-inf, upper_bound=inf, algorithm='ipopt',
+                 uncertaintyMethod='Geral', workers=None):
+        u"""
+        estimate(self, datasets, initial_estimative=None, lower_bound=-inf, upper_bound=inf, algorithm='ipopt', uncertaintyMethod='Geral', workers=None)
+
+        ==================================================================================
+        Estimates the parameters (optimize and parametersUncertainty) for each data set.
+        ==================================================================================
+
+        - Parameters
+        ------------
+
+        datasets : list
+            list of data sets. Each data set is a dict with the keys:
+
+            x : list with the data of the independent quantities, as in setDados: [(values, uncertainties), ...]
+
+            y : list with the data of the dependent quantities, as in setDados: [(values, uncertainties), ...]
+
+            initial_estimative : list, optional. Initial estimative of the data set (replaces the one of the batch).
+        initial_estimative : list
+            initial estimative of the parameters, used for all data sets (see optimize).
+        lower_bound : list, optional
+            lower bounds of the parameters (see optimize).
+        upper_bound : list, optional
+            upper bounds of the parameters (see optimize).
+        algorithm : string, optional
+            optimization algorithm (see optimize).
+        uncertaintyMethod : string, optional
+            method for calculating the covariance matrix of the parameters (see parametersUncertainty). If None,
+            the uncertainty is not evaluated.
+        workers : int, optional
+            number of processes among which the data sets are divided. If not defined, the data sets are estimated
+            in the current process.
+
+        - Returns
+        ---------
+
+        structured array (one element per data set, in the order of datasets) with the fields:
+
+            dataset : index of the data set
+
+            NE : number of data of the data set
+
+            success : whether the optimizer reports success
+
+            return_status : return status of the optimizer (or the error, if the estimation failed)
+
+            FO : objective function at the optimal point
+
+            estimative : estimative of the parameters (order of symbols_param)
+
+            covariance : covariance matrix of the parameters
+
+        The values of a data set whose estimation failed are nan. The array is also stored in the attribute resultados.
+
+        - Notes
+        -------
+
+        The data sets are ordered by number of data before being divided among the processes, so that the data sets
+        estimated by the same process share the casadi functions and solvers (compiled, with compilation=True).
+        """
+        # ---------------------------------------------------------------------
+        # VALIDATION
+        # ---------------------------------------------------------------------
+        if not isinstance(datasets, list) or len(datasets) == 0:
+            raise TypeError('The datasets must be a non-empty list.')
+
+        for conjunto in datasets:
+            if not isinstance(conjunto, dict) or not {'x', 'y'}.issubset(conjunto.keys()):
+                raise TypeError('Each dataset must be a dict with the keys x and y (data as in setDados).')
+
+        if workers is not None and (not isinstance(workers, Integral) or workers < 1):
+            raise ValueError('The number of workers must be a positive integer.')
+
+        # ---------------------------------------------------------------------
+        # EXECUTION
+        # ---------------------------------------------------------------------
+        opcoes = {'initial_estimative': initial_estimative, 'lower_bound': lower_bound, 'upper_bound': upper_bound,
+                  'algorithm': algorithm, 'uncertaintyMethod': uncertaintyMethod}
+
+        # data sets ordered by number of data (same number of data -> same casadi functions and solvers)
+        NE = array([len(conjunto['y'][0][0]) for conjunto in datasets])
+        ordem = argsort(NE, kind='stable')
+
+        if workers is None or workers == 1:
+            resultados = _estimarConjuntos(self.__Estimacao, [datasets[i] for i in ordem], opcoes)
+
+        else:
+            fatias = [fatia for fatia in array_split(ordem, workers) if fatia.size != 0]
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                resultados = list(executor.map(_estimarConjuntosProcesso,
+                                               *zip(*[(self.__argumentos, self.__kwargs,
+                                                       [datasets[i] for i in fatia], opcoes) for fatia in fatias])))
+
+            resultados = [resultado for fatia in resultados for resultado in fatia]
+
+        # ---------------------------------------------------------------------
+        # RESULTS
+        # ---------------------------------------------------------------------
+        NP = len(self.simbolos)
+        self.resultados = empty(len(datasets), dtype=[('dataset', int), ('NE', int), ('success', bool),
+                                                      ('return_status', 'U100'), ('FO', float),
+                                                      ('estimative', float, (NP,)), ('covariance', float, (NP, NP))])
+
+        for i, (sucesso, status, FO, estimativa, covariancia) in zip(ordem, resultados):
+            self.resultados[i] = (i, NE[i], sucesso, status[:100], FO,
+                                  estimativa if estimativa is not None else full(NP, nan),
+                                  covariancia if covariancia is not None else full((NP, NP), nan))
+
+        return self.resultados
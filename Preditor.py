@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Predição com um modelo ajustado (estimativa e matriz de covariância dos parâmetros), a partir das funções do CasADi
+do modelo e de sua sensibilidade. O artefato exportado por EstimacaoNaoLinear.exportModel é carregado somente
+com numpy e casadi (sem o MT_PEU e seus pacotes de gráficos e relatórios).
+
+@GrupoPesquisa: PROTEC
+@LinhadePesquisa: GI-UFBA
+"""
+# ---------------------------------------------------------------------
+# IMPORTAÇÃO DE PACOTES DE TERCEIROS
+# ---------------------------------------------------------------------
+from numpy import array, asarray, empty, vstack, savez_compressed, load
+from casadi import Function
+from json import dumps, loads
+
+# ---------------------------------------------------------------------
+# VARIÁVEIS
+# ---------------------------------------------------------------------
+# Versão do formato do artefato
+versao = 1
+
+# ---------------------------------------------------------------------
+# FUNÇÕES
+# ---------------------------------------------------------------------
+def prever(funcoes, estimativa, covariancia, x, NY, incerteza=True):
+    u"""
+    Avalia o modelo e as incertezas das predições (somente devidas aos parâmetros: diagonal de S.Uparam.ST) por blocos
+    de pontos.
+
+    =======
+    Entrada
+    =======
+
+    * funcoes (dict): funções do CasADi por número de pontos n (entradas: parâmetros e x vetorizado por colunas,
+    n*NX; saídas: modelo vetorizado por colunas, n*NY, e sua jacobiana em relação aos parâmetros, S)
+    * estimativa (array): estimativa dos parâmetros
+    * covariancia (array): matriz de covariância dos parâmetros (necessária somente com incerteza)
+    * x (array): pontos (número de pontos x NX)
+    * NY (int): número de grandezas dependentes
+    * incerteza (bool): caso True, as incertezas também são avaliadas
+
+    =====
+    Saída
+    =====
+
+    * y (array): predições (número de pontos x NY)
+    * uy (array): incertezas padrão das predições (número de pontos x NY), ou None sem incerteza
+
+    Cada bloco é avaliado pela maior função com até o número de pontos restantes ou, caso não exista, pela menor
+    função, completando o bloco com a repetição do último ponto.
+    """
+    tamanhos = sorted(funcoes)
+    NE, NX = x.shape
+
+    y = empty((NE, NY))
+    uy = empty((NE, NY)) if incerteza else None
+
+    inicio = 0
+    while inicio < NE:
+        restantes = NE - inicio
+        menores = [tamanho for tamanho in tamanhos if tamanho <= restantes]
+        tamanho = menores[-1] if menores else tamanhos[0]
+
+        bloco = x[inicio:inicio+tamanho]
+        n = bloco.shape[0]
+        if n < tamanho:
+            bloco = vstack((bloco, bloco[[-1]*(tamanho - n)]))
+
+        modelo, S = funcoes[tamanho](estimativa, bloco.reshape((tamanho*NX, 1), order='F'))
+        y[inicio:inicio+n] = array(modelo).reshape((tamanho, NY), order='F')[:n]
+
+        if incerteza:
+            S = array(S)
+            variancia = (S.dot(covariancia)*S).sum(axis=1)
+            uy[inicio:inicio+n] = (variancia.reshape((tamanho, NY), order='F')[:n])**0.5
+
+        inicio += n
+
+    return y, uy
+
+def exportar(arquivo, funcoes, estimativa, covariancia, metadados):
+    u"""
+    Escreve o artefato do modelo ajustado (arquivo .npz comprimido).
+
+    =======
+    Entrada
+    =======
+
+    * arquivo (str): caminho do arquivo
+    * funcoes (dict): funções do CasADi por número de pontos (ver prever), serializadas no artefato
+    * estimativa (array): estimativa dos parâmetros
+    * covariancia (array): matriz de covariância dos parâmetros, ou None
+    * metadados (dict): informações das grandezas (símbolos, nomes, unidades, ...), serializadas em json
+    """
+    conteudo = {'versao': array(versao), 'metadados': array(dumps(metadados)),
+                'tamanhos': array(sorted(funcoes), dtype=int), 'estimativa': asarray(estimativa, dtype=float).ravel()}
+
+    for tamanho, funcao in funcoes.items():
+        conteudo['funcao_{}'.format(tamanho)] = array(funcao.serialize())
+
+    if covariancia is not None:
+        conteudo['covariancia'] = asarray(covariancia, dtype=float)
+
+    savez_compressed(arquivo, **conteudo)
+
+def carregar(arquivo):
+    u"""
+    Carrega o artefato de um modelo ajustado (ver EstimacaoNaoLinear.exportModel) e retorna o Preditor.
+    """
+    with load(arquivo, allow_pickle=False) as conteudo:
+        if int(conteudo['versao']) != versao:
+            raise ValueError('The version of the file ({}) is not supported.'.format(int(conteudo['versao'])))
+
+        funcoes = {int(tamanho): Function.deserialize(str(conteudo['funcao_{}'.format(tamanho)]))
+                   for tamanho in conteudo['tamanhos']}
+
+        return Preditor(funcoes, conteudo['estimativa'],
+                        conteudo['covariancia'] if 'covariancia' in conteudo.files else None,
+                        loads(str(conteudo['metadados'])))
+
+# ---------------------------------------------------------------------
+# CLASSE
+# ---------------------------------------------------------------------
+class Preditor:
+
+    def __init__(self, funcoes, estimativa, covariancia=None, metadados=None):
+        u"""
+        Predições de um modelo ajustado para novos valores das grandezas independentes.
+
+        =======
+        Entrada
+        =======
+
+        * funcoes (dict): funções do CasADi do modelo e de sua sensibilidade, por número de pontos (ver prever)
+        * estimativa (array): estimativa dos parâmetros
+        * covariancia (array): matriz de covariância dos parâmetros. Caso None, as incertezas não são avaliadas.
+        * metadados (dict): informações das grandezas. As chaves x, y e parametros (dict com simbolos, nomes,
+        unidades e label_latex) definem os atributos de mesmo nome; as demais (ex.: PA e gL) são armazenadas no
+        atributo metadados.
+
+        =======
+        Métodos
+        =======
+
+        * ``predict``: predições e incertezas (mesma interface de EstimacaoNaoLinear.predict)
+        """
+        self.funcoes = funcoes
+        self.estimativa = asarray(estimativa, dtype=float).ravel()
+        self.covariancia = asarray(covariancia, dtype=float) if covariancia is not None else None
+        self.metadados = metadados if metadados is not None else {}
+
+        funcao = funcoes[min(funcoes)]
+        self.NX = funcao.size1_in(1)//min(funcoes)
+        self.NY = funcao.size1_out(0)//min(funcoes)
+
+        self.x = self.metadados.get('x')
+        self.y = self.metadados.get('y')
+        self.parametros = self.metadados.get('parametros')
+
+    def predict(self, x, with_uncertainty=True):
+        u"""
+        Avalia o modelo (e a incerteza das predições) para os pontos x (número de pontos x NX, na ordem dos símbolos
+        de x). Retorna y, ou (y, uy) com with_uncertainty (ver EstimacaoNaoLinear.predict).
+        """
+        if with_uncertainty and self.covariancia is None:
+            raise SyntaxError('To evaluate the uncertainties, the covariance matrix of the parameters is necessary.')
+
+        x = array(x, dtype=float)
+        if x.ndim == 1 and self.NX == 1:
+            x = x.reshape(-1, 1)
+
+        if x.ndim != 2 or x.shape[1] != self.NX:
+            raise ValueError('x must be an array with {} columns (number of independent quantities).'.format(self.NX))
+
+        y, uy = prever(self.funcoes, self.estimativa, self.covariancia, x, self.NY, with_uncertainty)
+
+        return (y, uy) if with_uncertainty else y
@@ -11,6 +11,7 @@ Classe auxiliar para escrita de Relatórios
 # ---------------------------------------------------------------------
 from os import getcwd, sep
 from subrotinas import Validacao_Diretorio
+from AlgebraLinear import CovarianciaBaixoPosto
 from numpy import inf
 import xlwt
 from datetime import datetime
@@ -29,6 +30,8 @@ class Report:
 
         * base_path: caminho base
         * base_dir: diretório no caminho base que os arquivos serão salvos
+
+        O diretório é criado somente quando um relatório é escrito.
         '''
         self.__quebra = kwargs.get('quebra') if kwargs.get('quebra') is not None else "\n"
 
@@ -39,9 +42,6 @@ class Report:
         if base_dir is None:
             base_dir = sep + 'Report' + sep
 
-        if base_path is not None:
-            Validacao_Diretorio(base_path,base_dir)
-
         self.__base_path = base_path + base_dir
 
         self.__fluxo = fluxo
@@ -63,6 +63,7 @@ class Report:
         [1] https://docs.python.org/2/tutorial/inputoutput.html
         [2] https://docs.python.org/2/library/string.html#formatstrings
         '''
+        Validacao_Diretorio(self.__base_path)
         with open(self.__base_path+'parameters-report.html','wt') as f:
             # Criação do título: o tamanho dele será o máximo entre 65 e 18*NP (Apenas por estética)
             f.write(('<p>{:#^'+str(max([70,parametros.NV*18]))+'}</p>'+self.__quebra).format('PARÂMETROS'))
@@ -155,6 +156,11 @@ class Report:
             exports the calculated data of y, its uncertainty, and degrees of freedom in a txt with comma separation.
         export_y_xls : bool
             exports the calculated data of y, its uncertainty, and degrees of freedom in a xls.
+        export_y_band : bool
+            also exports, with export_y or export_y_xls, the lower and upper limits of the coverage band of y (two
+            additional columns), for the probability PA.
+        PA : float
+            probability of the coverage band (export_y_band). EstimacaoNaoLinear informs its PA.
         export_cov_y : bool
             exports the covariance matrix of y.
         export_x : bool
@@ -194,8 +200,13 @@ class Report:
             export_cov_y = False
         else:
             export_cov_y = kwargs.get('export_cov_y')
+        if not isinstance(kwargs.get('export_y_band'), bool) and kwargs.get('export_y_band') is not None:
+            raise TypeError('A keyword export_y_band deve ser booleana')
+        export_y_band = kwargs.get('export_y_band') if kwargs.get('export_y_band') is not None else False
 
         PA = kwargs.get('PA')
+        if export_y_band and PA is None:
+            raise SyntaxError('A keyword export_y_band necessita da keyword PA')
         # ---------------------------------------------------------------------
         # REPORT FILE WRITING
         # ---------------------------------------------------------------------
@@ -395,6 +406,9 @@ class Report:
         # ---------------------------------------------------------------------
         # PREDICTION EXPORT
         # ---------------------------------------------------------------------
+        # Limits of the coverage band (vectorized, see Grandeza.Dados.faixaAbrangencia)
+        faixa = y.calculado.faixaAbrangencia(PA) if (export_y or export_y_xls) and export_y_band else None
+
         # Calculated values and uncertainty
         if export_y: # txt format
             cont = 0
@@ -402,7 +416,10 @@ class Report:
                 # with open(self.__base_path+folder+symb+'-calculado-predicao_fl'+self.__fluxo+'.txt','wt') as f:
                 with open(self.__base_path+folder+symb+'-calculado-predicao'+'.txt','wt') as f:
                     for i in range(y.calculado.NE):
-                        f.write('{:.5g},{:.5g},{:.5g}'.format(y.calculado.matriz_estimativa[i,cont],y.calculado.matriz_incerteza[i,cont],y.calculado.gL[cont][i])+self.__quebra)
+                        f.write('{:.5g},{:.5g},{:.5g}'.format(y.calculado.matriz_estimativa[i,cont],y.calculado.matriz_incerteza[i,cont],y.calculado.gL[cont][i]))
+                        if faixa is not None:
+                            f.write(',{:.5g},{:.5g}'.format(faixa[0][i,cont],faixa[1][i,cont]))
+                        f.write(self.__quebra)
                 f.close()
                 cont+=1
         if export_y_xls: # xls format
@@ -411,17 +428,30 @@ class Report:
             ws = wb.add_sheet('calculado-predicao')
             for i in range(y.calculado.NE):
                  ws.write(i, 0, y.calculado.matriz_estimativa[i, cont]), ws.write(i, 1, y.calculado.matriz_incerteza[i, cont]), ws.write(i, 2, y.calculado.gL[cont][i])
+                 if faixa is not None:
+                     ws.write(i, 3, faixa[0][i, cont]), ws.write(i, 4, faixa[1][i, cont])
             for symb in y.simbolos:
                 wb.save(self.__base_path+folder+symb+'-calculado-predicao'+'.xls')
         # covariance matrix
         if export_cov_y:
             # with open(self.__base_path+folder+'y-calculado-matriz-covariancia_fl'+self.__fluxo+'.txt','wt') as f:
+            # A factored covariance (CovarianciaBaixoPosto) is written by blocks of rows, without the dense matrix
+            covariancia = y.calculado.covariancia
+            if not isinstance(covariancia, CovarianciaBaixoPosto):
+                covariancia = y.calculado.matriz_covariancia
+            N = y.NV*y.calculado.NE
             with open(self.__base_path+folder+'y-calculado-matriz-covariancia'+'.txt','wt') as f:
-                for i in range(y.NV*y.calculado.NE):
-                    for j in range(y.NV*y.calculado.NE):
-                        f.write('{:.5g} '.format(y.calculado.matriz_covariancia[i,j]))
-                    f.write(self.__quebra)
+                for inicio in range(0, N, 1000):
+                    if isinstance(covariancia, CovarianciaBaixoPosto):
+                        linhas = covariancia.bloco(slice(inicio, inicio+1000), slice(None))
+                    else:
+                        linhas = covariancia[inicio:inicio+1000]
+                    for linha in linhas:
+                        for valor in linha:
+                            f.write('{:.5g} '.format(valor))
+                        f.write(self.__quebra)
             f.close()
 
     def optimization(self):
+        Validacao_Diretorio(self.__base_path)
         return self.__base_path
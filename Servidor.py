@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local (asyncio) de predições de um modelo ajustado, com agrupamento das requisições simultâneas em lotes
+avaliados por uma única chamada do modelo e de sua sensibilidade
+
+@GrupoPesquisa: PROTEC
+@LinhadePesquisa: GI-UFBA
+"""
+# ---------------------------------------------------------------------
+# IMPORTAÇÃO DE PACOTES DE TERCEIROS
+# ---------------------------------------------------------------------
+from numpy import array, asarray, vstack, percentile, mean
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from json import loads, dumps
+from numbers import Integral
+from time import perf_counter
+import asyncio
+
+# ----------------------------------------------------------------
+# IMPORT OF OWN SUBROUTINES AND ADAPTATIONS (DEVELOPED BY GI-UFBA)
+# ----------------------------------------------------------------
+from Preditor import carregar
+
+# ---------------------------------------------------------------------
+# CLASSE
+# ---------------------------------------------------------------------
+class Servidor:
+
+    def __init__(self, preditor, maxBatchSize=64, maxLatency=0.002, with_uncertainty=True, metricsWindow=10000):
+        u"""
+        Servidor de predições para clientes no mesmo computador (socket Unix ou TCP local).
+
+        =======
+        Entrada
+        =======
+
+        * preditor: modelo ajustado, com o método predict(x, with_uncertainty) (Preditor, carregado com
+        Preditor.carregar, ou EstimacaoNaoLinear), ou o caminho do artefato (ver EstimacaoNaoLinear.exportModel)
+        * maxBatchSize (int): número máximo de pontos de um lote (uma requisição com mais pontos forma um lote)
+        * maxLatency (float): tempo máximo (s) de espera por outras requisições após a primeira requisição do lote
+        * with_uncertainty (bool): caso True, as incertezas das predições também são avaliadas
+        * metricsWindow (int): número de requisições e de lotes mais recentes utilizados nas métricas
+
+        =========
+        Protocolo
+        =========
+
+        Cada requisição e cada resposta é um objeto json em uma linha. As requisições de uma conexão são atendidas
+        simultaneamente, de forma que as respostas podem não seguir a ordem das requisições (o campo id da
+        requisição, caso definido, é repetido na resposta).
+
+        * {"x": [x1, ..., xNX]} (ou lista de pontos) -> {"y": [...], "uy": [...], "latency": s, "batch_size": n}
+        * {"metrics": true} -> {"metrics": {...}} (ver metricas)
+        * requisição inválida ou erro na avaliação -> {"error": "..."}
+
+        =======
+        Métodos
+        =======
+
+        * ``iniciar``  : (corrotina) inicia o servidor
+        * ``encerrar`` : (corrotina) encerra o servidor
+        * ``prever``   : (corrotina) predição de um ou mais pontos, agrupada com as demais requisições
+        * ``metricas`` : latência das requisições e tamanho dos lotes
+        """
+        if isinstance(preditor, str):
+            preditor = carregar(preditor)
+
+        if not isinstance(maxBatchSize, Integral) or maxBatchSize < 1:
+            raise ValueError('The maxBatchSize must be a positive integer.')
+
+        if not isinstance(maxLatency, (int, float)) or maxLatency < 0:
+            raise ValueError('The maxLatency must be a non-negative number.')
+
+        if not isinstance(metricsWindow, Integral) or metricsWindow < 1:
+            raise ValueError('The metricsWindow must be a positive integer.')
+
+        self.preditor = preditor
+        # Número de grandezas independentes (Preditor: NX; EstimacaoNaoLinear: x.NV)
+        self.NX = preditor.NX if hasattr(preditor, 'NX') else preditor.x.NV
+        self.maxBatchSize = maxBatchSize
+        self.maxLatency = maxLatency
+        self.with_uncertainty = with_uncertainty
+
+        # Requisições aguardando a avaliação: (x, futuro) e número de pontos
+        self.__pendentes = deque()
+        self.__pontosPendentes = 0
+        self.__novo = None
+
+        # Métricas: latências das requisições e tamanhos dos lotes mais recentes, e totais
+        self.__latencias = deque(maxlen=metricsWindow)
+        self.__tamanhos = deque(maxlen=metricsWindow)
+        self.__totais = {'requests': 0, 'batches': 0, 'points': 0, 'errors': 0}
+
+        # O modelo é avaliado fora do laço de eventos (as requisições recebidas formam o próximo lote)
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+        self.__agrupador = None
+        self.__servidor = None
+
+    async def iniciar(self, path=None, host='127.0.0.1', port=8765):
+        u"""
+        Inicia o servidor no socket Unix path ou, caso None, no endereço TCP host:port. Retorna o asyncio.Server.
+        """
+        self.__novo = asyncio.Event()
+        self.__agrupador = asyncio.get_running_loop().create_task(self.__agrupar())
+
+        if path is not None:
+            self.__servidor = await asyncio.start_unix_server(self.__atender, path=path)
+        else:
+            self.__servidor = await asyncio.start_server(self.__atender, host=host, port=port)
+
+        return self.__servidor
+
+    async def encerrar(self):
+        u"""
+        Encerra o servidor e o agrupamento das requisições.
+        """
+        if self.__servidor is not None:
+            self.__servidor.close()
+            await self.__servidor.wait_closed()
+
+        if self.__agrupador is not None:
+            self.__agrupador.cancel()
+            try:
+                await self.__agrupador
+            except asyncio.CancelledError:
+                pass
+
+        self.__executor.shutdown(wait=False)
+
+    async def prever(self, x):
+        u"""
+        Predição dos pontos x (um ponto, NX, ou vários pontos, número de pontos x NX), avaliados no lote em formação.
+        Retorna (y, uy, latência em s, número de pontos do lote); uy é None sem incerteza.
+        """
+        if self.__agrupador is None:
+            raise SyntaxError('The server must be started (iniciar) before the predictions.')
+
+        inicio = perf_counter()
+
+        x = array(x, dtype=float, ndmin=2)
+        if x.ndim != 2 or x.shape[1] != self.NX or x.shape[0] == 0:
+            raise ValueError('x must be a point (or list of points) with {} values.'.format(self.NX))
+
+        futuro = asyncio.get_running_loop().create_future()
+        self.__pendentes.append((x, futuro))
+        self.__pontosPendentes += x.shape[0]
+        self.__novo.set()
+
+        y, uy, tamanho = await futuro
+
+        latencia = perf_counter() - inicio
+        self.__latencias.append(latencia)
+        self.__totais['requests'] += 1
+
+        return y, uy, latencia, tamanho
+
+    def metricas(self):
+        u"""
+        Métricas do servidor: totais de requisições, lotes, pontos e erros, e estatísticas (média, percentis e
+        máximo) da latência das requisições (ms) e do tamanho dos lotes (pontos), nas janelas mais recentes.
+        """
+        resultado = dict(self.__totais)
+
+        if self.__latencias:
+            latencias = asarray(self.__latencias)*1e3
+            p50, p95, p99 = percentile(latencias, [50, 95, 99])
+            resultado['latency_ms'] = {'mean': float(mean(latencias)), 'p50': float(p50), 'p95': float(p95),
+                                       'p99': float(p99), 'max': float(latencias.max())}
+
+        if self.__tamanhos:
+            tamanhos = asarray(self.__tamanhos)
+            resultado['batch_size'] = {'mean': float(mean(tamanhos)), 'p50': float(percentile(tamanhos, 50)),
+                                       'max': int(tamanhos.max())}
+
+        return resultado
+
+    async def __agrupar(self):
+        u"""
+        Forma os lotes: após a primeira requisição, aguarda outras requisições até maxLatency ou até maxBatchSize
+        pontos, e avalia o lote com uma única chamada de predict.
+        """
+        laco = asyncio.get_running_loop()
+
+        while True:
+            while not self.__pendentes:
+                self.__novo.clear()
+                await self.__novo.wait()
+
+            limite = laco.time() + self.maxLatency
+            while self.__pontosPendentes < self.maxBatchSize and laco.time() < limite:
+                self.__novo.clear()
+                try:
+                    await asyncio.wait_for(self.__novo.wait(), limite - laco.time())
+                except asyncio.TimeoutError:
+                    break
+
+            # Requisições do lote (ao menos uma, até maxBatchSize pontos)
+            lote = [self.__pendentes.popleft()]
+            tamanho = lote[0][0].shape[0]
+            while self.__pendentes and tamanho + self.__pendentes[0][0].shape[0] <= self.maxBatchSize:
+                lote.append(self.__pendentes.popleft())
+                tamanho += lote[-1][0].shape[0]
+            self.__pontosPendentes -= tamanho
+
+            try:
+                y, uy = await laco.run_in_executor(self.__executor, self.__avaliar, vstack([x for x, _ in lote]))
+            except Exception as erro:
+                self.__totais['errors'] += 1
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(erro)
+                continue
+
+            self.__tamanhos.append(tamanho)
+            self.__totais['batches'] += 1
+            self.__totais['points'] += tamanho
+
+            inicio = 0
+            for x, futuro in lote:
+                fim = inicio + x.shape[0]
+                if not futuro.done():
+                    futuro.set_result((y[inicio:fim], uy[inicio:fim] if uy is not None else None, tamanho))
+                inicio = fim
+
+    def __avaliar(self, x):
+        if self.with_uncertainty:
+            return self.preditor.predict(x, True)
+        return self.preditor.predict(x, False), None
+
+    async def __atender(self, leitor, escritor):
+        u"""
+        Conexão de um cliente: cada linha (requisição) é atendida em uma tarefa.
+        """
+        tarefas = set()
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                tarefa = asyncio.get_running_loop().create_task(self.__responder(linha, escritor))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+
+            if tarefas:
+                await asyncio.gather(*tarefas)
+
+        finally:
+            escritor.close()
+
+    async def __responder(self, linha, escritor):
+        pedido = {}
+        try:
+            pedido = loads(linha)
+            if not isinstance(pedido, dict):
+                raise ValueError('The request must be a json object.')
+
+            if pedido.get('metrics'):
+                resposta = {'metrics': self.metricas()}
+
+            elif 'x' in pedido:
+                y, uy, latencia, tamanho = await self.prever(pedido['x'])
+                # um único ponto (lista com NX valores) tem uma única predição (lista com NY valores)
+                unico = asarray(pedido['x']).ndim < 2
+                resposta = {'y': (y[0] if unico else y).tolist(), 'latency': latencia, 'batch_size': tamanho}
+                if uy is not None:
+                    resposta['uy'] = (uy[0] if unico else uy).tolist()
+
+            else:
+                raise ValueError('The request must have the key x or metrics.')
+
+        except Exception as erro:
+            resposta = {'error': str(erro)}
+
+        if isinstance(pedido, dict) and 'id' in pedido:
+            resposta['id'] = pedido['id']
+
+        escritor.write((dumps(resposta) + '\n').encode())
+        try:
+            await escritor.drain()
+        except ConnectionError:
+            pass
+
+# ---------------------------------------------------------------------
+# FUNÇÕES
+# ---------------------------------------------------------------------
+def executar(preditor, path=None, host='127.0.0.1', port=8765, **kwargs):
+    u"""
+    Executa o servidor (ver Servidor) até a interrupção do processo (ex.: Ctrl+C).
+
+    * preditor: Preditor ou caminho do artefato do modelo ajustado
+    * path (str): caminho do socket Unix. Caso None, o servidor utiliza o endereço TCP host:port.
+    * kwargs: maxBatchSize, maxLatency, with_uncertainty e metricsWindow (ver Servidor)
+    """
+    async def principal():
+        servidor = Servidor(preditor, **kwargs)
+        try:
+            await (await servidor.iniciar(path, host, port)).serve_forever()
+        finally:
+            await servidor.encerrar()
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    argumentos = ArgumentParser(description='Local prediction server of a fitted model (see EstimacaoNaoLinear.exportModel).')
+    argumentos.add_argument('artifact', help='path of the fitted model (.npz)')
+    argumentos.add_argument('--unix', default=None, help='path of the Unix socket (if not defined, TCP is used)')
+    argumentos.add_argument('--host', default='127.0.0.1')
+    argumentos.add_argument('--port', type=int, default=8765)
+    argumentos.add_argument('--max-batch-size', type=int, default=64)
+    argumentos.add_argument('--max-latency', type=float, default=0.002, help='seconds')
+    argumentos.add_argument('--no-uncertainty', action='store_true')
+    opcoes = argumentos.parse_args()
+
+    executar(opcoes.artifact, opcoes.unix, opcoes.host, opcoes.port, maxBatchSize=opcoes.max_batch_size,
+             maxLatency=opcoes.max_latency, with_uncertainty=not opcoes.no_uncertainty)
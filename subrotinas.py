@@ -6,14 +6,19 @@ Arquivo que contém subrotinas genéricas para uso pelo MT_PEU.
 """
 
 from numpy import concatenate, size, arctan2, degrees, sqrt, \
-    copy, ones, array, cos, sin, pi, roots, linspace, iscomplex, transpose, dot
-from numpy.linalg import eigh, inv
+    copy, ones, array, cos, sin, pi, roots, linspace, iscomplex, transpose, dot, diagonal, outer, \
+    clip, abs, empty, stack, random, asarray, broadcast_arrays, unique, column_stack, load, loadtxt
+from numpy.linalg import eigh, inv, cholesky, norm
 from os import path, makedirs
+from itertools import islice
+from collections import OrderedDict
+from threading import Lock
 
 from matplotlib.pyplot import figure, axes, axis, plot, errorbar, subplot, xlabel, ylabel,\
     title, legend, savefig, xlim, ylim, close, grid, text, hist, boxplot, gca
 
 from matplotlib.patches import Ellipse
+from scipy.stats import t
 
 def WLS (parametros,*argumentos):
     u"""
@@ -118,13 +123,114 @@ def matrizcorrelacao(matriz_covariancia):
     if size(matriz_covariancia,0) != size(matriz_covariancia,1):
         raise ValueError(u'A matriz precisa ser quadrada para calcular a matriz dos coeficientes de correlação.')
 
-    matriz_correlacao  = ones((size(matriz_covariancia,0),size(matriz_covariancia,0)))
-    for i in range(size(matriz_covariancia,0)):
-        for j in range(size(matriz_covariancia,0)):
-            matriz_correlacao[i,j]  = matriz_covariancia[i,j]/sqrt(matriz_covariancia[i,i]*matriz_covariancia[j,j])
+    desvio = sqrt(diagonal(matriz_covariancia))
+    matriz_correlacao  = matriz_covariancia/outer(desvio,desvio)
 
     return matriz_correlacao
 
+def amostragemMonteCarlo(estimativa, limite_inferior, limite_superior, fator_simetria, iteracoes, gerador=random):
+    u"""
+    Gera, de uma única vez, as amostras de todas as iterações do mapeamento da função objetivo pelo método de Monte Carlo.
+
+    ========
+    Entradas
+    ========
+
+    * estimativa (list): estimativa dos parâmetros (ponto ótimo)
+    * limite_inferior (list): limite inferior de busca para cada parâmetro
+    * limite_superior (list): limite superior de busca para cada parâmetro
+    * fator_simetria (array): fatores de simetria aplicados para gerar os pontos simétricos
+    * iteracoes (int): número de iterações do método
+    * gerador: objeto com os métodos uniform e triangular (numpy.random ou numpy.random.Generator)
+
+    =====
+    Saída
+    =====
+
+    * amostras (array): matriz (número de amostras x NV). Em cada iteração são geradas as amostras total, inferior,
+    superior e uniforme, seguidas dos pontos simétricos (em relação aos eixos x, y e à origem, para o terceiro e
+    primeiro quadrantes) de cada par de parâmetros consecutivos e cada fator de simetria.
+    """
+    estimativa = array(estimativa, dtype=float)
+    limite_inferior = array(limite_inferior, dtype=float)
+    limite_superior = array(limite_superior, dtype=float)
+    fator_simetria = array(fator_simetria, dtype=float)
+    NV = estimativa.size
+
+    # samples generated with uniform distribution
+    amostra_total_uni = gerador.uniform(limite_inferior, limite_superior, (iteracoes, NV))
+    # samples generated with triangular distribution, considering the whole area of the Cartesian plane
+    amostra_total = gerador.triangular(limite_inferior, estimativa, limite_superior, (iteracoes, NV))
+    # samples generated with triangular distribution, considering the third quadrant of the Cartesian plane
+    amostra_inf = gerador.triangular(limite_inferior, (limite_inferior+estimativa)/2, estimativa, (iteracoes, NV))
+    # samples generated with triangular distribution, considering the first quadrant of the Cartesian plane
+    amostra_sup = gerador.triangular(estimativa, (limite_superior+estimativa)/2, limite_superior, (iteracoes, NV))
+
+    # Symmetrical coordinates for each iteration, symmetry factor and parameter: (iteracoes, len(SF), NV)
+    simetrica_inf = clip(estimativa + fator_simetria[:, None]*abs(estimativa - amostra_inf[:, None, :]),
+                         limite_inferior, limite_superior)
+    simetrica_sup = clip(estimativa - fator_simetria[:, None]*abs(estimativa - amostra_sup[:, None, :]),
+                         limite_inferior, limite_superior)
+
+    # Symmetrical points: (iteracoes, NV-1, len(SF), 6, NV). The parameters that remain constant for each symmetry
+    # are the ones of the inferior (first three points) or superior (last three points) samples
+    simetricas = empty((iteracoes, NV-1, fator_simetria.size, 6, NV))
+    simetricas[:, :, :, :3, :] = amostra_inf[:, None, None, None, :]
+    simetricas[:, :, :, 3:, :] = amostra_sup[:, None, None, None, :]
+    for i in range(NV-1):
+        for k, simetrica in ((0, simetrica_inf), (3, simetrica_sup)):
+            # Symmetry with respect to the x axis
+            simetricas[:, i, :, k, i+1] = simetrica[:, :, i+1]
+            # Symmetry with respect to the y axis
+            simetricas[:, i, :, k+1, i] = simetrica[:, :, i]
+            # Symmetry with respect to the origin
+            simetricas[:, i, :, k+2, i] = simetrica[:, :, i]
+            simetricas[:, i, :, k+2, i+1] = simetrica[:, :, i+1]
+
+    amostras = concatenate((stack((amostra_total, amostra_inf, amostra_sup, amostra_total_uni), axis=1),
+                            simetricas.reshape((iteracoes, -1, NV))), axis=1)
+
+    return amostras.reshape((-1, NV))
+
+def amostragemElipsoide(estimativa, matriz_covariancia, raio2, pontos_interior, pontos_fronteira, gerador=random):
+    u"""
+    Gera amostras uniformemente distribuídas no interior e na fronteira do elipsoide (p-b)T.inv(V).(p-b) <= raio2, a
+    partir do fator de Cholesky da matriz de covariância (V = L.LT): p = b + L.z, com ||z||² <= raio2.
+
+    ========
+    Entradas
+    ========
+
+    * estimativa (list): estimativa dos parâmetros (centro do elipsoide, b)
+    * matriz_covariancia (array): matriz de covariância dos parâmetros (V)
+    * raio2 (float): limite da forma quadrática (quadrado do raio do elipsoide)
+    * pontos_interior (int): número de amostras no interior do elipsoide
+    * pontos_fronteira (int): número de amostras na fronteira do elipsoide
+    * gerador: objeto com os métodos uniform e standard_normal (numpy.random ou numpy.random.Generator)
+
+    =====
+    Saída
+    =====
+
+    * amostras (array): matriz (pontos_interior + pontos_fronteira x NV), pontos do interior seguidos dos da fronteira
+    * distancia (array): valor da forma quadrática (p-b)T.inv(V).(p-b) de cada amostra, obtido sem avaliações adicionais
+    """
+    estimativa = array(estimativa, dtype=float).ravel()
+    NV = estimativa.size
+    L = cholesky(array(matriz_covariancia, dtype=float))
+
+    # Direções uniformemente distribuídas na esfera unitária
+    direcao = gerador.standard_normal((pontos_interior + pontos_fronteira, NV))
+    direcao /= norm(direcao, axis=1)[:, None]
+
+    # Raio: r = u**(1/NV) resulta em pontos uniformemente distribuídos no volume da esfera (r = 1 na fronteira)
+    raio = ones(pontos_interior + pontos_fronteira)
+    raio[:pontos_interior] = gerador.uniform(0., 1., pontos_interior)**(1./NV)
+
+    amostras = estimativa + (sqrt(raio2)*raio[:, None]*direcao).dot(L.transpose())
+
+    return amostras, raio2*raio**2
+
 def lista2matriz(lista):
     res = array(lista[0],ndmin=2).transpose()
     for i in lista[1:]:
@@ -133,3 +239,168 @@ def lista2matriz(lista):
 
     return res
 
+def congelar(objeto):
+    u"""
+    Converte dicionários, listas e tuplas (inclusive aninhados) em tuplas, para que possam ser usados como chave
+    de dicionários (por exemplo, as opções dos otimizadores).
+    """
+    if isinstance(objeto, dict):
+        return tuple(sorted((chave, congelar(valor)) for chave, valor in objeto.items()))
+    if isinstance(objeto, (list, tuple)):
+        return tuple(congelar(valor) for valor in objeto)
+    return objeto
+
+class CacheLRU:
+
+    def __init__(self, tamanho_maximo=128):
+        u"""
+        Cache com política de descarte LRU (o item usado há mais tempo é descartado quando o tamanho máximo é atingido).
+
+        =======
+        Entrada
+        =======
+
+        * tamanho_maximo (int): número máximo de itens armazenados
+
+        =======
+        Métodos
+        =======
+
+        * ``obter``  : retorna o item da chave. Caso não exista, o item é criado pela função informada e armazenado
+        * ``limpar`` : remove todos os itens
+        """
+        self.tamanho_maximo = tamanho_maximo
+        self.__itens = OrderedDict()
+        self.__lock = Lock()
+
+    def obter(self, chave, criar):
+        with self.__lock:
+            if chave in self.__itens:
+                self.__itens.move_to_end(chave)
+                return self.__itens[chave]
+
+        item = criar()
+
+        with self.__lock:
+            self.__itens[chave] = item
+            self.__itens.move_to_end(chave)
+            while len(self.__itens) > self.tamanho_maximo:
+                self.__itens.popitem(last=False)
+
+        return item
+
+    def limpar(self):
+        with self.__lock:
+            self.__itens.clear()
+
+    def __len__(self):
+        return len(self.__itens)
+
+# Quantis das distribuições (ppf) já avaliados, por distribuição, probabilidade e graus de liberdade (ver quantis)
+cacheQuantis = CacheLRU(tamanho_maximo=4096)
+
+def quantis(distribuicao, probabilidade, *graus_liberdade):
+    u"""
+    Quantis (ppf) de uma distribuição do scipy.stats (ex.: t, f, chi2) para a probabilidade, com os graus de liberdade
+    de cada ponto na forma de listas ou arrays (de mesmo formato ou escalares).
+
+    A distribuição é avaliada uma única vez para cada combinação distinta de graus de liberdade (em geral, todos os
+    pontos possuem os mesmos graus de liberdade) e os valores são armazenados entre chamadas (cacheQuantis).
+
+    =======
+    Entrada
+    =======
+
+    * distribuicao: distribuição do scipy.stats
+    * probabilidade (float): probabilidade acumulada
+    * graus_liberdade (list ou array): graus de liberdade (um argumento para cada parâmetro da distribuição)
+
+    =====
+    Saída
+    =====
+
+    * array com os quantis, com o formato dos graus de liberdade
+    """
+    graus = broadcast_arrays(*[asarray(valor, dtype=float) for valor in graus_liberdade])
+    combinacoes, indices = unique(column_stack([valor.ravel() for valor in graus]), axis=0, return_inverse=True)
+
+    valores = array([cacheQuantis.obter((distribuicao.name, float(probabilidade)) + tuple(combinacao),
+                                        lambda: float(distribuicao.ppf(probabilidade, *combinacao)))
+                     for combinacao in combinacoes])
+
+    return valores[indices.ravel()].reshape(graus[0].shape)
+
+def fatorAbrangencia(PA, graus_liberdade):
+    u"""
+    Fatores de abrangência (distribuição t, bilateral) para a probabilidade de abrangência PA e os graus de liberdade
+    de cada ponto (lista ou array). Retorna um array com o formato dos graus de liberdade.
+    """
+    return -quantis(t, (1 - PA)/2, graus_liberdade)
+
+def _linhasDados(entrada, linhas_ignoradas, tamanho=None):
+    u"""
+    Linhas de dados de um arquivo texto aberto (as linhas vazias e os comentários, iniciados por #, são descartados),
+    em listas de até tamanho linhas.
+    """
+    for _ in range(linhas_ignoradas):
+        next(entrada, None)
+
+    while True:
+        linhas = list(islice(entrada, tamanho))
+        if not linhas:
+            return
+        linhas = [linha for linha in linhas if linha.strip() and not linha.lstrip().startswith('#')]
+        if linhas:
+            yield linhas
+
+def linhasArquivo(arquivo, linhas_ignoradas=0):
+    u"""
+    Número de pontos (linhas de dados) de um arquivo .npy ou texto (ex.: csv), sem carregar o arquivo na memória.
+    """
+    if arquivo.endswith('.npy'):
+        return load(arquivo, mmap_mode='r').shape[0]
+
+    with open(arquivo) as entrada:
+        return sum(len(linhas) for linhas in _linhasDados(entrada, linhas_ignoradas, 100000))
+
+def blocosArquivo(arquivo, tamanho, colunas=None, delimitador=',', linhas_ignoradas=0):
+    u"""
+    Lê os dados de um arquivo em blocos de tamanho pontos (linhas), de forma que a memória utilizada não dependa do
+    tamanho do arquivo.
+
+    =======
+    Entrada
+    =======
+
+    * arquivo (str): caminho do arquivo. Arquivos .npy (array 2D, ou 1D para uma coluna) são mapeados na memória
+    (numpy.load com mmap_mode); os demais são lidos como texto (ex.: csv), linha a linha.
+    * tamanho (int): número de pontos de cada bloco
+    * colunas (list): índices das colunas lidas. Caso None, todas as colunas são lidas.
+    * delimitador (str): separador das colunas (arquivos texto)
+    * linhas_ignoradas (int): número de linhas iniciais ignoradas, como cabeçalhos (arquivos texto)
+
+    =====
+    Saída
+    =====
+
+    * gerador de arrays (pontos x colunas). Somente o último bloco pode possuir menos de tamanho pontos.
+    """
+    if arquivo.endswith('.npy'):
+        dados = load(arquivo, mmap_mode='r')
+        if dados.ndim == 1:
+            dados = dados.reshape(-1, 1)
+
+        for inicio in range(0, dados.shape[0], tamanho):
+            bloco = dados[inicio:inicio+tamanho]
+            yield array(bloco if colunas is None else bloco[:, colunas], dtype=float)
+
+    else:
+        with open(arquivo) as entrada:
+            resto = []
+            for linhas in _linhasDados(entrada, linhas_ignoradas, tamanho):
+                resto += linhas
+                if len(resto) >= tamanho:
+                    yield loadtxt(resto[:tamanho], delimiter=delimitador, usecols=colunas, ndmin=2)
+                    resto = resto[tamanho:]
+            if resto:
+                yield loadtxt(resto, delimiter=delimitador, usecols=colunas, ndmin=2)
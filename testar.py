@@ -1,7 +1,18 @@
 from MT_PEU import EstimacaoNaoLinear
+from MT_PEU_Linear import EstimacaoLinear
+from AlgebraLinear import FatoracaoCholesky
+from GaussNewton import minimosQuadrados
+from MT_PEU_Lote import EstimacaoLote
+from Preditor import carregar
+from Servidor import Servidor
+from subrotinas import quantis, fatorAbrangencia, cacheQuantis
 import pytest
+import asyncio
+from json import dumps, loads
 from casadi import MX, vertcat,exp
-from numpy import array
+from numpy import array, allclose, array_equal, column_stack, linspace, exp as exponencial, isnan, loadtxt, savetxt, save, load
+from numpy.linalg import solve, inv
+from scipy.stats import f, t
 
 def Modelo(param,x,*args):
 
@@ -24,13 +35,13 @@ y = [0.9,0.949,0.886,0.785,0.791,0.890,0.787,0.877,0.938,
 uy = [1]*41; uxtempo = [1]*41; uxtemperatura = [1]*41
 
 #Execução do MT_PEU
-Estime = EstimacaoNaoLinear(Modelo, simbolos_x=['t','T'], simbolos_y=['y'], simbolos_param=['ko','E'], Folder='Exemplo1')
+Estime = EstimacaoNaoLinear(Modelo, symbols_x=['t','Tao'], symbols_y=['y'], symbols_param=['ko','E'], Folder='Exemplo1')
 Estime.setDados(0, (tempo, uxtempo), (temperatura, uxtemperatura))
 Estime.setDados(1, (y, uy))
-Estime.setConjunto(tipo='estimacao')
-Estime.optimize(initial_estimative=[0.5, 25000], algoritmo='ipopt')
-Estime.incertezaParametros(metodoIncerteza='Geral''')
-Estime.predicao()
+Estime.setConjunto(dataType='estimacao')
+Estime.optimize(initial_estimative=[0.5, 25000], algorithm='ipopt', optimizationReport=False)
+Estime.parametersUncertainty(uncertaintyMethod='Geral', parametersReport=False, objectiveFunctionMapping=False)
+Estime.prediction(predictionReport=False)
 
 # Valores originais
 hessian = array([[5.46625676e+00, -7.50116238e-03], [-7.50116238e-03,  1.02960714e-05]])
@@ -77,8 +88,8 @@ sensibilidade = array([[-1.06335451e-01,  1.52826132e-04],
        [-4.20883720e-01,  5.67978718e-04]])
 
 # Dados de teste
-testdata_H = [(Modelo, ['t','T'], ['y'], ['ko','E'],'Exemplo1',y,tempo,temperatura,uy,uxtempo,uxtemperatura,hessian)]
-testdata_S = [(Modelo, ['t','T'], ['y'], ['ko','E'],'Exemplo1',y,tempo,temperatura,uy,uxtempo,uxtemperatura,sensibilidade)]
+testdata_H = [(Modelo, ['t','Tao'], ['y'], ['ko','E'],'Exemplo1',y,tempo,temperatura,uy,uxtempo,uxtemperatura,hessian)]
+testdata_S = [(Modelo, ['t','Tao'], ['y'], ['ko','E'],'Exemplo1',y,tempo,temperatura,uy,uxtempo,uxtemperatura,sensibilidade)]
 
 #Hessiana
 @pytest.mark.parametrize("Modelo, simbolos_x, simbolos_y, simbolos_param, Folder, y, tempo, temperatura, uy, uxtempo, uxtemperatura, H",testdata_H)
@@ -90,5 +101,430 @@ def test_hessian(Modelo, simbolos_x, simbolos_y, simbolos_param, Folder, y, temp
 def test_S(Modelo, simbolos_x, simbolos_y, simbolos_param, Folder, y, tempo, temperatura, uy, uxtempo,uxtemperatura, S):
     assert round(Estime.S.mean(), 5) == round(S.mean(), 5)
 
+# ---------------------------------------------------------------------
+# FUNÇÕES AUXILIARES DOS TESTES
+# ---------------------------------------------------------------------
+def estimador(**kwargs):
+    # Exemplo 1 com os dados de estimação (kwargs: keywords de EstimacaoNaoLinear)
+    Estimacao = EstimacaoNaoLinear(Modelo, symbols_x=['t','Tao'], symbols_y=['y'], symbols_param=['ko','E'],
+                                   Folder='Exemplo1', **kwargs)
+    Estimacao.setDados(0, (tempo, uxtempo), (temperatura, uxtemperatura))
+    Estimacao.setDados(1, (y, uy))
+    Estimacao.setConjunto(dataType='estimacao')
+    return Estimacao
 
+def ajustar(estimacao={}, **kwargs):
+    # Exemplo 1 ajustado (kwargs: keywords de optimize), sem relatórios
+    Estimacao = estimador(**estimacao)
+    Estimacao.optimize(initial_estimative=[0.5, 25000], optimizationReport=False, **kwargs)
+    return Estimacao
 
+def ajustarLinear(x, yl, uyl=None):
+    # Reta (y = p1.x + p2) ajustada por EstimacaoLinear, incerteza de y igual a 1 (caso uyl não seja definida)
+    Estimacao = EstimacaoLinear(['y'], ['x'], ['p1', 'p2'], folder='Exemplo6')
+    Estimacao.setDados(0, (x, [1]*len(x)))
+    Estimacao.setDados(1, (yl, uyl if uyl is not None else [1]*len(yl)))
+    Estimacao.setConjunto()
+    Estimacao.optimize(parametersReport=False)
+    return Estimacao
+
+xlinear = [0., 1., 2., 3., 4., 5., 6., 7., 8., 9.]
+ylinear = [0.1, 0.9, 2.2, 3.2, 3.9, 4.8, 6.1, 6.9, 8.2, 8.8]
+
+# Pontos novos (grandezas independentes) para as predições
+xnovo = column_stack((linspace(15., 150., 7), linspace(600., 639., 7)))
+
+# Predições para novos pontos
+def test_predict():
+    # Mesmas predições e incertezas de prediction com dados de validação (sem a incerteza dos dados)
+    Estimacao = ajustar()
+    Estimacao.parametersUncertainty(parametersReport=False, objectiveFunctionMapping=False)
+    Estimacao.setDados(0, (xnovo[:, 0], [1]*7), (xnovo[:, 1], [1]*7))
+    Estimacao.setDados(1, ([0.5]*7, [0.1]*7))
+    Estimacao.setConjunto(dataType='predicao')
+    Estimacao.prediction(predictionReport=False)
+
+    ynovo, uynovo = Estimacao.predict(xnovo, chunkSize=3)
+    assert allclose(ynovo, Estimacao.y.calculado.matriz_estimativa)
+    assert allclose(uynovo[:, 0]**2 + 0.1**2, Estimacao.y.calculado.matriz_covariancia.diagonal())
+    assert allclose(Estimacao.predict(xnovo, with_uncertainty=False), ynovo)
+
+# Limite de memória do mapeamento da função objetivo
+def test_mapeamento_memoryLimit():
+    # Limite suficiente: mesma região. Limite de 100 pontos: somente os primeiros pontos mapeados são armazenados
+    regioes = []
+    for limite in (None, 10., 100*8*3/1024**2):
+        Estimacao = ajustar()
+        if limite is not None and limite < 1:
+            with pytest.warns(UserWarning, match='memory limit'):
+                Estimacao.parametersUncertainty(parametersReport=False, iterations=500, seed=3, memoryLimit=limite)
+        else:
+            Estimacao.parametersUncertainty(parametersReport=False, iterations=500, seed=3, memoryLimit=limite)
+        regioes.append(array(Estimacao.parametros.regiao_abrangencia))
+
+    assert array_equal(regioes[0], regioes[1])
+    assert 0 < regioes[2].shape[0] < regioes[0].shape[0] and array_equal(regioes[2], regioes[0][:regioes[2].shape[0]])
+
+# Mapeamento da função objetivo com sementes
+@pytest.mark.parametrize("kwargs", [{'seed': 3}, {'seed': 3, 'workers': 2}])
+def test_mapeamento_semente(kwargs):
+    # Estimadores independentes, com a mesma semente e número de workers: mesma região de abrangência
+    regioes = []
+    for i in range(2):
+        Estimacao = ajustar()
+        Estimacao.parametersUncertainty(parametersReport=False, iterations=100, **kwargs)
+        regioes.append(array(Estimacao.parametros.regiao_abrangencia))
+
+    assert regioes[0].size != 0 and array_equal(regioes[0], regioes[1])
+
+def test_mapeamento_semente_sem_workers():
+    # Com a semente e sem workers, as amostras são as de workers = 1
+    regioes = []
+    for kwargs in ({'seed': 3}, {'seed': 3, 'workers': 1}):
+        Estimacao = ajustar()
+        Estimacao.parametersUncertainty(parametersReport=False, iterations=100, **kwargs)
+        regioes.append(array(Estimacao.parametros.regiao_abrangencia))
+
+    assert array_equal(regioes[0], regioes[1])
+
+# Cache das funções do CasADi
+def test_cacheCasadi(tmp_path):
+    # Mesmo modelo, forma do problema e avaliação: funções compartilhadas. Compilação diferente: funções próprias
+    Estimacao = estimador(pointwise=True)
+    Outra = estimador(pointwise=True)
+    Compilada = estimador(pointwise=True, compilation=True, compilation_path=str(tmp_path))
+    Diretorio = estimador(pointwise=True, compilation=True, compilation_path=str(tmp_path / 'outro'))
+
+    assert Estimacao._excObjectiveFunction is Outra._excObjectiveFunction
+    assert Compilada._excObjectiveFunction is not Estimacao._excObjectiveFunction
+    assert Diretorio._excObjectiveFunction is not Compilada._excObjectiveFunction
+
+# Compilação das funções do CasADi
+@pytest.mark.parametrize("ordem", [(False, True), (True, False)])
+def test_compilacao(tmp_path, ordem):
+    # Estimadores compilado e não compilado, um após o outro: funções próprias e mesmos resultados
+    resultados = {}
+    for compilacao in ordem:
+        Estimacao = ajustar({'compilation': compilacao, 'compilation_path': str(tmp_path)})
+        Estimacao.parametersUncertainty(parametersReport=False, objectiveFunctionMapping=False)
+        assert (Estimacao._excObjectiveFunction.class_name() == 'External') == compilacao
+        resultados[compilacao] = Estimacao
+
+    assert allclose(resultados[True].parametros.estimativa, resultados[False].parametros.estimativa)
+    assert allclose(resultados[True].FOotimo, resultados[False].FOotimo)
+    assert allclose(resultados[True].parametros.matriz_covariancia, resultados[False].parametros.matriz_covariancia)
+
+# Modelo pontual (Function.map)
+@pytest.mark.parametrize("estimacao", [{'pointwise': True}, {'pointwise': True, 'parallelization': 'thread', 'threads': 2},
+                                       {'pointwise': True, 'compilation': True}])
+def test_pointwise(tmp_path, estimacao):
+    # Mesmos resultados do modelo vetorizado (Estime), com função objetivo própria
+    Estimacao = ajustar(dict(estimacao, compilation_path=str(tmp_path)))
+    Estimacao.parametersUncertainty(parametersReport=False, objectiveFunctionMapping=False)
+    Estimacao.prediction(predictionReport=False)
+
+    assert Estimacao._excObjectiveFunction is not Estime._excObjectiveFunction
+    assert allclose(Estimacao.parametros.estimativa, Estime.parametros.estimativa)
+    assert allclose(Estimacao.parametros.matriz_covariancia, Estime.parametros.matriz_covariancia, rtol=1e-4)
+    assert allclose(Estimacao.y.calculado.matriz_estimativa, Estime.y.calculado.matriz_estimativa)
+    assert allclose(Estimacao.predict(xnovo), Estime.predict(xnovo))
+
+def test_pointwise_compilacao(tmp_path):
+    # Modelos pontuais compilado e não compilado, um após o outro: funções próprias e mesmos resultados
+    Compilada = ajustar({'pointwise': True, 'compilation': True, 'compilation_path': str(tmp_path)})
+    Estimacao = ajustar({'pointwise': True})
+
+    assert Compilada._excObjectiveFunction is not Estimacao._excObjectiveFunction
+    assert allclose(Compilada.parametros.estimativa, Estimacao.parametros.estimativa)
+    assert allclose(Compilada.FOotimo, Estimacao.FOotimo)
+
+# Fatoração LDLT (matriz simétrica indefinida)
+def test_FatoracaoCholesky_LDL():
+    matriz = array([[1., 2., 0.], [2., 1., 3.], [0., 3., -2.]])
+    b = array([1., -1., 2.])
+    fatoracao = FatoracaoCholesky(matriz)
+
+    assert allclose(fatoracao.resolver(b), solve(matriz, b))
+    assert allclose(fatoracao.inversa(), inv(matriz))
+    assert allclose(fatoracao.formaQuadratica(b), b.dot(solve(matriz, b)))
+    with pytest.raises(ValueError):
+        fatoracao.branquear(b)
+
+# Amostragem da região de abrangência do modelo linear (elipsoide)
+def test_amostragemElipsoide():
+    # Todos os pontos (interior e fronteira) pertencem à região: FO <= FOotimo.(1 + NP/(NE-NP).F)
+    Estimacao = ajustarLinear(xlinear, ylinear)
+    Estimacao.parametersUncertainty(parametersReport=False, MethodObjectivefunctionmapping='Elipsoide', iterations=300,
+                                    boundaryPoints=100, seed=1)
+    regiao = array(Estimacao.parametros.regiao_abrangencia)
+    limite = Estimacao.FOotimo*(1 + 2./8*f.ppf(Estimacao.PA, 2, 8))
+
+    FO = ((array(ylinear) - regiao.dot(array([xlinear, [1.]*10])))**2).sum(axis=1)
+    assert regiao.shape == (400, 2)
+    assert (FO <= limite*(1 + 1e-9)).all() and allclose(FO[300:], limite)
+
+# Atualização recursiva
+def test_recursiveUpdate():
+    # Inclusão de pontos: mesma estimativa, covariância e função objetivo do ajuste com todos os pontos
+    Recursivo = ajustarLinear(xlinear[:6], ylinear[:6])
+    Recursivo.recursiveUpdate(xlinear[6:8], ylinear[6:8], [1, 1])
+    Lote = ajustarLinear(xlinear[:8], ylinear[:8])
+    Lote.parametersUncertainty(objectiveFunctionMapping=False, parametersReport=False)
+
+    assert allclose(Recursivo.parametros.estimativa, Lote.parametros.estimativa)
+    assert allclose(Recursivo.parametros.matriz_covariancia, Lote.parametros.matriz_covariancia)
+    assert allclose(Recursivo.FOotimo, Lote.FOotimo)
+
+    # A predição (x = 0) considera os pesos atuais dos dados de estimação
+    Recursivo.prediction(predictionReport=False)
+    Lote.prediction(predictionReport=False)
+    assert allclose(Recursivo.y.calculado.matriz_covariancia[0, 0], Lote.y.calculado.matriz_covariancia[0, 0])
+
+def test_recursiveUpdate_window():
+    # Janela móvel: mesma estimativa e covariância do ajuste com os últimos pontos
+    Recursivo = ajustarLinear(xlinear[:6], ylinear[:6])
+    Recursivo.recursiveUpdate(xlinear[6:8], ylinear[6:8], [1, 1])
+    Recursivo.recursiveUpdate(xlinear[8:], ylinear[8:], [1, 1], window=4)
+    Lote = ajustarLinear(xlinear[6:], ylinear[6:])
+    Lote.parametersUncertainty(objectiveFunctionMapping=False, parametersReport=False)
+
+    assert allclose(Recursivo.parametros.estimativa, Lote.parametros.estimativa)
+    assert allclose(Recursivo.parametros.matriz_covariancia, Lote.parametros.matriz_covariancia)
+    assert allclose(Recursivo.FOotimo, Lote.FOotimo)
+
+    # x = 0 está fora da janela: variância de p2 (11.5) mais a variância do dado (1)
+    Recursivo.prediction(predictionReport=False)
+    assert round(Recursivo.y.calculado.matriz_covariancia[0, 0], 5) == 12.5
+
+
+def test_recursiveUpdate_forgettingFactor():
+    # Fator de esquecimento 0.5: mesmo resultado do ajuste ponderado, com variância dos dados anteriores dividida pelo
+    # fator (incerteza multiplicada por raiz de 2)
+    Recursivo = ajustarLinear(xlinear[:6], ylinear[:6])
+    Recursivo.recursiveUpdate(xlinear[6:8], ylinear[6:8], [1, 1], forgettingFactor=0.5)
+    Lote = ajustarLinear(xlinear[:8], ylinear[:8], [2**0.5]*6 + [1, 1])
+    Lote.parametersUncertainty(objectiveFunctionMapping=False, parametersReport=False)
+
+    assert allclose(Recursivo.parametros.estimativa, Lote.parametros.estimativa)
+    assert allclose(Recursivo.parametros.matriz_covariancia, Lote.parametros.matriz_covariancia)
+    assert allclose(Recursivo.FOotimo, Lote.FOotimo)
+
+    # Derivadas da função objetivo em relação aos dados de estimação (pesos atuais): mesma sensibilidade da estimativa
+    # aos dados, -inv(H).Gy
+    assert allclose(Recursivo._derivadas()['Hessiana'], Lote._derivadas()['Hessiana'])
+    assert allclose(Recursivo._derivadas()['Gy'], Lote._derivadas()['Gy'][:, :6])
+
+# Inclusão de dados de estimação (append) com início quente
+def test_setConjunto_append():
+    # Ajuste com os 30 primeiros pontos e inclusão dos demais: mesmo resultado do ajuste com todos os pontos
+    Estimacao = EstimacaoNaoLinear(Modelo, symbols_x=['t','Tao'], symbols_y=['y'], symbols_param=['ko','E'],
+                                   Folder='Exemplo1')
+    Estimacao.setDados(0, (tempo[:30], uxtempo[:30]), (temperatura[:30], uxtemperatura[:30]))
+    Estimacao.setDados(1, (y[:30], uy[:30]))
+    Estimacao.setConjunto(gly=[[10]*30])
+    Estimacao.optimize(initial_estimative=[0.5, 25000], optimizationReport=False)
+
+    Estimacao.setDados(0, (tempo[30:], uxtempo[30:]), (temperatura[30:], uxtemperatura[30:]))
+    Estimacao.setDados(1, (y[30:], uy[30:]))
+    Estimacao.setConjunto(gly=[[20]*11], append=True)
+    Estimacao.optimize(optimizationReport=False)
+
+    assert Estimacao.y.estimacao.NE == 41
+    assert [list(gL) for gL in Estimacao.y.estimacao.gL] == [[10]*30 + [20]*11]
+    assert allclose(Estimacao.parametros.estimativa, Estime.parametros.estimativa)
+    assert allclose(Estimacao.FOotimo, Estime.FOotimo)
+
+def test_setConjunto_append_sem_otimo():
+    # Sem um ótimo para os dados atuais, o início quente de uma estimação anterior é descartado
+    Estimacao = ajustar()
+    Estimacao.setDados(0, (tempo[:5], uxtempo[:5]), (temperatura[:5], uxtemperatura[:5]))
+    Estimacao.setDados(1, (y[:5], uy[:5]))
+    Estimacao.setConjunto(append=True)
+    Estimacao.setDados(0, (tempo[5:10], uxtempo[5:10]), (temperatura[5:10], uxtemperatura[5:10]))
+    Estimacao.setDados(1, (y[5:10], uy[5:10]))
+    Estimacao.setConjunto(append=True)
+
+    with pytest.raises(SyntaxError):
+        Estimacao.optimize(optimizationReport=False)
+
+# Otimização com múltiplos inícios (hipercubo latino)
+def test_multiStart():
+    limites = {'lower_bound': [0.1, 20000.], 'upper_bound': [2., 35000.]}
+    resultados = []
+    for workers in (None, 2):
+        Estimacao = estimador()
+        Estimacao.optimize(optimizationReport=False, starts=5, seed=2, workers=workers, **limites)
+        resultados.append(Estimacao)
+
+    # Inícios do hipercubo latino: um início em cada um dos 5 intervalos de cada parâmetro
+    inicios = array([inicio['initial_estimative'] for inicio in resultados[0].OtimizacaoMultiStart])
+    intervalos = ((inicios - array(limites['lower_bound']))/(array(limites['upper_bound']) - array(limites['lower_bound']))*5).astype(int)
+    assert inicios.shape == (5, 2) and all(sorted(intervalos[:, i]) == list(range(5)) for i in range(2))
+
+    # Melhor início: menor função objetivo, não superior à de um único início
+    FO = [inicio['FO'] for inicio in resultados[0].OtimizacaoMultiStart if inicio['success']]
+    assert allclose(resultados[0].FOotimo, min(FO)) and resultados[0].FOotimo <= Estime.FOotimo*(1 + 1e-6)
+    assert allclose(resultados[0].parametros.estimativa, resultados[0].Otimizacao['x'])
+
+    # O resultado não depende do número de workers
+    assert [inicio['FO'] for inicio in resultados[1].OtimizacaoMultiStart] == \
+           [inicio['FO'] for inicio in resultados[0].OtimizacaoMultiStart]
+    assert allclose(resultados[1].parametros.estimativa, resultados[0].parametros.estimativa)
+
+# Mínimos quadrados (Gauss-Newton e Levenberg-Marquardt)
+@pytest.mark.parametrize("algorithm", ['gauss-newton', 'lm'])
+def test_minimosQuadrados(algorithm):
+    Estimacao = ajustar(algorithm=algorithm)
+    assert allclose(Estimacao.parametros.estimativa, Estime.parametros.estimativa, rtol=1e-4)
+    assert allclose(Estimacao.FOotimo, Estime.FOotimo, rtol=1e-6)
+
+# A jacobiana é avaliada somente no início e nos passos aceitos (a busca em linha avalia somente os resíduos)
+@pytest.mark.parametrize("metodo", ['gauss-newton', 'lm'])
+def test_minimosQuadrados_avaliacoesJacobiana(metodo):
+    x = linspace(0., 2., 20)
+    y = 2.*exponencial(-1.5*x)
+    avaliacoes = {'residuos': 0, 'jacobiana': 0}
+
+    def residuos(p):
+        avaliacoes['residuos'] += 1
+        return y - p[0]*exponencial(-p[1]*x)
+
+    def jacobiana(p):
+        avaliacoes['jacobiana'] += 1
+        return column_stack((-exponencial(-p[1]*x), p[0]*x*exponencial(-p[1]*x)))
+
+    # início distante: passos rejeitados pela busca em linha (ou pelo amortecimento)
+    solucao = minimosQuadrados(residuos, jacobiana, [1., 5.], metodo=metodo)
+    assert solucao['stats']['success'] and allclose(solucao['x'], [2., 1.5], rtol=1e-6)
+    assert avaliacoes['jacobiana'] == len(solucao['historico']) + 1 < avaliacoes['residuos']
+
+# Incerteza dos parâmetros pela sensibilidade do modelo: inv(ST.inv(Uyy).S), sem a matriz Hessiana e Gy
+def test_parametersUncertainty_SensibilidadeModelo():
+    Estimacao = ajustar()
+    Estimacao.parametersUncertainty(uncertaintyMethod='SensibilidadeModelo', parametersReport=False,
+                                    objectiveFunctionMapping=False)
+    assert 'Hessiana' not in Estimacao._EstimacaoNaoLinear__derivadasAvaliadas
+    assert allclose(Estimacao.parametros.matriz_covariancia,
+                    inv(Estime.S.transpose().dot(solve(Estime.y.estimacao.matriz_covariancia, Estime.S))), rtol=1e-4)
+
+    with pytest.raises(NameError):
+        Estimacao.parametersUncertainty(uncertaintyMethod='GaussNewton', parametersReport=False,
+                                        objectiveFunctionMapping=False)
+
+# Estimação em lote
+def test_EstimacaoLote(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conjuntos = [{'x': [(tempo, uxtempo), (temperatura, uxtemperatura)], 'y': [(y, uy)]},
+                 {'x': [(tempo[:2], uxtempo[:2]), (temperatura[:2], uxtemperatura[:2])], 'y': [(y[:1], uy[:1])]},
+                 {'x': [(tempo[:20], uxtempo[:20]), (temperatura[:20], uxtemperatura[:20])], 'y': [(y[:20], uy[:20])]}]
+
+    Lote = EstimacaoLote(Modelo, ['y'], ['t', 'Tao'], ['ko', 'E'], Folder='Exemplo1')
+    resultados = Lote.estimate(conjuntos, initial_estimative=[0.5, 25000])
+
+    # o conjunto com erro não interrompe o lote
+    assert list(resultados['success']) == [True, False, True]
+    assert resultados['return_status'][1].startswith('Error') and isnan(resultados['estimative'][1]).all()
+    assert allclose(resultados['estimative'][0], Estime.parametros.estimativa, rtol=1e-4)
+    assert allclose(resultados['covariance'][0], Estime.parametros.matriz_covariancia, rtol=1e-3)
+
+    # os conjuntos divididos entre processos têm os mesmos resultados; nenhuma pasta de relatórios é criada
+    resultadosProcessos = Lote.estimate(conjuntos, initial_estimative=[0.5, 25000], workers=2)
+    assert list(resultadosProcessos['success']) == [True, False, True]
+    assert allclose(resultadosProcessos['estimative'][[0, 2]], resultados['estimative'][[0, 2]])
+    assert list(tmp_path.iterdir()) == []
+
+# Quantis memorizados (ver subrotinas.quantis): mesmos valores do scipy.stats, avaliados uma vez por combinação
+def test_quantis():
+    graus = array([[5, 5, 10], [10, 39, 39]])
+    assert allclose(fatorAbrangencia(0.95, graus), t.ppf(0.975, graus))
+    assert allclose(quantis(f, 0.95, 2, graus), f.ppf(0.95, 2, graus))
+
+    cacheQuantis.limpar()
+    fatorAbrangencia(0.95, graus)
+    assert len(cacheQuantis) == 3
+    fatorAbrangencia(0.95, graus[::-1])
+    assert len(cacheQuantis) == 3
+
+# Exportação de y calculado com os limites da faixa de abrangência (export_y_band)
+def test_export_y_band(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Estimacao = ajustar()
+    Estimacao.parametersUncertainty(parametersReport=False, objectiveFunctionMapping=False)
+
+    colunas = []
+    for band in (False, True):
+        Estimacao.prediction(export_y=True, export_y_band=band)
+        arquivo, = tmp_path.rglob('y-calculado-predicao.txt')
+        dados = loadtxt(arquivo, delimiter=',')
+        colunas.append(dados.shape[1])
+
+    assert colunas == [3, 5]
+    assert allclose(dados[:, 3:], column_stack(Estimacao.y.calculado.faixaAbrangencia(Estimacao.PA)), rtol=1e-4)
+
+    with pytest.raises(TypeError):
+        Estimacao.prediction(export_y=True, export_y_band=1)
+
+# Covariância fatorada
+@pytest.mark.parametrize("validacao", [False, True])
+def test_factoredCovariance(validacao):
+    Estimacao = ajustar()
+    Estimacao.parametersUncertainty(parametersReport=False, objectiveFunctionMapping=False)
+    if validacao:
+        Estimacao.setDados(0, (xnovo[:, 0], [1]*7), (xnovo[:, 1], [1]*7))
+        Estimacao.setDados(1, ([0.5]*7, [0.1]*7))
+        Estimacao.setConjunto(dataType='predicao')
+
+    Estimacao.prediction(predictionReport=False)
+    densa = array(Estimacao.y.calculado.matriz_covariancia)
+    Estimacao.prediction(predictionReport=False, factoredCovariance=True)
+
+    assert allclose(Estimacao.y.calculado.matriz_covariancia, densa)
+    assert allclose(Estimacao.y.calculado.matriz_incerteza[:, 0], densa.diagonal()**0.5)
+
+# Predição de arquivos (csv/npy) em blocos
+def test_predictFile(tmp_path):
+    ynovo, uynovo = Estime.predict(xnovo)
+    savetxt(str(tmp_path / 'x.csv'), column_stack((xnovo, xnovo[:, 0])), delimiter=',', header='t,Tao,outra')
+
+    NE = Estime.predictFile(str(tmp_path / 'x.csv'), str(tmp_path / 'y.csv'), columns=[0, 1], chunkSize=2, skiprows=1)
+    resultado = loadtxt(str(tmp_path / 'y.csv'), delimiter=',', skiprows=1)
+    assert NE == 7
+    assert allclose(resultado[:, 0], ynovo[:, 0]) and allclose(resultado[:, 1], uynovo[:, 0])
+    # limites do intervalo de abrangência
+    assert (resultado[:, 2] < resultado[:, 0]).all() and (resultado[:, 3] > resultado[:, 0]).all()
+
+    save(str(tmp_path / 'x.npy'), xnovo)
+    Estime.predictFile(str(tmp_path / 'x.npy'), str(tmp_path / 'y.npy'), chunkSize=3)
+    assert allclose(load(str(tmp_path / 'y.npy')), resultado)
+
+# Modelo exportado (Preditor)
+def test_carregar(tmp_path):
+    # O artefato exportado reproduz predict do estimador (sem o MT_PEU)
+    arquivo = Estime.exportModel(str(tmp_path / 'Modelo.npz'), chunkSizes=(1, 4))
+    Modelo_carregado = carregar(arquivo)
+    ynovo, uynovo = Estime.predict(xnovo)
+    ycarregado, uycarregado = Modelo_carregado.predict(xnovo)
+
+    assert Modelo_carregado.x['simbolos'] == ['t', 'Tao'] and Modelo_carregado.NY == 1
+    assert allclose(ycarregado, ynovo) and allclose(uycarregado, uynovo)
+
+# Servidor de predições
+def test_Servidor(tmp_path):
+    Preditor_modelo = carregar(Estime.exportModel(str(tmp_path / 'Modelo.npz'), chunkSizes=(1, 4)))
+    ynovo, uynovo = Preditor_modelo.predict(xnovo)
+
+    async def principal():
+        servidor = Servidor(Preditor_modelo)
+        await servidor.iniciar(path=str(tmp_path / 'servidor.sock'))
+        leitor, escritor = await asyncio.open_unix_connection(str(tmp_path / 'servidor.sock'))
+        escritor.write((dumps({'x': xnovo[1].tolist(), 'id': 1}) + '\n').encode())
+        escritor.write((dumps({'x': xnovo.tolist(), 'id': 2}) + '\n').encode())
+        await escritor.drain()
+        respostas = [loads(await leitor.readline()) for i in range(2)]
+        escritor.close()
+        await servidor.encerrar()
+        return {resposta['id']: resposta for resposta in respostas}
+
+    respostas = asyncio.run(principal())
+    assert allclose(respostas[1]['y'], ynovo[1]) and allclose(respostas[1]['uy'], uynovo[1])
+    assert allclose(respostas[2]['y'], ynovo) and allclose(respostas[2]['uy'], uynovo)